@@ -0,0 +1,214 @@
+"""Aggregate trading statistics computed by the database in a single pass."""
+from datetime import datetime
+
+from django.db.models import Count, F, FloatField, Max, Min, OuterRef, Q, Subquery, Sum, Window
+from django.db.models.functions import Cast, Coalesce, NullIf, Rank, TruncMonth, TruncWeek
+
+from .models import CompletedTrade, DailyPnL, OpenPosition, Order, Stock
+
+ORDER_TYPES = ("buy", "sell")
+# Bucket start for each P/L period; daily buckets are the rollup rows themselves.
+PNL_PERIODS = {'daily': None, 'weekly': TruncWeek, 'monthly': TruncMonth}
+SYMBOL_SORT_FIELDS = ('symbol', 'trades', 'win_rate', 'net_profit_loss', 'profit_factor',
+                      'average_holding_duration', 'open_quantity')
+LEADERBOARD_SORT_FIELDS = ('net_profit_loss', 'win_rate', 'profit_factor', 'average_profit_loss',
+                           'completed_trades', 'total_deposits', 'username')
+
+
+def trade_aggregates(prefix=""):
+    """Conditional aggregates over CompletedTrade; ``prefix`` points at the trade from a related model."""
+    net_amount = f"{prefix}net_amount"
+    return {
+        'completed': Count(f"{prefix}id"),
+        'wins': Count(f"{prefix}id", filter=Q(**{f"{net_amount}__gt": 0})),
+        'losses': Count(f"{prefix}id", filter=Q(**{f"{net_amount}__lt": 0})),
+        'gross_profit': Sum(net_amount, filter=Q(**{f"{net_amount}__gt": 0})),
+        'gross_loss': Sum(net_amount, filter=Q(**{f"{net_amount}__lt": 0})),
+        'net_total': Sum(net_amount),
+        'total_duration': Sum(f"{prefix}duration"),
+        'best_trade': Max(net_amount),
+        'worst_trade': Min(net_amount),
+    }
+
+
+def filter_trades(queryset, date_from=None, date_to=None, symbol=None, order_type=None):
+    """Narrows a CompletedTrade queryset by close date range, symbol and order type."""
+    if date_from:
+        queryset = queryset.filter(close_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(close_date__lte=date_to)
+    if symbol:
+        queryset = queryset.filter(initial_order__stock__symbol=symbol.upper())
+    if order_type:
+        queryset = queryset.filter(initial_order__order_type=order_type)
+    return queryset
+
+
+def summarize(totals):
+    """Derives the reported ratios from raw aggregate totals."""
+    completed = totals['completed'] or 0
+    wins = totals['wins'] or 0
+    losses = totals['losses'] or 0
+    gross_profit = totals['gross_profit'] or 0
+    gross_loss = totals['gross_loss'] or 0
+    net_total = totals['net_total'] or 0
+    total_duration = totals['total_duration'] or 0
+
+    if completed == 0:
+        return {
+            'completed_trades': 0, 'wins': 0, 'losses': 0, 'win_rate': 0, 'profit_factor': 0,
+            'average_profit_loss': 0, 'average_holding_duration': 0, 'best_trade': None,
+            'worst_trade': None, 'net_profit_loss': 0, 'expectancy': 0,
+        }
+
+    average_win = gross_profit / wins if wins else 0
+    average_loss = gross_loss / losses if losses else 0
+    expectancy = (wins / completed) * float(average_win) + (losses / completed) * float(average_loss)
+
+    return {
+        'completed_trades': completed,
+        'wins': wins,
+        'losses': losses,
+        'win_rate': round(wins / completed * 100, 2),
+        'profit_factor': round(gross_profit / abs(gross_loss), 2) if gross_loss else 0,
+        'average_profit_loss': round(net_total / completed, 2),
+        'average_holding_duration': round(total_duration / completed, 2),
+        'best_trade': totals['best_trade'],
+        'worst_trade': totals['worst_trade'],
+        'net_profit_loss': round(net_total, 2),
+        'expectancy': round(expectancy, 2),
+    }
+
+
+def trade_stats(user, date_from=None, date_to=None, symbol=None, order_type=None):
+    """Computes the user's trade statistics with one aggregate query."""
+    trades = filter_trades(CompletedTrade.objects.filter(initial_order__user=user),
+                           date_from=date_from, date_to=date_to, symbol=symbol, order_type=order_type)
+    return summarize(trades.aggregate(**trade_aggregates()))
+
+
+async def atrade_stats(user, date_from=None, date_to=None, symbol=None, order_type=None):
+    """trade_stats() through the async ORM; ``user`` may also be a user id."""
+    trades = filter_trades(CompletedTrade.objects.filter(initial_order__user=user),
+                           date_from=date_from, date_to=date_to, symbol=symbol, order_type=order_type)
+    return summarize(await trades.aaggregate(**trade_aggregates()))
+
+
+def order_stats(user):
+    """Counts the user's orders by status with one aggregate query."""
+    return Order.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        open=Count('id', filter=Q(status="open")),
+        closed=Count('id', filter=Q(status="closed")),
+    )
+
+
+def symbol_stats(user, order_by='-net_profit_loss', limit=None):
+    """Per-symbol trade statistics and open quantity for every stock the user has ordered.
+
+    One query: a GROUP BY over the user's orders and their completed trades, with the open
+    position as a correlated subquery. Sorting and the top-N limit run in the database, and
+    ties are broken by symbol so the order is stable.
+    """
+    prefix = "order__initial_order__"
+    aggregates = trade_aggregates(prefix)
+    ratios = {
+        'win_rate': _as_float('wins') * 100.0 / NullIf(_as_float('completed'), 0.0),
+        'profit_factor': _as_float('gross_profit') / NullIf(_as_float('gross_loss') * -1.0, 0.0),
+        'average_holding_duration': _as_float('total_duration') / NullIf(_as_float('completed'), 0.0),
+    }
+    open_quantity = OpenPosition.objects.filter(user=user, stock=OuterRef('pk')).values('quantity')
+    rows = Stock.objects.filter(order__user=user) \
+        .values('id', 'symbol') \
+        .annotate(completed=aggregates['completed'], wins=aggregates['wins'], losses=aggregates['losses'],
+                  gross_profit=aggregates['gross_profit'], gross_loss=aggregates['gross_loss'],
+                  net_total=aggregates['net_total'], total_duration=aggregates['total_duration']) \
+        .annotate(trades=F('completed'), net_profit_loss=Coalesce(_as_float('net_total'), 0.0),
+                  open_quantity=Coalesce(Subquery(open_quantity), 0), **ratios)
+
+    field = order_by.lstrip('-')
+    ordering = F(field).desc(nulls_last=True) if order_by.startswith('-') else F(field).asc(nulls_first=True)
+    rows = rows.order_by(ordering, 'symbol')
+    if limit:
+        rows = rows[:limit]
+    return [{
+        'symbol': row['symbol'],
+        'trades': row['trades'],
+        'wins': row['wins'],
+        'losses': row['losses'],
+        'win_rate': round(row['win_rate'] or 0, 2),
+        'net_profit_loss': round(row['net_profit_loss'], 2),
+        'profit_factor': round(row['profit_factor'] or 0, 2),
+        'average_holding_duration': round(row['average_holding_duration'] or 0, 2),
+        'open_quantity': row['open_quantity'],
+    } for row in rows]
+
+
+def leaderboard(users, order_by='-net_profit_loss', min_trades=0):
+    """Annotates a user queryset with every stats column from UserStats, plus its rank.
+
+    Returns ``values()`` rows from one query: the stats come from a LEFT JOIN on the
+    materialized UserStats table (users without a row count as all zeros), and ``rank`` is a
+    window over the whole filtered set, so it is the user's place among all users even when
+    the queryset is sliced into pages. Ties share a rank and are listed by id.
+    """
+    stat = {field: Coalesce(f'stats__{field}', 0) for field in (
+        'open_orders', 'closed_orders', 'total_orders', 'completed_trades', 'wins', 'losses', 'total_duration')}
+    money = {field: Coalesce(Cast(f'stats__{field}', FloatField()), 0.0)
+             for field in ('gross_profit', 'gross_loss', 'total_deposits')}
+    rows = users.values('id', 'username', 'email').annotate(**stat, **money).annotate(
+        net_profit_loss=F('gross_profit') + F('gross_loss'),
+        win_rate=Coalesce(_as_float('wins') * 100.0 / NullIf(_as_float('completed_trades'), 0.0), 0.0),
+        profit_factor=Coalesce(F('gross_profit') / NullIf(F('gross_loss') * -1.0, 0.0), 0.0),
+        average_profit_loss=Coalesce(
+            (F('gross_profit') + F('gross_loss')) / NullIf(_as_float('completed_trades'), 0.0), 0.0),
+        average_holding_duration=Coalesce(
+            _as_float('total_duration') / NullIf(_as_float('completed_trades'), 0.0), 0.0),
+    )
+    if min_trades:
+        rows = rows.filter(stats__completed_trades__gte=min_trades)
+
+    field = order_by.lstrip('-')
+    ordering = F(field).desc() if order_by.startswith('-') else F(field).asc()
+    return rows.annotate(rank=Window(Rank(), order_by=ordering)).order_by(ordering, 'id')
+
+
+def _as_float(field):
+    return Cast(F(field), FloatField())
+
+
+def pnl_series(user, period, date_from=None, date_to=None):
+    """Reads the user's DailyPnL rollup into daily, weekly (from Monday) or monthly buckets.
+
+    Each bucket carries the running balance (deposits plus realized P/L), so the same series
+    drives the calendar heatmap and the equity curve. Costs one row per active day, never per trade.
+    """
+    rows = DailyPnL.objects.filter(user=user)
+    opening_balance = 0
+    if date_from:
+        opening_balance = rows.filter(date__lt=date_from).aggregate(
+            total=Sum(F('realized_pnl') + F('deposits')))['total'] or 0
+        rows = rows.filter(date__gte=date_from)
+    if date_to:
+        rows = rows.filter(date__lte=date_to)
+
+    truncate = PNL_PERIODS[period]
+    if truncate is None:
+        rows = rows.values(*DailyPnL.COUNTERS, start=F('date'))
+    else:
+        rows = rows.values(start=truncate('date')).annotate(
+            **{field: Sum(field) for field in DailyPnL.COUNTERS})
+
+    balance = opening_balance
+    buckets = []
+    for row in rows.order_by('start'):
+        balance += row['realized_pnl'] + row['deposits']
+        buckets.append({**row, 'balance': balance})
+    return {'period': period, 'opening_balance': opening_balance, 'buckets': buckets}
+
+
+def parse_date(value):
+    """Parses a YYYY-MM-DD query parameter; returns None when it is empty."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
@@ -0,0 +1,17 @@
+"""URLconf for requests served under ASGI (see AsyncRoutesMiddleware).
+
+The async read views come first; everything else, including other methods on the same paths,
+resolves through backend.urls as it does under WSGI.
+"""
+from django.urls import include, path, re_path
+
+from .async_views import AsyncCompletedTradeListView, AsyncDashboardView, AsyncOpenPositionListView, \
+    AsyncUserStatsView
+
+urlpatterns = [
+    path('api/dashboard/', AsyncDashboardView.as_view(), name='dashboard'),
+    re_path(r'^api/users/(?P<pk>[^/.]+)/stats/$', AsyncUserStatsView.as_view(), name='user-stats'),
+    path('api/completed-trades/', AsyncCompletedTradeListView.as_view(), name='completed trades-list'),
+    path('api/open-positions/', AsyncOpenPositionListView.as_view(), name='open-positions-list'),
+    path('', include('backend.urls')),
+]
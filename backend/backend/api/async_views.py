@@ -0,0 +1,191 @@
+"""Async versions of the read-heavy endpoints, served when the app runs under ASGI.
+
+AsyncRoutesMiddleware points ASGI requests at api.async_urls, which puts these views in front
+of the DRF routes. A GET of the dashboard, a user's stats, or the completed-trade or
+open-position list then awaits Django's async ORM instead of blocking the event loop. Each
+view awaits its queries one after another: Django 4.2 runs a request's async queries on one
+thread in turn, so gathering them would not overlap them. The gain is that other requests
+proceed while they wait. Bodies, error responses, ETags and
+the journal cache behave as in the DRF views. Other methods, ?expand= and the browsable API
+fall through to the DRF view that backend.urls routes the request to.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, HttpResponse
+from django.urls import resolve
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .analytics import atrade_stats
+from .cache import amemoize_for_user, cache_requests, conditional_headers, journal_cache, response_key
+from .models import UserStats
+from .renderers import ORJSONRenderer
+from .views import CompletedTradeViewSet, DashboardView, OpenPositionViewSet, UserViewSet, trade_filters
+
+User = get_user_model()
+
+renderer = ORJSONRenderer()
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(renderer.render(data), status=status, headers=headers, content_type=renderer.media_type)
+
+
+async def fetch(queryset):
+    return [row async for row in queryset]
+
+
+class AsyncReadView(View):
+    """A GET-only async view with the DRF views' JWT authentication, JSON and error bodies."""
+    cache_resource = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True  # as for APIView; writes fall through to DRF, which checks its own
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or self.falls_through(request):
+            return await self.fall_through(request)
+        try:
+            request.user = await self.authenticate(request)
+            return await self.get(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            return self.error_response(request, exc)
+
+    @staticmethod
+    def falls_through(request):
+        """Whether the request wants something only the DRF view renders."""
+        return request.GET.get('format', 'json') != 'json' or 'text/html' in request.headers.get('Accept', '')
+
+    @staticmethod
+    async def fall_through(request):
+        match = resolve(request.path_info, urlconf=settings.ROOT_URLCONF)
+        return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+
+    @staticmethod
+    async def authenticate(request):
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        if result is None:
+            raise NotAuthenticated()
+        return result[0]
+
+    @staticmethod
+    def error_response(request, exc):
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            exc.auth_header = JWTAuthentication().authenticate_header(request)
+        response = exception_handler(exc, {})
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+        return json_response(response.data, status=response.status_code, headers=headers)
+
+    async def conditional_response(self, request, build):
+        """ConditionalGetMixin.conditional_response() for a coroutine function ``build``."""
+        user = request.user
+        if user.is_superuser:
+            return await build()
+
+        headers, not_modified = await sync_to_async(conditional_headers)(request, user.id, self.cache_resource)
+        if not_modified:
+            return HttpResponse(status=304, headers=headers)
+
+        response = await build()
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    async def cached_response(self, request, action, build):
+        """CachedResponseMixin.cached_response() for a coroutine function returning the data."""
+        user = request.user
+        if user.is_superuser:
+            return json_response(await build())
+
+        key = await sync_to_async(response_key)(request, user.id, self.cache_resource, action)
+        cache = journal_cache()
+        data = await cache.aget(key)
+        if data is not None:
+            cache_requests.inc(resource=self.cache_resource, result="hit")
+            return json_response(data, headers={'X-Cache': "HIT"})
+
+        cache_requests.inc(resource=self.cache_resource, result="miss")
+        data = await build()
+        await cache.aset(key, data, settings.JOURNAL_CACHE_TIMEOUT)
+        return json_response(data, headers={'X-Cache': "MISS"})
+
+
+class AsyncDashboardView(AsyncReadView):
+    """DashboardView on the async ORM; its four queries don't block the loop but still run in turn."""
+    cache_resource = DashboardView.cache_resource
+
+    async def get(self, request):
+        user = request.user
+        return await self.conditional_response(request, lambda: self.memoized(user))
+
+    async def memoized(self, user):
+        return json_response(await amemoize_for_user(user.id, 'dashboard', {}, lambda: self.build(user)))
+
+    @staticmethod
+    async def build(user):
+        users, deposits, trades, positions = [await fetch(queryset) for queryset in DashboardView.querysets(user)]
+        user = users[0]
+        try:
+            user.stats
+        except UserStats.DoesNotExist:
+            user.stats = await sync_to_async(UserStats.rebuild)(user)
+        return DashboardView.render(user, deposits, trades, positions)
+
+
+class AsyncUserStatsView(AsyncReadView):
+    """UserViewSet.stats on the async ORM: the user lookup and trade aggregate run in turn."""
+    cache_resource = UserViewSet.cache_resource
+
+    async def get(self, request, pk):
+        return await self.conditional_response(request, lambda: self.build(request, pk))
+
+    async def build(self, request, pk):
+        if not pk.isdigit():
+            raise Http404()
+        pk = int(pk)
+        filters, error = trade_filters(request.GET)
+        if error:
+            await self.check_user(request.user, pk)
+            return json_response({"error": error}, status=400)
+        await self.check_user(request.user, pk)
+        return json_response(await atrade_stats(pk, **filters))
+
+    @staticmethod
+    async def check_user(user, pk):
+        """Raises Http404 unless ``user`` may see user ``pk``, as UserViewSet.get_object() does."""
+        if pk != user.pk and not (user.is_superuser and await User.objects.filter(pk=pk).aexists()):
+            raise Http404(f"No {User._meta.object_name} matches the given query.")
+
+
+class AsyncListView(AsyncReadView):
+    """Runs a ValuesListMixin viewset's list through its alist()."""
+    viewset = None
+
+    async def get(self, request):
+        view = self.viewset(request=Request(request), args=(), kwargs={}, action='list', format_kwarg=None)
+        view.request.user = request.user
+        return await self.conditional_response(
+            request, lambda: self.cached_response(request, 'list', view.alist))
+
+    @staticmethod
+    def falls_through(request):
+        return 'expand' in request.GET or AsyncReadView.falls_through(request)
+
+
+class AsyncCompletedTradeListView(AsyncListView):
+    viewset = CompletedTradeViewSet
+    cache_resource = CompletedTradeViewSet.cache_resource
+
+
+class AsyncOpenPositionListView(AsyncListView):
+    viewset = OpenPositionViewSet
+    cache_resource = OpenPositionViewSet.cache_resource
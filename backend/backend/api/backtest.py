@@ -0,0 +1,168 @@
+"""What-if position sizing: replays closed trades under alternative sizing rules.
+
+Each trade is reduced to its return on the capital it tied up (net P/L / (quantity x open
+price)); a sizing rule decides what fraction of current equity goes into each trade, and which
+trades are taken at all. Pure NumPy with no Django imports, so chunks of a parameter grid can
+be evaluated in spawned worker processes that read the trades from one shared-memory block.
+"""
+import heapq
+import itertools
+from multiprocessing import shared_memory
+
+import numpy as np
+
+RULES = {
+    # rule: its parameter, the allowed range and the accepted types
+    'fixed_fractional': ('fraction', 0.0001, 1, (int, float)),  # share of equity put into each trade
+    'fixed_risk': ('risk', 0.0001, 0.5, (int, float)),          # share of equity lost on an average losing trade
+    'kelly': ('multiplier', 0.01, 2, (int, float)),             # multiple of the full-Kelly fraction
+    'max_concurrent': ('positions', 1, 100, (int,)),            # equal slots; trades that find none free are skipped
+}
+# Trade matrix rows, one column per trade in close order.
+RETURN, DURATION, OPEN_DAY, CLOSE_DAY = range(4)
+TRADE_ROWS = 4
+# Upper bound on combinations x trades held in one equity matrix (8 bytes per cell).
+MAX_BATCH_CELLS = 4_000_000
+CURVE_POINTS = 100
+
+
+def expand_grid(grid):
+    """Turns ``{rule: {param: value or [values]}}`` into a list of (rule, value) combinations."""
+    combinations = []
+    for rule, params in grid.items():
+        name = RULES[rule][0]
+        values = params[name] if isinstance(params[name], (list, tuple)) else [params[name]]
+        combinations += [(rule, value) for value in values]
+    return combinations
+
+
+def trade_matrix(returns, durations, open_days, close_days):
+    trades = np.empty((TRADE_ROWS, returns.size), dtype=np.float64)
+    trades[RETURN], trades[DURATION] = returns, durations
+    trades[OPEN_DAY], trades[CLOSE_DAY] = open_days, close_days
+    return trades
+
+
+def sizing_constants(returns):
+    """Average losing return (1R for fixed_risk) and the full-Kelly fraction of the history."""
+    wins, losses = returns[returns > 0], returns[returns < 0]
+    average_loss = float(-losses.mean()) if losses.size else 0.0
+    if not wins.size or not losses.size:
+        return average_loss, 1.0 if not losses.size else 0.0
+    win_rate = wins.size / (wins.size + losses.size)
+    payoff = float(wins.mean()) / average_loss
+    return average_loss, max(0.0, win_rate - (1 - win_rate) / payoff)
+
+
+def evaluate(trades, starting_balance, combinations, executor=None, workers=1):
+    """Evaluates every combination; large grids are spread over ``executor`` via shared memory."""
+    count = trades.shape[1]
+    per_chunk = max(1, MAX_BATCH_CELLS // max(count, 1))
+    if executor is not None:
+        # Smaller chunks so every worker gets a share of the grid.
+        per_chunk = max(1, min(per_chunk, -(-len(combinations) // workers)))
+    chunks = [combinations[start:start + per_chunk] for start in range(0, len(combinations), per_chunk)]
+    constants = sizing_constants(trades[RETURN])
+
+    if executor is None:
+        return list(itertools.chain.from_iterable(
+            _evaluate_chunk(trades, starting_balance, chunk, constants) for chunk in chunks))
+
+    block = shared_memory.SharedMemory(create=True, size=trades.nbytes)
+    try:
+        np.ndarray(trades.shape, dtype=trades.dtype, buffer=block.buf)[:] = trades
+        results = executor.map(evaluate_shared, itertools.repeat(block.name), itertools.repeat(trades.shape),
+                               itertools.repeat(starting_balance), chunks, itertools.repeat(constants))
+        return list(itertools.chain.from_iterable(results))
+    finally:
+        block.close()
+        block.unlink()
+
+
+def evaluate_shared(block_name, shape, starting_balance, combinations, constants):
+    """Worker entry point: reads the trades from the parent's shared-memory block without copying."""
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        return _evaluate_chunk(np.ndarray(shape, dtype=np.float64, buffer=block.buf), starting_balance,
+                               combinations, constants)
+    finally:
+        block.close()
+
+
+def _evaluate_chunk(trades, starting_balance, combinations, constants):
+    average_loss, kelly_fraction = constants
+    returns = trades[RETURN]
+    fractions = np.empty(len(combinations))
+    taken = np.ones((len(combinations), returns.size), dtype=bool)
+    for index, (rule, value) in enumerate(combinations):
+        if rule == 'fixed_fractional':
+            fractions[index] = value
+        elif rule == 'fixed_risk':
+            fractions[index] = value / average_loss if average_loss else 0.0
+        elif rule == 'kelly':
+            fractions[index] = value * kelly_fraction
+        else:
+            fractions[index] = 1 / value
+            taken[index] = concurrent_mask(trades[OPEN_DAY], trades[CLOSE_DAY], value)
+
+    # Equity compounds trade by trade; a trade can lose at most the capital it was given.
+    growth = np.maximum(1 + fractions[:, None] * returns * taken, 0)
+    equity = starting_balance * np.cumprod(growth, axis=1)
+    pnl = np.diff(equity, axis=1, prepend=starting_balance)
+    stats = _stats(equity, pnl, taken, trades[DURATION], starting_balance)
+
+    points = curve_points(returns.size)
+    return [dict(rule=rule, parameter=RULES[rule][0], value=value,
+                 **{name: column[index] for name, column in stats.items()},
+                 equity_curve=[round(float(point), 2) for point in equity[index, points]])
+            for index, (rule, value) in enumerate(combinations)]
+
+
+def curve_points(count):
+    """Indexes of the trades at which the returned equity curves are sampled."""
+    return np.unique(np.linspace(0, count - 1, min(CURVE_POINTS, count)).astype(int))
+
+
+def concurrent_mask(open_days, close_days, positions):
+    """Marks the trades taken when at most ``positions`` may be open at once, in order of opening."""
+    taken = np.zeros(open_days.size, dtype=bool)
+    open_until = []
+    for index in np.argsort(open_days, kind='stable'):
+        while open_until and open_until[0] < open_days[index]:
+            heapq.heappop(open_until)
+        if len(open_until) < positions:
+            heapq.heappush(open_until, close_days[index])
+            taken[index] = True
+    return taken
+
+
+def _stats(equity, pnl, taken, durations, starting_balance):
+    """Per-combination results, named like the CustomUser statistics they mirror."""
+    trades_taken = taken.sum(axis=1)
+    wins = ((pnl > 0) & taken).sum(axis=1)
+    gross_profit = np.where(pnl > 0, pnl, 0).sum(axis=1)
+    gross_loss = np.where(pnl < 0, pnl, 0).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(trades_taken > 0, wins / trades_taken * 100, 0)
+        profit_factor = np.where(gross_loss < 0, gross_profit / -gross_loss, 0)
+        average_profit_loss = np.where(trades_taken > 0, pnl.sum(axis=1) / trades_taken, 0)
+        average_holding_duration = np.where(trades_taken > 0, (durations * taken).sum(axis=1) / trades_taken, 0)
+    peaks = np.maximum(np.maximum.accumulate(equity, axis=1), starting_balance)
+    drawdowns = peaks - equity
+    trough = drawdowns.argmax(axis=1)
+    rows = np.arange(equity.shape[0])
+    max_drawdown = drawdowns[rows, trough]
+    max_drawdown_pct = max_drawdown / peaks[rows, trough] * 100
+
+    final_equity = equity[:, -1]
+    return {
+        'final_equity': [round(float(value), 2) for value in final_equity],
+        'return_pct': [round(float(value), 2) for value in (final_equity / starting_balance - 1) * 100],
+        'max_drawdown': [round(float(value), 2) for value in max_drawdown],
+        'max_drawdown_pct': [round(float(value), 2) for value in max_drawdown_pct],
+        'completed_trades': [int(value) for value in trades_taken],
+        'win_rate': [round(float(value), 2) for value in win_rate],
+        'profit_factor': [round(float(value), 2) for value in profit_factor],
+        'average_profit_loss': [round(float(value), 2) for value in average_profit_loss],
+        'average_holding_duration': [round(float(value), 2) for value in average_holding_duration],
+    }
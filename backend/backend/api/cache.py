@@ -0,0 +1,185 @@
+"""Per-user response cache and conditional GET support keyed by (user, resource, version).
+
+Every write to a user's journal bumps that user's version counter (see api.signals), so cached
+responses are never invalidated one by one: readers simply stop asking for the old keys and
+the cache backend ages them out.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+cache_requests = metrics.registry.counter(
+    "journal_cache_requests_total", "Response cache lookups, by resource and result (hit or miss).")
+
+
+def journal_cache():
+    return caches[settings.JOURNAL_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f"journal:version:{user_id}"
+
+
+def _modified_key(user_id):
+    return f"journal:modified:{user_id}"
+
+
+def get_version(user_id):
+    """Returns the user's current change version, creating it if the cache lost it."""
+    cache = journal_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Seed from the clock so a counter that was evicted never reuses an old version number.
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def bump_version(user_id):
+    cache = journal_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+    cache.set(_modified_key(user_id), int(time.time()), timeout=None)
+
+
+def get_last_modified(user_id):
+    """Unix time of the user's last journal change (or of the first time we were asked)."""
+    cache = journal_cache()
+    modified = cache.get(_modified_key(user_id))
+    if modified is None:
+        cache.add(_modified_key(user_id), int(time.time()), timeout=None)
+        modified = cache.get(_modified_key(user_id))
+    return modified
+
+
+def memo_key(user_id, name, params):
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"journal:memo:{user_id}:{name}:{get_version(user_id)}:{digest}"
+
+
+def memoize_for_user(user_id, name, params, compute):
+    """Returns compute(), reusing the stored result until the user's journal changes."""
+    key = memo_key(user_id, name, params)
+    cache = journal_cache()
+    result = cache.get(key)
+    if result is not None:
+        cache_requests.inc(resource=name, result="hit")
+        return result
+    cache_requests.inc(resource=name, result="miss")
+    result = compute()
+    cache.set(key, result, settings.JOURNAL_CACHE_TIMEOUT)
+    return result
+
+
+async def amemoize_for_user(user_id, name, params, compute):
+    """memoize_for_user() for async views; ``compute`` is a coroutine function."""
+    key = await sync_to_async(memo_key)(user_id, name, params)
+    cache = journal_cache()
+    result = await cache.aget(key)
+    if result is not None:
+        cache_requests.inc(resource=name, result="hit")
+        return result
+    cache_requests.inc(resource=name, result="miss")
+    result = await compute()
+    await cache.aset(key, result, settings.JOURNAL_CACHE_TIMEOUT)
+    return result
+
+
+def conditional_headers(request, user_id, resource):
+    """Returns the validators for the user's resource and whether the request already has them.
+
+    The ETag is derived from the user's version and the request path, so a match is
+    known before any query or serializer runs.
+    """
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()[:16]
+    etag = f'W/"{resource}-{user_id}-{get_version(user_id)}-{path}"'
+    last_modified = get_last_modified(user_id)
+    headers = {'ETag': etag, 'Last-Modified': http_date(last_modified), 'Cache-Control': "private, no-cache"}
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return headers, etag in parse_etags(if_none_match) or if_none_match.strip() == "*"
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ""))
+    return headers, if_modified_since is not None and last_modified <= if_modified_since
+
+
+def response_key(request, user_id, resource, action):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"journal:response:{user_id}:{resource}:{get_version(user_id)}:{action}:{path}"
+
+
+class ConditionalGetMixin:
+    """Answers If-None-Match / If-Modified-Since from the user's change version.
+
+    See conditional_headers(). Superusers are skipped for the same reason as in
+    CachedResponseMixin.
+    """
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request,
+                                         lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request,
+                                         lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+    def conditional_response(self, request, build):
+        user = request.user
+        if user.is_superuser:
+            return build()
+
+        headers, not_modified = conditional_headers(request, user.id, self.cache_resource)
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = build()
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+
+class CachedResponseMixin:
+    """Serves list/retrieve responses from the journal cache.
+
+    Superusers see other users' rows, which one user's version cannot describe, so their
+    requests always go to the database.
+    """
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request,
+                                    lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def cached_response(self, request, build):
+        user = request.user
+        if user.is_superuser:
+            return build()
+
+        key = response_key(request, user.id, self.cache_resource, self.action)
+        cache = journal_cache()
+        data = cache.get(key)
+        if data is not None:
+            cache_requests.inc(resource=self.cache_resource, result="hit")
+            return Response(data, headers={'X-Cache': "HIT"})
+
+        cache_requests.inc(resource=self.cache_resource, result="miss")
+        response = build()
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.JOURNAL_CACHE_TIMEOUT)
+        response['X-Cache'] = "MISS"
+        return response
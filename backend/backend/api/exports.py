@@ -0,0 +1,163 @@
+"""Streaming journal exports as CSV, JSON Lines or (with pyarrow installed) Parquet.
+
+Rows come straight from ``values_list()`` over ``iterator()``, so no model instances or
+serializers are built and memory stays flat however large the journal is.
+"""
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    'csv': "text/csv",
+    'jsonl': "application/x-ndjson",
+    'parquet': "application/vnd.apache.parquet",
+}
+EXPORT_CHUNK_SIZE = 2000
+STREAM_BUFFER_SIZE = 64 * 1024
+PARQUET_ROW_GROUP_SIZE = 20000
+
+
+class ExportMixin:
+    """Adds ``GET <list url>/export/<csv|jsonl|parquet>/`` to a viewset.
+
+    ``export_fields`` maps output columns to lookups. The view's filter backends apply, so
+    exports take the same ?symbol=&from=&to= filters as the list.
+    """
+    export_fields = {}
+    export_name = None
+
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<export_format>csv|jsonl|parquet)')
+    def export(self, request, export_format=None):
+        if export_format == 'parquet' and pyarrow is None:
+            return Response({"error": "Parquet export needs pyarrow installed on the server."}, status=400)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        cursor_field = getattr(self, 'cursor_field', None)
+        ordering = [cursor_field, 'id'] if cursor_field else ['id']
+        rows = queryset.order_by(*ordering).values_list(*self.export_fields.values()) \
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        columns = list(self.export_fields)
+
+        if export_format == 'csv':
+            content = stream_csv(columns, rows)
+        elif export_format == 'jsonl':
+            content = stream_jsonl(columns, rows)
+        else:
+            content = stream_parquet(columns, rows, parquet_schema(queryset.model, self.export_fields))
+
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+        filename = f"{self.export_name}-{timezone.localdate():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+def stream_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_jsonl(columns, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    lines = []
+    size = 0
+    for row in rows:
+        line = encoder.encode(dict(zip(columns, row)))
+        lines.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines, size = [], 0
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands whatever was written since the last drain() to the response."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(columns, rows, schema):
+    """Writes one Parquet row group per PARQUET_ROW_GROUP_SIZE rows and streams each as it is finished."""
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+            writer.write_table(_parquet_table(columns, batch, schema))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_table(_parquet_table(columns, batch, schema))
+    writer.close()
+    yield sink.drain()
+
+
+def _parquet_table(columns, batch, schema):
+    return pyarrow.Table.from_arrays([pyarrow.array(values, type=schema.field(name).type)
+                                      for name, values in zip(columns, zip(*batch))], schema=schema)
+
+
+def parquet_schema(model, export_fields):
+    return pyarrow.schema([(name, _arrow_type(_resolve_field(model, lookup)))
+                           for name, lookup in export_fields.items()])
+
+
+def _resolve_field(model, lookup):
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _arrow_type(field):
+    if isinstance(field, models.ForeignKey):
+        field = field.target_field
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pyarrow.int64()
+    return pyarrow.string()
@@ -0,0 +1,60 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .analytics import ORDER_TYPES, parse_date
+
+ORDER_STATUSES = ("open", "closed")
+OUTCOMES = {
+    'profitable': 'gt',
+    'losing': 'lt',
+}
+
+
+class JournalFilterBackend(BaseFilterBackend):
+    """Applies the journal query-parameter filters a viewset declares.
+
+    Views set ``filter_fields`` (query param -> lookup path for symbol, status
+    and order_type), ``date_filter_field`` for ?from=&to= and, for completed
+    trades, ``outcome_filter_field`` for ?outcome=profitable|losing. ?symbol=
+    matches the whole symbol, case-insensitively, as the stats endpoints do.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        fields = getattr(view, 'filter_fields', {})
+
+        if 'symbol' in fields and params.get('symbol'):
+            queryset = queryset.filter(**{fields['symbol']: params['symbol'].upper()})
+        if 'status' in fields and params.get('status'):
+            queryset = queryset.filter(**{fields['status']: self.choice(params, 'status', ORDER_STATUSES)})
+        if 'order_type' in fields and params.get('order_type'):
+            queryset = queryset.filter(**{fields['order_type']: self.choice(params, 'order_type', ORDER_TYPES)})
+
+        date_field = getattr(view, 'date_filter_field', None)
+        if date_field:
+            date_from, date_to = self.date(params, 'from'), self.date(params, 'to')
+            if date_from:
+                queryset = queryset.filter(**{f"{date_field}__gte": date_from})
+            if date_to:
+                queryset = queryset.filter(**{f"{date_field}__lte": date_to})
+
+        outcome_field = getattr(view, 'outcome_filter_field', None)
+        if outcome_field and params.get('outcome'):
+            lookup = OUTCOMES[self.choice(params, 'outcome', OUTCOMES)]
+            queryset = queryset.filter(**{f"{outcome_field}__{lookup}": 0})
+
+        return queryset
+
+    @staticmethod
+    def choice(params, name, choices):
+        value = params[name]
+        if value not in choices:
+            raise ValidationError({"error": f"{name} must be one of: {', '.join(choices)}."})
+        return value
+
+    @staticmethod
+    def date(params, name):
+        try:
+            return parse_date(params.get(name))
+        except ValueError:
+            raise ValidationError({"error": f"{name} must be a date in YYYY-MM-DD format."})
@@ -0,0 +1,177 @@
+"""Streaming bulk import of orders from broker statements (CSV or JSON Lines).
+
+Rows are parsed one at a time from the upload and written in chunks: one bulk INSERT for new
+stocks, one for orders and one upsert for the net open-position change of every symbol in
+the chunk, so the cost per row is a fraction of a POST /api/orders/.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .analytics import ORDER_TYPES
+from .cache import bump_version
+from .models import OpenPosition, Order, Stock, UserStats
+
+IMPORT_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+}
+REQUIRED_COLUMNS = ('symbol', 'date', 'quantity', 'price', 'order_type')
+IMPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+MAX_PRICE = Decimal("99999999.99")  # Order.price is DECIMAL(10, 2)
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole cannot be read (unknown format, missing columns)."""
+
+
+def upload_format(upload):
+    extension = os.path.splitext(upload.name or "")[1].lower()
+    file_format = IMPORT_FORMATS.get(extension) or IMPORT_CONTENT_TYPES.get(upload.content_type)
+    if file_format is None:
+        raise ImportFormatError("Upload a .csv or .jsonl file.")
+    return file_format
+
+
+def read_order_records(upload):
+    """Yields ``(line, record, error)`` for every row of the upload without loading it whole."""
+    text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    if upload_format(upload) == 'csv':
+        return _read_csv(text)
+    return _read_jsonl(text)
+
+
+def _read_csv(text):
+    reader = csv.DictReader(text)
+    columns = [name.strip().lower() for name in reader.fieldnames or ()]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing CSV columns: {', '.join(missing)}.")
+    reader.fieldnames = columns
+    for record in reader:
+        yield reader.line_num, record, None
+
+
+def _read_jsonl(text):
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            yield line, None, {'row': "Invalid JSON."}
+            continue
+        if not isinstance(record, dict):
+            yield line, None, {'row': "Each line must be a JSON object."}
+            continue
+        yield line, record, None
+
+
+def validate_order(record):
+    """Returns (values, errors) for one raw row; values is None when the row is invalid."""
+    errors = {}
+    values = {}
+
+    symbol = str(record.get('symbol') or "").strip().upper()
+    if not symbol or len(symbol) > 10:
+        errors['symbol'] = "A symbol of 1 to 10 characters is required."
+    values['symbol'] = symbol
+
+    try:
+        values['date'] = date.fromisoformat(str(record.get('date') or "").strip())
+    except ValueError:
+        errors['date'] = "Date must be in YYYY-MM-DD format."
+
+    try:
+        values['quantity'] = int(str(record.get('quantity') or "").strip())
+        if values['quantity'] <= 0:
+            raise ValueError
+    except ValueError:
+        errors['quantity'] = "Quantity must be a positive whole number."
+
+    try:
+        price = Decimal(str(record.get('price') or "").strip())
+        if not price.is_finite() or price <= 0 or price > MAX_PRICE or price != price.quantize(Decimal("0.01")):
+            raise InvalidOperation
+        values['price'] = price
+    except InvalidOperation:
+        errors['price'] = "Price must be a positive amount with at most 2 decimal places."
+
+    order_type = str(record.get('order_type') or "").strip().lower()
+    if order_type not in ORDER_TYPES:
+        errors['order_type'] = f"order_type must be one of: {', '.join(ORDER_TYPES)}."
+    values['order_type'] = order_type
+
+    comment = record.get('comment')
+    values['comment'] = str(comment) if comment else None
+    return (None, errors) if errors else (values, None)
+
+
+def import_orders(user, records, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validates and stores the records; returns the per-row report.
+
+    Each chunk commits on its own, so a large import holds no long transaction and valid rows
+    are kept even when others fail validation.
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+    stocks = {}
+    chunk = []
+
+    def fail(line, errors):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line, 'errors': errors})
+
+    for line, record, errors in records:
+        values = None
+        if errors is None:
+            values, errors = validate_order(record)
+        if errors:
+            fail(line, errors)
+            continue
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            report['imported'] += _import_chunk(user, chunk, stocks)
+            chunk = []
+    if chunk:
+        report['imported'] += _import_chunk(user, chunk, stocks)
+
+    report['errors_truncated'] = report['failed'] > len(report['errors'])
+    return report
+
+
+@transaction.atomic
+def _import_chunk(user, rows, stocks):
+    missing = {row['symbol'] for row in rows} - stocks.keys()
+    if missing:
+        Stock.objects.bulk_create([Stock(symbol=symbol) for symbol in missing], ignore_conflicts=True)
+        stocks.update(Stock.objects.in_bulk(missing, field_name='symbol'))
+
+    orders = []
+    deltas = {}
+    for row in rows:
+        stock_id = stocks[row['symbol']].pk
+        # Raw *_id assignment skips the related-object descriptors, a large share of per-row cost.
+        orders.append(Order(user_id=user.pk, stock_id=stock_id, date=row['date'], quantity=row['quantity'],
+                            price=row['price'], order_type=row['order_type'], comment=row['comment']))
+        quantity, value = deltas.get(stock_id, (0, Decimal("0.00")))
+        deltas[stock_id] = (quantity + row['quantity'], value + row['price'] * row['quantity'])
+
+    Order.objects.bulk_create(orders, batch_size=500)
+    OpenPosition.adjust_many(user, deltas)
+    UserStats.record_orders_created(user, count=len(orders))
+    # bulk_create and the position upsert send no post_save signals.
+    transaction.on_commit(lambda: bump_version(user.id))
+    return len(orders)
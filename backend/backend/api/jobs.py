@@ -0,0 +1,64 @@
+"""Runs SimulationJob rows in the background and stores their results."""
+import logging
+
+import numpy as np
+from django.db import close_old_connections, connection, transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import CompletedTrade, SimulationJob, UserStats
+from .simulation import simulate
+from .workers import job_pool, process_pool
+
+logger = logging.getLogger(__name__)
+
+# Jobs resampling more paths x trades than this are split across the process pool.
+PARALLEL_MIN_CELLS = 20_000_000
+ORPHANED_ERROR = "The server stopped before the job finished; submit it again."
+
+
+def submit(job):
+    """Queues the job once the transaction that created it commits."""
+    transaction.on_commit(lambda: job_pool().submit(run_job, job.id))
+
+
+def run_job(job_id):
+    close_old_connections()
+    try:
+        job = SimulationJob.objects.select_related('user').get(id=job_id)
+        SimulationJob.objects.filter(id=job_id).update(status="running", started_at=timezone.now())
+        result = RUNNERS[job.kind](job.user, job.parameters)
+        SimulationJob.objects.filter(id=job_id).update(status="done", result=result, finished_at=timezone.now())
+    except Exception as exc:
+        logger.exception("Simulation job %s failed", job_id)
+        SimulationJob.objects.filter(id=job_id).update(status="failed", error=str(exc), finished_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def fail_orphaned(created_before):
+    """Fails jobs created before ``created_before`` that are still pending or running.
+
+    The job pool lives in the server process, so jobs it held when the process stopped are never
+    picked up again. Returns how many jobs were failed.
+    """
+    return SimulationJob.objects.filter(status__in=("pending", "running"), created_at__lt=created_before).update(
+        status="failed", error=ORPHANED_ERROR, finished_at=timezone.now())
+
+
+def run_monte_carlo(user, parameters):
+    net = np.fromiter(CompletedTrade.objects.filter(initial_order__user=user)
+                      .values_list(Cast('net_amount', FloatField()), flat=True), dtype=np.float64)
+    if net.size == 0:
+        raise ValueError("There are no completed trades to resample.")
+    horizon = parameters.get('horizon') or min(net.size, 5000)
+    paths = parameters['paths']
+    executor = process_pool() if paths * horizon >= PARALLEL_MIN_CELLS else None
+    return simulate(net, float(UserStats.for_user(user).total_deposits), paths, horizon,
+                    parameters['ruin_fraction'], seed=parameters.get('seed'), executor=executor)
+
+
+RUNNERS = {
+    'monte_carlo': run_monte_carlo,
+}
@@ -0,0 +1,310 @@
+import itertools
+import json
+import math
+import subprocess
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, resolve
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import urls as api_urls
+from api.models import CompletedTrade, Deposit, OpenPosition, Order, PasswordResetOTP, SimulationJob
+from api.management.commands.seed_journal import SEED_PASSWORD
+from api.sync import encode_cursor
+
+User = get_user_model()
+
+
+def _post(context, path, data):
+    return context['client'].post(path, data, content_type="application/json", **context['auth'])
+
+
+def _open_order(context):
+    response = _post(context, "/api/orders/", {'symbol': "bench", 'quantity': 10, 'price': "100.00",
+                                               'date': (date.today() - timedelta(days=3)).isoformat(),
+                                               'order_type': "buy"})
+    return Order.objects.get(id=response.json()['id'])
+
+
+def _completed_trade(context):
+    order = _open_order(context)
+    _post(context, f"/api/orders/{order.id}/close/", {'close_price': "101.00", 'close_date': date.today().isoformat()})
+    return CompletedTrade.objects.get(initial_order=order)
+
+
+def _statement(context, rows=200):
+    lines = ["symbol,date,quantity,price,order_type,comment"]
+    lines += [f"bench{index % 10},{date.today().isoformat()},{index % 5 + 1},{10 + index % 50}.25,buy,"
+              for index in range(rows)]
+    return {'file': SimpleUploadedFile("statement.csv", "\n".join(lines).encode(), content_type="text/csv")}
+
+
+def _open_orders(context, count=20):
+    context['client'].post("/api/orders/import/", _statement(context, count), **context['auth'])
+    return list(Order.objects.filter(user=context['user'], status='open').order_by('-id')
+                .values_list('id', flat=True)[:count])
+
+
+_otp_codes = itertools.count(100000)
+
+
+def _otp(context):
+    otp = str(next(_otp_codes))
+    PasswordResetOTP.objects.create(user=context['user'], otp=otp)
+    return otp
+
+
+_balances = itertools.count(10000)
+
+
+def _backtest_sweep(context):
+    """A 1000-combination grid; a fresh starting balance each time keeps it out of the memo cache."""
+    return {'starting_balance': next(_balances), 'grid': {
+        'fixed_fractional': {'fraction': [round(0.001 * step, 4) for step in range(1, 501)]},
+        'fixed_risk': {'risk': [round(0.001 * step, 4) for step in range(1, 201)]},
+        'kelly': {'multiplier': [round(0.01 * step, 4) for step in range(1, 201)]},
+        'max_concurrent': {'positions': list(range(1, 101))},
+    }}
+
+
+# (name, method, path, body[, setup]). Path and body may be callables taking the run context;
+# the optional setup callable prepares per-iteration state outside the timed section.
+ROUTES = [
+    ('user-detail', 'get', lambda c: f"/api/users/{c['user'].id}/", None),
+    ('user-stats', 'get', lambda c: f"/api/users/{c['user'].id}/stats/", None),
+    ('user-list', 'get', "/api/users/", None),
+    ('order-list', 'get', "/api/orders/", None),
+    ('order-list-open', 'get', "/api/orders/?status=open", None),
+    ('order-detail', 'get', lambda c: f"/api/orders/{c['order'].id}/", None),
+    ('order-create', 'post', "/api/orders/", lambda c: {'symbol': "bench", 'quantity': 5, 'price': "10.00",
+                                                        'date': date.today().isoformat(), 'order_type': "buy"}),
+    ('order-update', 'patch', lambda c: f"/api/orders/{c['order'].id}/", lambda c: {'comment': "benchmark"}),
+    ('order-export-csv', 'get', "/api/orders/export/csv/", None),
+    ('order-export-jsonl', 'get', "/api/orders/export/jsonl/", None),
+    ('order-close', 'post', lambda c: f"/api/orders/{c['setup'].id}/close/",
+     lambda c: {'close_price': "105.00", 'close_date': date.today().isoformat()}, _open_order),
+    ('order-close-batch', 'post', "/api/orders/close-batch/",
+     lambda c: [{'order_id': order_id, 'close_price': "12.00", 'close_date': date.today().isoformat()}
+                for order_id in c['setup']], _open_orders),
+    ('order-import', 'post', "/api/orders/import/", _statement),
+    ('order-delete', 'delete', lambda c: f"/api/orders/{c['setup'].id}/", None, _open_order),
+    ('completed-trade-list', 'get', "/api/completed-trades/", None),
+    ('completed-trade-detail', 'get', lambda c: f"/api/completed-trades/{c['trade'].id}/", None),
+    ('completed-trade-update', 'patch', lambda c: f"/api/completed-trades/{c['trade'].id}/",
+     lambda c: {'note': "benchmark"}),
+    ('completed-trade-delete', 'delete', lambda c: f"/api/completed-trades/{c['setup'].id}/", None,
+     _completed_trade),
+    ('completed-trade-export-csv', 'get', "/api/completed-trades/export/csv/", None),
+    ('open-position-list', 'get', "/api/open-positions/", None),
+    ('open-position-detail', 'get', lambda c: f"/api/open-positions/{c['position'].id}/", None),
+    ('deposit-list', 'get', "/api/deposits/", None),
+    ('deposit-export-csv', 'get', "/api/deposits/export/csv/", None),
+    ('deposit-create', 'post', "/api/deposits/", lambda c: {'amount': "100.00"}),
+    ('deposit-detail', 'get', lambda c: f"/api/deposits/{c['deposit'].id}/", None),
+    ('token-obtain', 'post', "/api/token/", lambda c: {'username': c['user'].username, 'password': SEED_PASSWORD}),
+    ('token-refresh', 'post', "/api/token/refresh/",
+     lambda c: {'refresh': str(RefreshToken.for_user(c['user']))}),
+    ('token-verify', 'post', "/api/token/verify/", lambda c: {'token': c['token']}),
+    ('register', 'post', "/auth/register/", lambda c: {'username': f"bench-{time.perf_counter_ns()}",
+                                                       'email': f"bench-{time.perf_counter_ns()}@example.com",
+                                                       'password': SEED_PASSWORD}),
+    ('login', 'post', "/auth/login/", lambda c: {'email': c['user'].email, 'password': SEED_PASSWORD}),
+    ('logout', 'post', "/auth/logout/", lambda c: {'refresh': str(RefreshToken.for_user(c['user']))}),
+    ('forgot-password', 'post', "/auth/forgot-password/", lambda c: {'email': c['user'].email}),
+    ('verify-otp', 'post', "/auth/verify-otp/", lambda c: {'email': c['user'].email, 'otp': c['setup']}, _otp),
+    ('reset-password', 'post', "/auth/reset-password/",
+     lambda c: {'email': c['user'].email, 'otp': c['setup'], 'new_password': SEED_PASSWORD}, _otp),
+    ('dashboard', 'get', "/api/dashboard/", None),
+    ('sync-full', 'get', "/api/sync/", None),
+    ('sync-delta', 'get', lambda c: f"/api/sync/?since={encode_cursor(timezone.now())}", None),
+    ('analytics-risk', 'get', "/api/analytics/risk/", None),
+    ('analytics-backtest', 'post', "/api/analytics/backtest/", _backtest_sweep),
+    ('analytics-by-symbol', 'get', "/api/analytics/by-symbol/?sort=-trades&limit=20", None),
+    ('pnl-daily', 'get', "/api/pnl/daily/", None),
+    ('pnl-weekly', 'get', "/api/pnl/weekly/", None),
+    ('pnl-monthly', 'get', "/api/pnl/monthly/", None),
+    ('simulation-create', 'post', "/api/simulations/", lambda c: {'paths': 1000}),
+    ('simulation-list', 'get', "/api/simulations/", None),
+    ('simulation-detail', 'get', lambda c: f"/api/simulations/{c['simulation'].id}/", None),
+    ('metrics', 'get', "/metrics", None),
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+class Command(BaseCommand):
+    help = ("Times every API route through the Django test client and reports p50/p95/p99 latency, "
+            "query count and response size. All writes are rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to benchmark as (defaults to the user with the most orders).")
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', action='append', help="Only run the named route (can be repeated).")
+        parser.add_argument('--output', help="Write the JSON results to this file.")
+        parser.add_argument('--compare', help="Previous JSON results to diff against.")
+        parser.add_argument('--accept-encoding', default="",
+                            help="Accept-Encoding header to send, e.g. 'gzip' or 'br'; bytes are then as sent.")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        routes = [route for route in ROUTES if not options['only'] or route[0] in options['only']]
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'), transaction.atomic():
+            context = self.build_context(user, options['accept_encoding'])
+            results = {route[0]: self.run_route(route, context, options) for route in routes}
+            if not options['only']:
+                self.report_uncovered_routes(results)
+            transaction.set_rollback(True)
+
+        report = {
+            'commit': self.current_commit(),
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'accept_encoding': options['accept_encoding'],
+            'dataset': {
+                'user': user.username,
+                'orders': Order.objects.filter(user=user).count(),
+                'completed_trades': CompletedTrade.objects.filter(initial_order__user=user).count(),
+                'deposits': Deposit.objects.filter(user=user).count(),
+            },
+            'routes': results,
+        }
+        self.print_report(report, self.load(options['compare']) if options['compare'] else None)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+        user = User.objects.annotate(order_count=Count('orders')).filter(order_count__gt=0) \
+            .order_by('-order_count').first()
+        if user is None:
+            raise CommandError("No user with orders found; run seed_journal first.")
+        return user
+
+    def build_context(self, user, accept_encoding=""):
+        token = str(RefreshToken.for_user(user).access_token)
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {token}"}
+        if accept_encoding:
+            headers['HTTP_ACCEPT_ENCODING'] = accept_encoding
+        context = {
+            'user': user,
+            'token': token,
+            'auth': headers,
+            'client': Client(SERVER_NAME='localhost'),
+        }
+        context['order'] = _open_order(context)
+        context['trade'] = _completed_trade(context)
+        context['position'] = OpenPosition.objects.get(user=user, stock=context['order'].stock)
+        context['deposit'] = Deposit.objects.create(user=user, amount="10.00")
+        context['simulation'] = SimulationJob.objects.create(user=user, parameters={'paths': 1000})
+        return context
+
+    def run_route(self, route, context, options):
+        name, method, path, body = route[:4]
+        setup = route[4] if len(route) > 4 else None
+        client = context['client']
+        timings, queries, sizes, statuses = [], [], [], set()
+
+        for iteration in range(options['warmup'] + options['iterations']):
+            context['setup'] = setup(context) if setup else None
+            url = path(context) if callable(path) else path
+            data = body(context) if callable(body) else body
+            if isinstance(data, dict) and any(isinstance(value, File) for value in data.values()):
+                kwargs = {'data': data}  # multipart upload
+            elif data is not None:
+                kwargs = {'content_type': "application/json", 'data': json.dumps(data)}
+            else:
+                kwargs = {}
+
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, **kwargs, **context['auth'])
+                content = b"".join(response.streaming_content) if response.streaming else response.content
+                elapsed = (time.perf_counter() - start) * 1000
+
+            if iteration >= options['warmup']:
+                timings.append(elapsed)
+                queries.append(len(captured))
+                sizes.append(len(content))
+                statuses.add(response.status_code)
+
+        timings.sort()
+        return {
+            'method': method.upper(),
+            'path': path if isinstance(path, str) else path(context),
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+
+    def report_uncovered_routes(self, results):
+        """Warns about routes in api/urls.py that have no entry in ROUTES."""
+        covered = {resolve(result['path'].split('?')[0]).url_name for result in results.values()}
+        for name in sorted(set(url_names(api_urls.urlpatterns)) - covered - {'api-root'}):
+            self.stdout.write(self.style.WARNING(f"Route {name!r} is not benchmarked"))
+
+    def print_report(self, report, previous=None):
+        dataset = report['dataset']
+        self.stdout.write(f"{dataset['user']}: {dataset['orders']} orders, {dataset['completed_trades']} "
+                          f"completed trades, {dataset['deposits']} deposits ({report['database']})")
+        header = f"{'route':<26}{'status':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>9}{'bytes':>11}"
+        self.stdout.write(header + ("   p95 / queries / bytes vs previous" if previous else ""))
+        for name, result in report['routes'].items():
+            line = (f"{name:<26}{','.join(map(str, result['status'])):>10}{result['p50_ms']:>10.2f}"
+                    f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['queries']:>9}{result['bytes']:>11}")
+            old = previous['routes'].get(name) if previous else None
+            if old:
+                change = (result['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+                size = (result['bytes'] - old['bytes']) / old['bytes'] * 100 if old['bytes'] else 0
+                line += f"   {change:+.0f}% / {result['queries'] - old['queries']:+d} / {size:+.0f}%"
+            self.stdout.write(line)
+
+    @staticmethod
+    def load(path):
+        with open(path) as fh:
+            return json.load(fh)
+
+    @staticmethod
+    def current_commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,187 @@
+import asyncio
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.management.commands.benchmark_api import Command as BenchmarkCommand, percentile
+
+
+class ThreadSampler:
+    """Polls threading.active_count() in the background and keeps the peak."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    @contextmanager
+    def sampling(self):
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            thread.join()
+
+
+def wsgi_get(application, path, headers):
+    path, _, query = path.partition('?')
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': "localhost",
+               'REMOTE_ADDR': "127.0.0.1", 'wsgi.input': io.BytesIO()}
+    environ.update({f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()})
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+    try:
+        size = sum(len(chunk) for chunk in response)
+    finally:
+        response.close()
+    return int(statuses[0].split()[0]), size
+
+
+async def asgi_get(application, path, headers):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b"localhost")] + [(name.lower().encode(), value.encode())
+                                                for name, value in headers.items()],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    pending = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    finished = asyncio.Event()
+    status, size = None, 0
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status, size
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            size += len(message.get('body', b''))
+
+    await application(scope, receive, send)
+    finished.set()
+    return status, size
+
+
+class Command(BenchmarkCommand):
+    help = ("Loads a GET route many times at once through backend/wsgi.py (on a thread pool, as a threaded "
+            "WSGI server would) and through backend/asgi.py (on one event loop, as a single uvicorn worker "
+            "would), and compares throughput, latency and the threads each needed. Both applications run "
+            "in this process, so the numbers leave out the servers themselves.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to load as (defaults to the user with the most orders).")
+        parser.add_argument('--path', default="/api/dashboard/")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once.")
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--no-cache', action='store_true',
+                            help="Swap the journal cache for a dummy one so every load runs its queries.")
+        parser.add_argument('--output', help="Write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        headers = {'Authorization': f"Bearer {RefreshToken.for_user(user).access_token}"}
+        caches = dict(settings.CACHES)
+        if options['no_cache']:
+            caches[settings.JOURNAL_CACHE_ALIAS] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+        with override_settings(CACHES=caches):
+            results = {
+                'wsgi': self.run_wsgi(options['path'], headers, options['requests'], options['concurrency']),
+                'asgi': self.run_asgi(options['path'], headers, options['requests'], options['concurrency']),
+            }
+
+        report = {
+            'commit': self.current_commit(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'user': user.username,
+            'path': options['path'],
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'journal_cache': not options['no_cache'],
+            'servers': results,
+        }
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def run_wsgi(self, path, headers, total, concurrency):
+        from backend.wsgi import application
+
+        def load(_):
+            start = time.perf_counter()
+            status, size = wsgi_get(application, path, headers)
+            return time.perf_counter() - start, status, size
+
+        wsgi_get(application, path, headers)  # warm up
+        with ThreadSampler().sampling() as sampler, ThreadPoolExecutor(concurrency) as pool:
+            start = time.perf_counter()
+            loads = list(pool.map(load, range(total)))
+            elapsed = time.perf_counter() - start
+        return self.summarize(loads, elapsed, sampler.peak)
+
+    def run_asgi(self, path, headers, total, concurrency):
+        from backend.asgi import application
+
+        async def load(slots):
+            async with slots:
+                start = time.perf_counter()
+                status, size = await asgi_get(application, path, headers)
+                return time.perf_counter() - start, status, size
+
+        async def run():
+            await asgi_get(application, path, headers)  # warm up
+            slots = asyncio.Semaphore(concurrency)
+            start = time.perf_counter()
+            loads = await asyncio.gather(*(load(slots) for _ in range(total)))
+            return loads, time.perf_counter() - start
+
+        with ThreadSampler().sampling() as sampler:
+            loads, elapsed = asyncio.run(run())
+        return self.summarize(loads, elapsed, sampler.peak)
+
+    @staticmethod
+    def summarize(loads, elapsed, peak_threads):
+        timings = sorted(duration * 1000 for duration, _, _ in loads)
+        return {
+            'status': sorted({status for _, status, _ in loads}),
+            'requests_per_second': round(len(loads) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'bytes': max(size for _, _, size in loads),
+            'peak_threads': peak_threads,
+        }
+
+    def print_report(self, report, previous=None):
+        self.stdout.write(f"{report['user']}: GET {report['path']} x{report['requests']}, {report['concurrency']} "
+                          f"at once ({report['database']}, journal cache {'on' if report['journal_cache'] else 'off'})")
+        self.stdout.write(f"{'server':<8}{'status':>10}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+                          f"{'bytes':>10}{'threads':>9}")
+        for name, result in report['servers'].items():
+            self.stdout.write(f"{name:<8}{','.join(map(str, result['status'])):>10}"
+                              f"{result['requests_per_second']:>10.1f}{result['p50_ms']:>10.2f}"
+                              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['bytes']:>10}"
+                              f"{result['peak_threads']:>9}")
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.jobs import fail_orphaned
+
+
+class Command(BaseCommand):
+    help = "Marks simulation jobs left pending or running by a stopped server as failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=0, metavar='MINUTES',
+                            help="Only fail jobs created at least this many minutes ago, so that jobs other "
+                                 "running servers are still working on are left alone.")
+
+    def handle(self, *args, **options):
+        count = fail_orphaned(timezone.now() - timedelta(minutes=options['older_than']))
+        self.stdout.write(self.style.SUCCESS(f"Failed {count} orphaned job(s)."))
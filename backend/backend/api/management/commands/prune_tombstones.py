@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Tombstone
+from api.sync import TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = "Deletes sync tombstones older than the retention window; older cursors get a full snapshot anyway."
+
+    def handle(self, *args, **options):
+        count, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} tombstone(s)."))
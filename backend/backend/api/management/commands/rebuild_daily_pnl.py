@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_version
+from api.models import DailyPnL
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the DailyPnL rollup rows from completed trades and deposits (e.g. to backfill history)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Only rebuild the given user id (can be repeated).")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        count = days = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                days += DailyPnL.rebuild(user)
+                # The rebuild's bulk writes send no post_save signals.
+                transaction.on_commit(lambda user_id=user.id: bump_version(user_id))
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} daily P/L row(s) for {count} user(s)."))
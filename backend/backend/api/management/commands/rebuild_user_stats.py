@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import UserStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized UserStats rows from orders, completed trades and deposits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Only rebuild the given user id (can be repeated).")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        count = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                UserStats.rebuild(user)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} user(s)."))
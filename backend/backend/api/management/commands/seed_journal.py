@@ -0,0 +1,112 @@
+import random
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import CompletedTrade, DailyPnL, Deposit, OpenPosition, Order, Stock, UserStats
+
+User = get_user_model()
+
+SEED_PASSWORD = "seed-password"
+
+# Ordered roughly by how often retail journals trade them; weights fall off 1/rank.
+SYMBOLS = [
+    "AAPL", "TSLA", "NVDA", "AMD", "MSFT", "AMZN", "META", "SPY", "QQQ", "GOOGL",
+    "NFLX", "PLTR", "BA", "DIS", "INTC", "F", "NIO", "COIN", "SHOP", "UBER",
+    "BABA", "PYPL", "SQ", "SOFI", "RIVN", "JPM", "BAC", "XOM", "CVX", "WMT",
+    "KO", "PEP", "NKE", "SBUX", "CRM", "ORCL", "ADBE", "MU", "SNAP", "ROKU",
+]
+SYMBOL_WEIGHTS = [1 / rank for rank in range(1, len(SYMBOLS) + 1)]
+
+
+class Command(BaseCommand):
+    help = "Generates synthetic users with orders, completed trades, deposits and open positions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of users to create.")
+        parser.add_argument('--orders', type=int, default=500, help="Orders per user.")
+        parser.add_argument('--deposits', type=int, default=20, help="Deposits per user.")
+        parser.add_argument('--close-ratio', type=float, default=0.7,
+                            help="Share of orders that end up closed as completed trades.")
+        parser.add_argument('--days', type=int, default=730, help="How many days of history to spread orders over.")
+        parser.add_argument('--prefix', default="seed", help="Username prefix for generated users.")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for reproducible datasets.")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['close_ratio'] <= 1:
+            raise CommandError("--close-ratio must be between 0 and 1.")
+
+        rng = random.Random(options['seed'])
+        stocks = {symbol: Stock.objects.get_or_create(symbol=symbol)[0] for symbol in SYMBOLS}
+        base_prices = {symbol: Decimal(str(round(rng.lognormvariate(4.5, 0.8), 2))) for symbol in SYMBOLS}
+        password = make_password(SEED_PASSWORD)
+        start = date.today() - timedelta(days=options['days'])
+
+        existing = User.objects.filter(username__startswith=options['prefix']).count()
+        for index in range(existing, existing + options['users']):
+            with transaction.atomic():
+                user = User.objects.create(username=f"{options['prefix']}{index}",
+                                           email=f"{options['prefix']}{index}@example.com", password=password)
+                self.seed_user(user, rng, stocks, base_prices, start, options)
+                UserStats.rebuild(user)
+                DailyPnL.rebuild(user)
+            self.stdout.write(f"Seeded {user.username}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {options['users']} user(s) with {options['orders']} orders and "
+            f"{options['deposits']} deposits each."
+        ))
+
+    def seed_user(self, user, rng, stocks, base_prices, start, options):
+        orders = []
+        for _ in range(options['orders']):
+            symbol = rng.choices(SYMBOLS, weights=SYMBOL_WEIGHTS)[0]
+            order_date = self.trading_day(rng, start, options['days'])
+            price = (base_prices[symbol] * Decimal(str(rng.uniform(0.7, 1.3)))).quantize(Decimal("0.01"))
+            orders.append(Order(
+                user=user, stock=stocks[symbol], date=order_date, price=price,
+                quantity=max(1, int(rng.lognormvariate(3, 1))),
+                order_type=rng.choices(["buy", "sell"], weights=[4, 1])[0],
+                status="closed" if rng.random() < options['close_ratio'] else "open",
+            ))
+        Order.objects.bulk_create(orders, batch_size=1000)
+
+        trades = []
+        positions = defaultdict(lambda: [0, Decimal("0.00")])
+        for order in orders:
+            if order.status == "open":
+                position = positions[order.stock_id]
+                position[0] += order.quantity
+                position[1] += order.price * order.quantity
+                continue
+            duration = min(int(rng.expovariate(1 / 7)), 365)
+            close_price = (order.price * Decimal(str(1 + rng.gauss(0.003, 0.06)))).quantize(Decimal("0.01"))
+            trades.append(CompletedTrade(
+                initial_order=order, close_price=close_price, close_date=order.date + timedelta(days=duration),
+                net_amount=(close_price - order.price) * order.quantity, duration=duration,
+            ))
+        CompletedTrade.objects.bulk_create(trades, batch_size=1000)
+
+        OpenPosition.objects.bulk_create([
+            OpenPosition(user=user, stock_id=stock_id, quantity=quantity, total_value=total_value)
+            for stock_id, (quantity, total_value) in positions.items()
+        ])
+
+        Deposit.objects.bulk_create([
+            Deposit(user=user, amount=Decimal(rng.choice([250, 500, 1000, 2500, 5000])),
+                    deposited_at=datetime.combine(self.trading_day(rng, start, options['days']),
+                                                  time(rng.randint(8, 20)), tzinfo=dt_timezone.utc))
+            for _ in range(options['deposits'])
+        ])
+
+    @staticmethod
+    def trading_day(rng, start, days):
+        day = start + timedelta(days=rng.randrange(days))
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        return day
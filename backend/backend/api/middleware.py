@@ -0,0 +1,253 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('api.performance')
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook that times queries and spots repeats."""
+
+    def __init__(self, keep_sql=False):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.duration = 0.0
+        self.seen = set()
+        self.duplicates = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            key = (sql, repr(params))
+            if key in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(key)
+            if self.keep_sql:
+                self.statements.append((elapsed, sql, params))
+
+
+def add_execute_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+def view_labels(request):
+    """Returns (view, action) for the resolved view, e.g. ("OrderViewSet", "close")."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return "unmatched", request.method.lower()
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    view = view_class.__name__ if view_class else getattr(func, '__name__', match.view_name)
+    actions = getattr(func, 'actions', None)
+    if actions:
+        return view, actions.get(request.method.lower(), request.method.lower())
+    return view, request.method.lower()
+
+
+class PerformanceMetricsMiddleware:
+    """Records wall time, DB time, query counts and response size for every request.
+
+    Numbers land in the api.metrics histograms, labelled by DRF view and action. When
+    SLOW_REQUEST_THRESHOLD_MS is set, slower requests are logged to ``api.performance``
+    together with the SQL they ran.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 0) / 1000
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(keep_sql=bool(self.slow_threshold))
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(keep_sql=bool(self.slow_threshold))
+        start = time.perf_counter()
+        # Under ASGI the request's ORM calls run on its thread-sensitive executor thread, whose
+        # connection is the one to hook.
+        await sync_to_async(add_execute_wrapper)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_execute_wrapper)(recorder)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    def record(self, request, response, elapsed, recorder):
+        view, action = view_labels(request)
+        labels = {'view': view, 'action': action}
+        metrics.requests_total.inc(status=response.status_code, **labels)
+        metrics.request_duration.observe(elapsed, **labels)
+        metrics.request_db_duration.observe(recorder.duration, **labels)
+        metrics.request_queries.observe(recorder.count, **labels)
+        metrics.request_duplicate_queries.observe(recorder.duplicates, **labels)
+        if response.streaming:
+            count = self.acount_streamed if response.is_async else self.count_streamed
+            response.streaming_content = count(response.streaming_content, labels)
+        else:
+            metrics.response_size.observe(len(response.content), **labels)
+
+        if self.slow_threshold and elapsed >= self.slow_threshold:
+            self.log_slow_request(request, response, elapsed, recorder)
+
+    @staticmethod
+    def count_streamed(content, labels):
+        size = 0
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+        metrics.response_size.observe(size, **labels)
+
+    @staticmethod
+    async def acount_streamed(content, labels):
+        size = 0
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+        metrics.response_size.observe(size, **labels)
+
+    @staticmethod
+    def log_slow_request(request, response, elapsed, recorder):
+        queries = "\n".join(f"  [{duration * 1000:.1f} ms] {sql} {params!r}"
+                            for duration, sql, params in recorder.statements)
+        logger.warning(
+            "Slow request %s %s -> %s in %.1f ms (%d queries, %.1f ms in DB, %d duplicates)\n%s",
+            request.method, request.get_full_path(), response.status_code, elapsed * 1000,
+            recorder.count, recorder.duration * 1000, recorder.duplicates, queries,
+        )
+
+
+class AsyncRoutesMiddleware:
+    """Resolves requests against ASYNC_URLCONF when the app is served over ASGI.
+
+    Under WSGI (backend/wsgi.py) it does nothing, so the DRF views keep serving every route.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.urlconf = settings.ASYNC_URLCONF
+        return await self.get_response(request)
+
+
+# Brotli's default quality (11) is meant for static assets; 5 compresses about as well as gzip -9
+# at a fraction of the CPU time.
+BROTLI_QUALITY = 5
+
+
+def negotiate_encoding(accept_encoding):
+    """Picks br (when the brotli package is installed) or gzip from an Accept-Encoding header.
+
+    Honours q-values, so "gzip;q=1, br;q=0.5" gets gzip and "gzip;q=0" never does. Returns
+    None when neither is acceptable.
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    offered = ('br', 'gzip') if brotli is not None else ('gzip',)
+    acceptable = [coding for coding in offered if weights.get(coding, weights.get('*', 0)) > 0]
+    return max(acceptable, key=lambda coding: weights.get(coding, weights.get('*', 0)), default=None)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compresses responses with brotli or gzip, whichever the client prefers.
+
+    Bodies under RESPONSE_COMPRESSION_MIN_BYTES go out as they are: compressing a login or
+    token response saves nothing and would expose its secrets to BREACH-style attacks.
+    Streaming exports are always compressed.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_bytes = getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding == 'gzip':
+            return super().process_response(request, response)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding is None or (response.streaming and response.is_async):
+            return response  # the API's exports are sync generators; async streams stay as they are
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+    @staticmethod
+    def compress_stream(chunks):
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
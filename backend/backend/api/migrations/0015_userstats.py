@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-18 18:01
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_passwordresetotp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('open_orders', models.PositiveIntegerField(default=0)),
+                ('closed_orders', models.PositiveIntegerField(default=0)),
+                ('completed_trades', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('gross_profit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('gross_loss', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('total_deposits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
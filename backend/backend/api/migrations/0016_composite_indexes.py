@@ -0,0 +1,49 @@
+# Generated by Django 4.2.20 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_userstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completedtrade',
+            index=models.Index(fields=['initial_order', 'net_amount'], name='trade_order_net_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='completedtrade',
+            index=models.Index(fields=['close_date'], name='trade_close_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['email'], name='user_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deposit',
+            index=models.Index(fields=['user', 'deposited_at'], name='deposit_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='openposition',
+            index=models.Index(fields=['stock', 'user'], name='position_stock_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='openposition',
+            index=models.Index(fields=['user', 'quantity'], name='position_user_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', 'date'], name='order_user_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passwordresetotp',
+            index=models.Index(fields=['user', 'otp', 'is_used'], name='otp_user_otp_used_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def merge_duplicate_positions(apps, schema_editor):
+    """Folds racing duplicate (user, stock) rows into the oldest one before the constraint lands."""
+    OpenPosition = apps.get_model('api', 'OpenPosition')
+    duplicates = OpenPosition.objects.values('user_id', 'stock_id') \
+        .annotate(rows=models.Count('id')).filter(rows__gt=1)
+    for group in duplicates:
+        positions = list(OpenPosition.objects.filter(user_id=group['user_id'], stock_id=group['stock_id'])
+                         .order_by('id'))
+        keeper = positions[0]
+        keeper.quantity = sum(position.quantity or 0 for position in positions)
+        keeper.total_value = sum(position.total_value or 0 for position in positions)
+        keeper.save(update_fields=['quantity', 'total_value'])
+        OpenPosition.objects.filter(id__in=[position.id for position in positions[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_positions, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='openposition',
+            name='position_stock_user_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='openposition',
+            constraint=models.UniqueConstraint(fields=('user', 'stock'), name='position_user_stock_uniq'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-18 18:36
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_simulationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPnL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('realized_pnl', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('trade_count', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('deposits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_pnl', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailypnl',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='daily_pnl_user_date_uniq'),
+        ),
+    ]
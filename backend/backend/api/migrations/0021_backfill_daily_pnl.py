@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_pnl(apps, schema_editor):
+    """Builds every user's DailyPnL rows from the journal, as DailyPnL.rebuild does.
+
+    The rollup is kept incrementally from 0019 on; without this, trades closed and deposits
+    made before it have no rows, and deleting one would write negative totals.
+    """
+    CompletedTrade = apps.get_model('api', 'CompletedTrade')
+    Deposit = apps.get_model('api', 'Deposit')
+    DailyPnL = apps.get_model('api', 'DailyPnL')
+
+    rows = {}
+    trades = CompletedTrade.objects.exclude(close_date=None) \
+        .values('initial_order__user_id', 'close_date') \
+        .annotate(realized_pnl=models.Sum('net_amount'), trade_count=models.Count('id'),
+                  wins=models.Count('id', filter=models.Q(net_amount__gt=0)),
+                  losses=models.Count('id', filter=models.Q(net_amount__lt=0)))
+    for day in trades:
+        key = (day['initial_order__user_id'], day['close_date'])
+        rows[key] = DailyPnL(user_id=key[0], date=key[1], realized_pnl=day['realized_pnl'],
+                             trade_count=day['trade_count'], wins=day['wins'], losses=day['losses'])
+    deposits = Deposit.objects.values('user_id', day=TruncDate('deposited_at')).annotate(total=models.Sum('amount'))
+    for day in deposits:
+        key = (day['user_id'], day['day'])
+        rows.setdefault(key, DailyPnL(user_id=key[0], date=key[1])).deposits = day['total']
+
+    DailyPnL.objects.all().delete()
+    DailyPnL.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_pnl, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,26 @@
 from datetime import timedelta
+from decimal import Decimal
 
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, TruncDate
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from django.utils import timezone
 
 
+# Rows per INSERT ... ON CONFLICT statement; keeps the parameter count under SQLite's limit.
+UPSERT_BATCH_SIZE = 100
+
+
 class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['email'], name='user_email_idx'),  # login looks users up by email
+        ]
+
     @property
     def total_deposits(self):
         deposits = Deposit.objects.filter(user=self)
@@ -17,57 +29,40 @@ class CustomUser(AbstractUser):
 
     @property
     def no_of_open_orders(self):
-        return self.orders.filter(status="open").count()
+        return self._order_stats()['open']
 
     @property
     def no_of_closed_orders(self):
-        return self.orders.filter(status="closed").count()
+        return self._order_stats()['closed']
 
     @property
     def total_no_of_orders(self):
-        return self.orders.count()
+        return self._order_stats()['total']
 
     @property
     def win_rate(self):
-        completed_trades = CompletedTrade.objects.filter(initial_order__user=self)
-        total_completed = completed_trades.count()
-        if total_completed == 0:
-            return 0
-
-        successful_trades = completed_trades.filter(net_amount__gt=0).count()
-        win_rate = successful_trades / total_completed * 100
-        return round(win_rate, 2)
+        return self.trade_stats()['win_rate']
 
     @property
     def profit_factor(self):
-        completed_trades = CompletedTrade.objects.filter(initial_order__user=self)
-        profit = completed_trades.filter(net_amount__gt=0).aggregate(models.Sum('net_amount'))['net_amount__sum'] or 0
-        loss = completed_trades.filter(net_amount__lt=0).aggregate(models.Sum('net_amount'))['net_amount__sum'] or 0
-        if not loss:
-            return 0
-        profit_factor = profit / abs(loss)
-        return round(profit_factor, 2)
+        return self.trade_stats()['profit_factor']
 
     @property
     def average_profit_loss(self):
-        completed_trades = CompletedTrade.objects.filter(initial_order__user=self)
-        total_completed = completed_trades.count()
-        if total_completed == 0:
-            return 0
-
-        total_net_amount = completed_trades.aggregate(models.Sum('net_amount'))['net_amount__sum'] or 0
-        average_profit_loss = total_net_amount / total_completed
-        return round(average_profit_loss, 2)
+        return self.trade_stats()['average_profit_loss']
 
     @property
     def average_holding_duration(self):
-        completed_trades = CompletedTrade.objects.filter(initial_order__user=self)
-        if completed_trades.count() == 0:
-            return 0
+        return self.trade_stats()['average_holding_duration']
 
-        total_duration = sum([trade.duration for trade in completed_trades])
-        average_duration = total_duration / completed_trades.count()
-        return round(average_duration, 2)
+    def trade_stats(self, **filters):
+        """Returns all trade statistics at once; see api.analytics.trade_stats for the filters."""
+        from .analytics import trade_stats
+        return trade_stats(self, **filters)
+
+    def _order_stats(self):
+        from .analytics import order_stats
+        return order_stats(self)
 
 class PasswordResetOTP(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -75,6 +70,11 @@ class PasswordResetOTP(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'otp', 'is_used'], name='otp_user_otp_used_idx'),
+        ]
+
     def is_expired(self):
         return self.created_at + timedelta(minutes=10) < timezone.now()
 
@@ -83,6 +83,13 @@ class Deposit(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     deposited_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deposited_at'], name='deposit_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='deposit_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.amount} on {self.date}"
@@ -102,6 +109,14 @@ class Order(models.Model):
     order_type = models.CharField(max_length=4, choices=[("buy", "Buy"), ("sell", "Sell")])
     comment = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=10, choices=[("open", "Open"), ("closed", "Closed")], default="open")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+            models.Index(fields=['user', 'status', 'date'], name='order_user_status_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='order_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.stock.symbol} - {self.order_type} on {self.date}"
@@ -113,6 +128,14 @@ class CompletedTrade(models.Model):
     net_amount = models.DecimalField(max_digits=10, decimal_places=2)
     duration = models.IntegerField(null=True, blank=True)
     note = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['initial_order', 'net_amount'], name='trade_order_net_idx'),
+            models.Index(fields=['close_date'], name='trade_close_date_idx'),
+            models.Index(fields=['updated_at'], name='trade_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Close Trade for {self.initial_order.stock.symbol}"
@@ -123,3 +146,357 @@ class OpenPosition(models.Model):
     quantity = models.IntegerField(null=True, blank=True)
     total_value = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'stock'], name='position_user_stock_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'quantity'], name='position_user_qty_idx'),
+            models.Index(fields=['user', 'last_updated'], name='position_user_updated_idx'),
+        ]
+
+    @classmethod
+    def adjust(cls, user, stock, quantity, value):
+        """Adds quantity and value to the user's position in the stock, creating it if needed."""
+        cls.adjust_many(user, {stock.pk: (quantity, value)})
+
+    @classmethod
+    def adjust_many(cls, user, deltas):
+        """Applies ``{stock_id: (quantity, value)}`` deltas to the user's positions.
+
+        The read-modify-write happens inside the database (one INSERT ... ON CONFLICT DO UPDATE
+        per batch of stocks, or an F() update per stock where the backend has no upsert), so
+        concurrent writers for the same position never lose an update and no lock is held
+        across Python code.
+
+        This bypasses post_save: callers write the matching orders in the same transaction and
+        make sure the owner's cache version is bumped.
+        """
+        now = timezone.now()
+        rows = [(stock_id, quantity, _money(value)) for stock_id, (quantity, value) in deltas.items()]
+        if not connection.features.supports_update_conflicts_with_target:
+            for stock_id, quantity, value in rows:
+                cls._adjust_one(user, stock_id, quantity, value, now)
+            return
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                batch = rows[start:start + UPSERT_BATCH_SIZE]
+                params = []
+                for stock_id, quantity, value in batch:
+                    params += [user.pk, stock_id, quantity, connection.ops.adapt_decimalfield_value(value, 10, 2),
+                               connection.ops.adapt_datetimefield_value(now)]
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, stock_id, quantity, total_value, last_updated) "
+                    f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))} "
+                    f"ON CONFLICT (user_id, stock_id) DO UPDATE SET "
+                    f"quantity = COALESCE({table}.quantity, 0) + EXCLUDED.quantity, "
+                    f"total_value = COALESCE({table}.total_value, 0) + EXCLUDED.total_value, "
+                    f"last_updated = EXCLUDED.last_updated",
+                    params,
+                )
+
+    @classmethod
+    def _adjust_one(cls, user, stock_id, quantity, value, now):
+        changes = {
+            'quantity': Coalesce('quantity', 0) + quantity,
+            'total_value': Coalesce('total_value', Value(Decimal("0.00"))) + value,
+            'last_updated': now,
+        }
+        if cls.objects.filter(user=user, stock_id=stock_id).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user=user, stock_id=stock_id, quantity=quantity, total_value=value)
+        except IntegrityError:
+            # Another writer created the row between our UPDATE and INSERT.
+            cls.objects.filter(user=user, stock_id=stock_id).update(**changes)
+
+
+class UserStats(models.Model):
+    """Running per-user trading totals, kept in step with every journal write."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='stats')
+    total_orders = models.PositiveIntegerField(default=0)
+    open_orders = models.PositiveIntegerField(default=0)
+    closed_orders = models.PositiveIntegerField(default=0)
+    completed_trades = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    gross_profit = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    gross_loss = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    total_duration = models.BigIntegerField(default=0)
+    total_deposits = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.user.username}"
+
+    @property
+    def win_rate(self):
+        if self.completed_trades == 0:
+            return 0
+        return round(self.wins / self.completed_trades * 100, 2)
+
+    @property
+    def profit_factor(self):
+        if not self.gross_loss:
+            return 0
+        return round(self.gross_profit / abs(self.gross_loss), 2)
+
+    @property
+    def average_profit_loss(self):
+        if self.completed_trades == 0:
+            return 0
+        return round((self.gross_profit + self.gross_loss) / self.completed_trades, 2)
+
+    @property
+    def average_holding_duration(self):
+        if self.completed_trades == 0:
+            return 0
+        return round(self.total_duration / self.completed_trades, 2)
+
+    @classmethod
+    def for_user(cls, user):
+        """Returns the user's stats row, building it from the journal if it does not exist yet."""
+        try:
+            return user.stats
+        except cls.DoesNotExist:
+            return cls.rebuild(user)
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recomputes every counter for the user from scratch."""
+        from .analytics import order_stats, trade_aggregates
+        order_counts = order_stats(user)
+        trade_totals = CompletedTrade.objects.filter(initial_order__user=user).aggregate(**trade_aggregates())
+        deposits = Deposit.objects.filter(user=user).aggregate(models.Sum('amount'))['amount__sum']
+
+        stats, created = cls.objects.update_or_create(user=user, defaults={
+            'total_orders': order_counts['total'],
+            'open_orders': order_counts['open'],
+            'closed_orders': order_counts['closed'],
+            'completed_trades': trade_totals['completed'],
+            'wins': trade_totals['wins'],
+            'losses': trade_totals['losses'],
+            'gross_profit': trade_totals['gross_profit'] or Decimal("0.00"),
+            'gross_loss': trade_totals['gross_loss'] or Decimal("0.00"),
+            'total_duration': trade_totals['total_duration'] or 0,
+            'total_deposits': deposits or Decimal("0.00"),
+        })
+        return stats
+
+    @classmethod
+    def _apply(cls, user, **deltas):
+        """Adds the deltas to the user's counters in a single UPDATE.
+
+        Must be called after the journal write it describes: if the row does not exist yet it is
+        rebuilt from the journal, which already includes that write.
+        """
+        changes = {field: models.F(field) + delta for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+        if not cls.objects.filter(user=user).update(updated_at=timezone.now(), **changes):
+            cls.rebuild(user)
+
+    @classmethod
+    def record_orders_created(cls, user, count=1):
+        cls._apply(user, total_orders=count, open_orders=count)
+
+    @classmethod
+    def record_trades_closed(cls, user, trades, sign=1):
+        """Moves the trades' orders from open to closed and adds their results."""
+        deltas = {'completed_trades': 0, 'wins': 0, 'losses': 0, 'gross_profit': Decimal("0.00"),
+                  'gross_loss': Decimal("0.00"), 'total_duration': 0}
+        for trade in trades:
+            net_amount = _money(trade.net_amount)
+            deltas['completed_trades'] += 1
+            if net_amount > 0:
+                deltas['wins'] += 1
+                deltas['gross_profit'] += net_amount
+            elif net_amount < 0:
+                deltas['losses'] += 1
+                deltas['gross_loss'] += net_amount
+            deltas['total_duration'] += trade.duration or 0
+
+        deltas = {field: delta * sign for field, delta in deltas.items()}
+        deltas['open_orders'] = -deltas['completed_trades']
+        deltas['closed_orders'] = deltas['completed_trades']
+        cls._apply(user, **deltas)
+
+    @classmethod
+    def record_trades_removed(cls, user, trades):
+        """Reverses record_trades_closed for trades that were deleted and whose orders reopened."""
+        cls.record_trades_closed(user, trades, sign=-1)
+
+    @classmethod
+    def record_deposit(cls, user, amount):
+        cls._apply(user, total_deposits=_money(amount))
+
+
+class DailyPnL(models.Model):
+    """Per-user, per-day rollup of realized P/L and deposits that charts read instead of the journal.
+
+    Kept in step incrementally by the views that close or delete trades and record deposits;
+    ``rebuild`` recomputes a user's rows from scratch (see the rebuild_daily_pnl command).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_pnl')
+    date = models.DateField()
+    realized_pnl = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    trade_count = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    deposits = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+
+    COUNTERS = ('realized_pnl', 'trade_count', 'wins', 'losses', 'deposits')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_pnl_user_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} P/L on {self.date}"
+
+    @classmethod
+    def record_trades(cls, user, trades, sign=1):
+        """Adds the trades' results to their close days; ``sign=-1`` takes them back out."""
+        deltas = {}
+        for trade in trades:
+            if trade.close_date is None:
+                continue
+            net_amount = _money(trade.net_amount)
+            day = deltas.setdefault(trade.close_date, [Decimal("0.00"), 0, 0, 0, Decimal("0.00")])
+            day[0] += net_amount * sign
+            day[1] += sign
+            day[2] += sign if net_amount > 0 else 0
+            day[3] += sign if net_amount < 0 else 0
+        cls._apply(user, deltas)
+        if sign < 0:
+            cls._prune(user, deltas)
+
+    @classmethod
+    def record_deposit(cls, user, deposit, sign=1):
+        day = timezone.localdate(deposit.deposited_at)
+        cls._apply(user, {day: (Decimal("0.00"), 0, 0, 0, _money(deposit.amount) * sign)})
+        if sign < 0:
+            cls._prune(user, [day])
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recomputes the user's rows from their completed trades and deposits."""
+        rows = {}
+        trades = CompletedTrade.objects.filter(initial_order__user=user).exclude(close_date=None) \
+            .values('close_date').annotate(realized_pnl=models.Sum('net_amount'), trade_count=models.Count('id'),
+                                           wins=models.Count('id', filter=models.Q(net_amount__gt=0)),
+                                           losses=models.Count('id', filter=models.Q(net_amount__lt=0)))
+        for day in trades:
+            rows[day['close_date']] = cls(user=user, date=day['close_date'], realized_pnl=day['realized_pnl'],
+                                          trade_count=day['trade_count'], wins=day['wins'], losses=day['losses'])
+        deposits = Deposit.objects.filter(user=user).values(day=TruncDate('deposited_at')) \
+            .annotate(total=models.Sum('amount'))
+        for day in deposits:
+            rows.setdefault(day['day'], cls(user=user, date=day['day'])).deposits = day['total']
+
+        cls.objects.filter(user=user).delete()
+        cls.objects.bulk_create(rows.values(), batch_size=1000)
+        return len(rows)
+
+    @classmethod
+    def _apply(cls, user, deltas):
+        """Adds ``{date: (realized_pnl, trade_count, wins, losses, deposits)}`` to the user's rows.
+
+        Like OpenPosition.adjust_many this is one INSERT ... ON CONFLICT DO UPDATE per batch (or
+        an F() update per day without upsert support), so concurrent closes never lose a count.
+        Sends no post_save: callers write the journal rows that bump the cache in the same transaction.
+        """
+        rows = [(day, *values) for day, values in deltas.items()]
+        if not rows:
+            return
+        if not connection.features.supports_update_conflicts_with_target:
+            for day, *values in rows:
+                cls._apply_one(user, day, dict(zip(cls.COUNTERS, values)))
+            return
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                batch = rows[start:start + UPSERT_BATCH_SIZE]
+                params = []
+                for day, realized_pnl, trade_count, wins, losses, deposits in batch:
+                    params += [user.pk, connection.ops.adapt_datefield_value(day),
+                               connection.ops.adapt_decimalfield_value(realized_pnl, 16, 2), trade_count, wins, losses,
+                               connection.ops.adapt_decimalfield_value(deposits, 16, 2)]
+                updates = ', '.join(f"{column} = {table}.{column} + EXCLUDED.{column}" for column in cls.COUNTERS)
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, date, {', '.join(cls.COUNTERS)}) "
+                    f"VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(batch))} "
+                    f"ON CONFLICT (user_id, date) DO UPDATE SET {updates}",
+                    params,
+                )
+
+    @classmethod
+    def _apply_one(cls, user, day, values):
+        changes = {field: models.F(field) + value for field, value in values.items()}
+        if cls.objects.filter(user=user, date=day).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user=user, date=day, **values)
+        except IntegrityError:
+            # Another writer created the row between our UPDATE and INSERT.
+            cls.objects.filter(user=user, date=day).update(**changes)
+
+    @classmethod
+    def _prune(cls, user, days):
+        """Drops days left with no trades and no deposits."""
+        cls.objects.filter(user=user, date__in=list(days), trade_count=0, deposits=0).delete()
+
+
+class Tombstone(models.Model):
+    """Records a deleted journal row so /api/sync/ can tell clients to drop it."""
+    KINDS = [("order", "Order"), ("completed_trade", "Completed trade"), ("deposit", "Deposit"),
+             ("open_position", "Open position")]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
+
+
+class SimulationJob(models.Model):
+    """A long-running analysis submitted through the API and polled for its result."""
+    KINDS = [("monte_carlo", "Monte Carlo")]
+    STATUSES = [("pending", "Pending"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='simulation_jobs')
+    kind = models.CharField(max_length=20, choices=KINDS, default="monte_carlo")
+    parameters = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default="pending")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='simulation_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.pk} ({self.status})"
+
+
+def _money(value):
+    """Normalises a float/str/Decimal amount the same way a 2-place DecimalField stores it."""
+    return models.DecimalField(max_digits=16, decimal_places=2).to_python(value).quantize(Decimal("0.01"))
@@ -0,0 +1,133 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Newest-first keyset pagination over ``(view.cursor_field, id)``.
+
+    The cursor holds the last row's date and id, so every page is a single
+    indexed range query no matter how deep into the journal the client is.
+    """
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.page_rows(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, fetching the page through the async ORM."""
+        return self.page_rows([row async for row in self.page_queryset(queryset, request, view)])
+
+    def page_queryset(self, queryset, request, view):
+        """The page's queryset, with one extra row to tell whether there is a next page."""
+        self.request = request
+        self.field = view.cursor_field
+        self.next_cursor = None
+        self.limit = self.get_page_size(request)
+
+        queryset = queryset.order_by(F(self.field).desc(nulls_last=True), '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor, queryset.model)
+            if value is None:
+                queryset = queryset.filter(**{f"{self.field}__isnull": True, 'id__lt': pk})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f"{self.field}__lt": value})
+                    | Q(**{self.field: value, 'id__lt': pk})
+                    | Q(**{f"{self.field}__isnull": True})
+                )
+
+        return queryset[:self.limit + 1]
+
+    def page_rows(self, rows):
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            self.next_cursor = self.encode_cursor(rows[-1])
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        # Rows are model instances or, on the values() fast path, dicts.
+        value, pk = (row[self.field], row['id']) if isinstance(row, dict) else (getattr(row, self.field), row.pk)
+        position = [value.isoformat() if value is not None else None, pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if value is not None:
+                value = model._meta.get_field(self.field).to_python(value)
+            return value, int(pk)
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class RankedPagination(KeysetPagination):
+    """Page-number pagination for ranked lists.
+
+    A rank is a window over the whole ordered set, so the database sorts every row whichever
+    page is asked for; paging with LIMIT/OFFSET on top of that costs no extra query.
+    """
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.next_page = None
+        page_size = self.get_page_size(request)
+        try:
+            page = int(request.query_params.get(self.page_query_param, 1))
+            if page < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound('Invalid page')
+
+        offset = (page - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_page = page + 1
+        return rows
+
+    def get_next_link(self):
+        if self.next_page is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.next_page)
@@ -0,0 +1,168 @@
+"""Risk metrics over a user's closed trades, computed with NumPy.
+
+The trades are loaded with one ``values_list`` query into flat arrays; every metric below is
+a vectorised pass over those arrays, so the cost is dominated by the query itself.
+"""
+import numpy as np
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Coalesce
+
+TRADING_DAYS_PER_YEAR = 252
+# R-multiple histogram edges; the first and last buckets are open-ended.
+R_MULTIPLE_EDGES = (-3, -2, -1, 0, 1, 2, 3)
+
+
+def load_trades(trades):
+    """Returns (net amounts, close days, durations) for a CompletedTrade queryset, in close order.
+
+    Trades without a close date cannot be placed on the equity curve and are left out.
+    """
+    queryset = trades.exclude(close_date=None).order_by('close_date', 'id') \
+        .annotate(net=Cast('net_amount', FloatField()), day=F('close_date'), held=Coalesce('duration', 0)) \
+        .values_list('net', 'day', 'held')
+    # Running the compiled SQL directly skips Django's per-row value converters, which cost
+    # several times more than all the metrics below.
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    count = len(rows)
+    net = np.fromiter((row[0] for row in rows), dtype=np.float64, count=count)
+    durations = np.fromiter((row[2] for row in rows), dtype=np.int64, count=count)
+    # Parse each distinct close date once: a journal has far fewer trading days than trades.
+    day_codes = {}
+    codes = np.fromiter((day_codes.setdefault(row[1], len(day_codes)) for row in rows), dtype=np.int64, count=count)
+    days = np.array(list(day_codes), dtype='datetime64[D]')[codes]
+    return net, days, durations
+
+
+def load_sizing_trades(trades):
+    """Returns (return on capital, duration, open day, close day) arrays for the sizing backtester.
+
+    Trades are in close order; days are counted from the Unix epoch.
+    """
+    queryset = trades.exclude(close_date=None).order_by('close_date', 'id').annotate(
+        net=Cast('net_amount', FloatField()),
+        capital=Cast(F('initial_order__price') * F('initial_order__quantity'), FloatField()),
+        held=Coalesce('duration', 0), opened=F('initial_order__date'), closed=F('close_date'),
+    ).values_list('net', 'capital', 'held', 'opened', 'closed')
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    count = len(rows)
+    net = np.fromiter((row[0] for row in rows), dtype=np.float64, count=count)
+    capital = np.fromiter((row[1] for row in rows), dtype=np.float64, count=count)
+    durations = np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+    day_codes = {}
+    codes = np.fromiter((day_codes.setdefault(row[column], len(day_codes)) for column in (3, 4) for row in rows),
+                        dtype=np.int64, count=2 * count)
+    days = np.array(list(day_codes), dtype='datetime64[D]').astype(np.int64)[codes].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(capital > 0, net / capital, 0.0)
+    return returns, durations, days[:count], days[count:]
+
+
+def risk_report(net, days, durations, starting_balance=0.0):
+    """Computes the risk report for trades already sorted by close day."""
+    if net.size == 0:
+        return {
+            'trades': 0, 'starting_balance': round(starting_balance, 2), 'net_profit_loss': 0,
+            'equity_curve': [], 'max_drawdown': 0, 'max_drawdown_pct': None, 'max_drawdown_days': 0,
+            'sharpe_ratio': None, 'sortino_ratio': None, 'longest_win_streak': 0, 'longest_loss_streak': 0,
+            'expectancy': 0, 'expectancy_r': None, 'average_holding_duration': 0, 'r_multiples': [],
+        }
+
+    trade_days, daily_pnl = daily_totals(net, days)
+    equity = starting_balance + np.cumsum(daily_pnl)
+    drawdown, drawdown_pct, drawdown_days = max_drawdown(equity, trade_days, starting_balance)
+    wins, losses = longest_streaks(net)
+
+    losing = net[net < 0]
+    one_r = -losing.mean() if losing.size else None
+    return {
+        'trades': int(net.size),
+        'starting_balance': round(starting_balance, 2),
+        'net_profit_loss': round(float(net.sum()), 2),
+        'equity_curve': [{'date': str(day), 'equity': round(float(value), 2)}
+                         for day, value in zip(trade_days, equity)],
+        'max_drawdown': round(drawdown, 2),
+        'max_drawdown_pct': None if drawdown_pct is None else round(drawdown_pct, 2),
+        'max_drawdown_days': drawdown_days,
+        'sharpe_ratio': sharpe_ratio(daily_pnl),
+        'sortino_ratio': sortino_ratio(daily_pnl),
+        'longest_win_streak': wins,
+        'longest_loss_streak': losses,
+        'expectancy': round(float(net.mean()), 2),
+        'expectancy_r': None if one_r is None else round(float(net.mean() / one_r), 2),
+        'average_holding_duration': round(float(durations.mean()), 2),
+        'r_multiples': r_multiple_distribution(net, one_r),
+    }
+
+
+def daily_totals(net, days):
+    """Sums the P/L of each close day; returns (unique days, daily P/L)."""
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return days[starts], np.add.reduceat(net, starts)
+
+
+def max_drawdown(equity, trade_days, starting_balance):
+    """Returns (largest peak-to-trough fall, the same as % of the peak, longest days below a peak)."""
+    equity = np.r_[starting_balance, equity]
+    trade_days = np.concatenate((trade_days[:1], trade_days))
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = equity - peaks
+    trough = int(drawdowns.argmin())
+    drawdown = float(-drawdowns[trough])
+    peak = float(peaks[trough])
+    drawdown_pct = drawdown / peak * 100 if peak > 0 else None
+
+    # Index of the most recent peak for every point; the gap to it is the time spent under water.
+    peak_index = np.maximum.accumulate(np.where(equity >= peaks, np.arange(equity.size), 0))
+    underwater = (trade_days - trade_days[peak_index]).astype(np.int64)
+    return drawdown, drawdown_pct, int(underwater.max())
+
+
+def sharpe_ratio(daily_pnl):
+    """Annualised mean/stdev of P/L over the days that closed trades."""
+    if daily_pnl.size < 2:
+        return None
+    deviation = daily_pnl.std(ddof=1)
+    if deviation == 0:
+        return None
+    return round(float(daily_pnl.mean() / deviation * np.sqrt(TRADING_DAYS_PER_YEAR)), 2)
+
+
+def sortino_ratio(daily_pnl):
+    """Like the Sharpe ratio, but only losing days count as risk."""
+    if daily_pnl.size < 2:
+        return None
+    downside = np.sqrt(np.mean(np.minimum(daily_pnl, 0) ** 2))
+    if downside == 0:
+        return None
+    return round(float(daily_pnl.mean() / downside * np.sqrt(TRADING_DAYS_PER_YEAR)), 2)
+
+
+def longest_streaks(net):
+    """Longest runs of consecutive winning and losing trades; break-even trades end a run."""
+    signs = np.sign(net).astype(np.int8)
+    starts = np.flatnonzero(np.r_[True, signs[1:] != signs[:-1]])
+    lengths = np.diff(np.r_[starts, signs.size])
+    run_signs = signs[starts]
+    wins = lengths[run_signs > 0]
+    losses = lengths[run_signs < 0]
+    return int(wins.max()) if wins.size else 0, int(losses.max()) if losses.size else 0
+
+
+def r_multiple_distribution(net, one_r):
+    """Buckets each trade's result in multiples of the average loss (1R)."""
+    if one_r is None:
+        return []
+    edges = np.array((-np.inf, *R_MULTIPLE_EDGES, np.inf))
+    counts, _ = np.histogram(net / one_r, bins=edges)
+    return [{'from': None if np.isinf(low) else int(low), 'to': None if np.isinf(high) else int(high),
+             'count': int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)]
@@ -1,110 +1,330 @@
+import datetime
+import functools
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework.serializers import ModelSerializer, CharField
-from .models import Order, Stock, CompletedTrade, OpenPosition, Deposit
+from django.db import models
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ModelSerializer, Serializer, CharField, DateField, EmailField, FloatField, \
+    IntegerField
+from .models import Order, Stock, CompletedTrade, OpenPosition, Deposit, UserStats, SimulationJob
 
 User = get_user_model()
 
 
+def _datetime_representation(value, tz):
+    """DRF's DateTimeField output: ISO 8601 in the current time zone, with UTC written as 'Z'."""
+    text = (value.astimezone(tz) if tz is not None else value).isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+class RowMapper:
+    """Renders ``values()`` rows in a serializer's JSON shape without building a field tree per row.
+
+    ``shape`` maps each output key to a values() lookup, or to a nested shape for an embedded
+    object. Decimal, date and datetime columns are formatted as the serializer's DRF fields
+    would format them; ``converters`` overrides that for keys whose serializer field differs
+    from the model field's default. The row-to-dict function is generated once, so each row
+    costs one dict display.
+    """
+
+    def __init__(self, model, shape, converters=None):
+        self.model = model
+        self.shape = shape
+        self.converters = converters or {}
+        self._subsets = {}
+
+    @functools.cached_property
+    def columns(self):
+        columns = []
+        self._collect(self.shape, columns)
+        return tuple(dict.fromkeys(columns))
+
+    def render(self, rows):
+        map_row = self.map_row
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None  # looked up once, not per row
+        return [map_row(row, tz) for row in rows]
+
+    @functools.cached_property
+    def map_row(self):
+        converters = {}
+        source = f"def map_row(row, tz):\n    return {self._expression(self.shape, converters)}\n"
+        namespace = dict(converters)
+        exec(compile(source, f"<{self.model.__name__} row mapper>", 'exec'), namespace)
+        return namespace['map_row']
+
+    def _collect(self, shape, columns):
+        for lookup in shape.values():
+            if isinstance(lookup, dict):
+                self._collect(lookup, columns)
+            else:
+                columns.append(lookup)
+
+    def _expression(self, shape, converters):
+        items = []
+        for key, lookup in shape.items():
+            if isinstance(lookup, dict):
+                value = self._expression(lookup, converters)
+            else:
+                value = f"row[{lookup!r}]"
+                convert = self.converters[key] if key in self.converters else self._converter(lookup)
+                if convert is not None:
+                    name = f"_convert{len(converters)}"
+                    converters[name] = convert
+                    arguments = "value, tz" if convert is _datetime_representation else "value"
+                    value = f"(None if (value := {value}) is None else {name}({arguments}))"
+            items.append(f"{key!r}: {value}")
+        return "{" + ", ".join(items) + "}"
+
+    def _converter(self, lookup):
+        model, *path, name = [self.model] + lookup.split('__')
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        field = model._meta.get_field(name)
+        if isinstance(field, models.DecimalField):
+            # The database converter already quantized the value, which is all DRF's field adds.
+            return '{:f}'.format
+        if isinstance(field, models.DateTimeField):
+            return _datetime_representation
+        if isinstance(field, models.DateField):
+            return datetime.date.isoformat
+        return None
+
+    def subset(self, keys):
+        """The mapper for just the top-level ``keys`` (all of them when ``keys`` is None)."""
+        if keys is None:
+            return self
+        keys = frozenset(keys)
+        if keys not in self._subsets:
+            self._subsets[keys] = RowMapper(self.model, {key: lookup for key, lookup in self.shape.items()
+                                                         if key in keys}, self.converters)
+        return self._subsets[keys]
+
+
+def sparse_fieldset(request):
+    """Returns the ``?fields=`` and ``?expand=`` names of a read request as (fields, expand).
+
+    ``fields`` is None when every field is wanted. Writes ignore both, so a request never
+    loses input fields to the shape of its own response.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, frozenset()
+    fields, expand = request.query_params.get('fields'), request.query_params.get('expand', '')
+    return (frozenset(name.strip() for name in fields.split(',') if name.strip()) if fields is not None else None,
+            frozenset(name.strip() for name in expand.split(',') if name.strip()))
+
+
+class SparseFieldsMixin:
+    """Renders only the fields named in ``?fields=`` and embeds the ``?expand=`` relations.
+
+    ``expandable_fields`` maps a name to the serializer class (and its keyword arguments) that
+    renders it when expanded; a declared field of that name is the unexpanded form, otherwise
+    the key is left out. ``computed_fields`` lists the keys to_representation adds with the
+    lookups they read. Dropped fields are never computed, and model_columns() tells the view
+    which columns the rest need. Only the top-level serializer reads the request.
+    """
+    expandable_fields = {}
+    computed_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields, self.expanded_fields = sparse_fieldset(self.context.get('request'))
+        for name in self.expanded_fields & self.expandable_fields.keys():
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(**options)
+        if self.requested_fields is not None:
+            for name in list(self.fields):
+                if name not in self.requested_fields:
+                    del self.fields[name]
+
+    @property
+    def is_sparse(self):
+        return self.requested_fields is not None or bool(self.expanded_fields)
+
+    def wants(self, key):
+        return self.requested_fields is None or key in self.requested_fields
+
+    def model_columns(self, prefix=''):
+        """Lookups the rendered fields read, for QuerySet.only(); None if a field has no model column."""
+        columns = []
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                return None
+            lookup = prefix + '__'.join(field.source_attrs)
+            if isinstance(field, SparseFieldsMixin):
+                nested = field.model_columns(lookup + '__')
+                if nested is None:
+                    return None
+                columns += nested
+            else:
+                columns.append(lookup)
+        for key, lookups in self.computed_fields.items():
+            if self.wants(key):
+                columns += [prefix + lookup for lookup in lookups]
+        return columns
+
+
 # User Serializer
-class UserSerializer(ModelSerializer):
+class UserSerializer(SparseFieldsMixin, ModelSerializer):
+    # Keys filled from the user's UserStats row, and the stats attribute each one reads
+    stat_fields = {
+        'no_of_open_orders': 'open_orders',
+        'no_of_closed_orders': 'closed_orders',
+        'total_no_of_orders': 'total_orders',
+        'win_rate': 'win_rate',
+        'profit_factor': 'profit_factor',
+        'average_profit_loss': 'average_profit_loss',
+        'average_holding_duration': 'average_holding_duration',
+        'total_deposits': 'total_deposits',
+    }
+    computed_fields = {key: ('stats',) for key in stat_fields}
+
     class Meta:
         model = User
         fields = ["id", "username", "email"]
 
     def to_representation(self,  instance):
         rep = super().to_representation(instance)
-        rep["no_of_open_orders"] = instance.no_of_open_orders
-        rep["no_of_closed_orders"] = instance.no_of_closed_orders
-        rep["total_no_of_orders"] = instance.total_no_of_orders
-        rep["win_rate"] = instance.win_rate
-        rep["profit_factor"] = instance.profit_factor
-        rep["average_profit_loss"] = instance.average_profit_loss
-        rep["average_holding_duration"]= instance.average_holding_duration
-        rep["total_deposits"] = instance.total_deposits
+        wanted = [key for key in self.stat_fields if self.wants(key)]
+        if not wanted:
+            return rep  # e.g. ?fields=id,username: the stats row is never read
+        stats = UserStats.for_user(instance)  # single row read instead of one query per stat
+        for key in wanted:
+            rep[key] = getattr(stats, self.stat_fields[key])
+        if 'total_deposits' in rep:
+            rep["total_deposits"] = round(rep["total_deposits"], 2)
 
         return rep
 
 
+# Superuser leaderboard row, read from the annotated values() rows of analytics.leaderboard
+class LeaderboardSerializer(SparseFieldsMixin, Serializer):
+    rank = IntegerField()
+    id = IntegerField()
+    username = CharField()
+    email = EmailField()
+    no_of_open_orders = IntegerField(source='open_orders')
+    no_of_closed_orders = IntegerField(source='closed_orders')
+    total_no_of_orders = IntegerField(source='total_orders')
+    completed_trades = IntegerField()
+    win_rate = FloatField()
+    profit_factor = FloatField()
+    average_profit_loss = FloatField()
+    average_holding_duration = FloatField()
+    net_profit_loss = FloatField()
+    total_deposits = FloatField()
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        for field in ('win_rate', 'profit_factor', 'average_profit_loss', 'average_holding_duration',
+                      'net_profit_loss', 'total_deposits'):
+            if field in rep:
+                rep[field] = round(rep[field], 2)
+        return rep
+
+
+# Lightweight user reference embedded in list rows (no stats, no extra queries)
+class UserReferenceSerializer(SparseFieldsMixin, ModelSerializer):
+    class Meta:
+        model = User
+        fields = ["id", "username", "email"]
+
+
 # Deposit Serializer
-class DepositSerializer(ModelSerializer):
-    user = UserSerializer(read_only=True)
+class DepositSerializer(SparseFieldsMixin, ModelSerializer):
+    user = UserReferenceSerializer(read_only=True)
+    username = CharField(source='user.username', read_only=True)  # expose username in the response flatly
+    expandable_fields = {'user': (UserSerializer, {'read_only': True})}
 
     class Meta:
         model = Deposit
-        fields = ['id','user', 'amount', 'deposited_at']
+        fields = ['id','user', 'amount', 'deposited_at', 'username']
         read_only_fields = ['user']
 
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        rep['username'] = instance.user.username  # expose username in the response flatly
-        return rep
-
 # Stock Serializer
-class StockSerializer(ModelSerializer):
+class StockSerializer(SparseFieldsMixin, ModelSerializer):
     class Meta:
         model = Stock
         fields = ['id', 'symbol']
 
 
 # Order Serializer
-class OrderSerializer(ModelSerializer):
-    user = UserSerializer(read_only=True)             # for response
+class OrderSerializer(SparseFieldsMixin, ModelSerializer):
+    user = UserReferenceSerializer(read_only=True)    # for response
     stock = StockSerializer(read_only=True)           # for response
+    symbol = CharField(source='stock.symbol', read_only=True)  # expose symbol in the response flatly
+    expandable_fields = {'user': (UserSerializer, {'read_only': True})}
 
     class Meta:
         model = Order
-        fields = '__all__'
+        fields = ['id', 'user', 'stock', 'date', 'quantity', 'price', 'order_type', 'comment', 'status',
+                  'updated_at', 'symbol']
         read_only_fields = ['user', 'stock']
 
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        rep['symbol'] = instance.stock.symbol  # expose symbol in the response flatly
-        return rep
-
-    class OrderSerializer(ModelSerializer):
-        user = UserSerializer(read_only=True)
-        stock = StockSerializer(read_only=True)
-
-        class Meta:
-            model = Order
-            fields= [
-                'id', 'stock', 'date', 'quantity', 'price', 'order_type', 'comment'
-            ]
-            read_only_fields = ['stock', 'user']
+    # Same shape as the serializer, for list endpoints that read values() rows
+    row_mapper = RowMapper(Order, {
+        'id': 'id',
+        'user': {'id': 'user_id', 'username': 'user__username', 'email': 'user__email'},
+        'stock': {'id': 'stock_id', 'symbol': 'stock__symbol'},
+        'date': 'date', 'quantity': 'quantity', 'price': 'price', 'order_type': 'order_type', 'comment': 'comment',
+        'status': 'status', 'updated_at': 'updated_at', 'symbol': 'stock__symbol',
+    })
 
-        def to_representation(self, instance):
-            # Add symbol as flat value in output
-            rep = super().to_representation(instance)
-            rep['symbol'] = instance.stock.symbol
-            return rep
 
-
-class CompletedTradeSerializer(ModelSerializer):
-    order = OrderSerializer(read_only=True)
+class CompletedTradeSerializer(SparseFieldsMixin, ModelSerializer):
+    open_price = FloatField(source='initial_order.price', read_only=True)
+    open_date = DateField(source='initial_order.date', read_only=True)
+    quantity = IntegerField(source='initial_order.quantity', read_only=True)
+    order_type = CharField(source='initial_order.order_type', read_only=True)
+    symbol = CharField(source='initial_order.stock.symbol', read_only=True)  # expose symbol in the response flatly
+    expandable_fields = {'order': (OrderSerializer, {'source': 'initial_order', 'read_only': True})}
 
     class Meta:
         model = CompletedTrade
-        fields = ['order', 'duration', 'id', 'net_amount', 'close_price', 'close_date', 'note']
-        read_only_fields = ['order']
+        fields = ['duration', 'id', 'net_amount', 'close_price', 'close_date', 'note', 'open_price', 'open_date',
+                  'quantity', 'order_type', 'symbol']
 
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        rep['open_price'] = instance.initial_order.price
-        rep['open_date'] = instance.initial_order.date
-        rep['quantity'] = instance.initial_order.quantity
-        rep['order_type'] = instance.initial_order.order_type
-        rep['symbol'] = instance.initial_order.stock.symbol  # expose symbol in the response flatly
-        return rep
+    row_mapper = RowMapper(CompletedTrade, {
+        'duration': 'duration', 'id': 'id', 'net_amount': 'net_amount', 'close_price': 'close_price',
+        'close_date': 'close_date', 'note': 'note', 'open_price': 'initial_order__price',
+        'open_date': 'initial_order__date', 'quantity': 'initial_order__quantity',
+        'order_type': 'initial_order__order_type', 'symbol': 'initial_order__stock__symbol',
+    }, converters={'open_price': float})
 
-class OpenPositionSerializer(ModelSerializer):
+class OpenPositionSerializer(SparseFieldsMixin, ModelSerializer):
     stock = StockSerializer(read_only=True)
+    symbol = CharField(source='stock.symbol', read_only=True)
 
     class Meta:
         model = OpenPosition
-        fields = ['id', 'stock', 'quantity', 'total_value']
+        fields = ['id', 'stock', 'quantity', 'total_value', 'symbol']
 
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        rep['symbol'] = instance.stock.symbol
-        return rep
+    row_mapper = RowMapper(OpenPosition, {
+        'id': 'id', 'stock': {'id': 'stock_id', 'symbol': 'stock__symbol'}, 'quantity': 'quantity',
+        'total_value': 'total_value', 'symbol': 'stock__symbol',
+    })
+
+
+# Monte Carlo job: the write-only fields are validated here and stored as the job's parameters
+class SimulationJobSerializer(SparseFieldsMixin, ModelSerializer):
+    paths = IntegerField(write_only=True, min_value=100, max_value=100000, default=10000)
+    horizon = IntegerField(write_only=True, min_value=1, max_value=5000, required=False)
+    ruin_fraction = FloatField(write_only=True, min_value=0.01, max_value=1, default=0.5)
+    seed = IntegerField(write_only=True, min_value=0, required=False)
+
+    parameter_fields = ('paths', 'horizon', 'ruin_fraction', 'seed')
+
+    class Meta:
+        model = SimulationJob
+        fields = ['id', 'kind', 'status', 'parameters', 'result', 'error', 'created_at', 'started_at',
+                  'finished_at', 'paths', 'horizon', 'ruin_fraction', 'seed']
+        read_only_fields = ['kind', 'status', 'parameters', 'result', 'error', 'created_at', 'started_at',
+                            'finished_at']
 
+    def create(self, validated_data):
+        validated_data['parameters'] = {name: validated_data.pop(name) for name in self.parameter_fields
+                                        if name in validated_data}
+        return super().create(validated_data)
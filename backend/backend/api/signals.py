@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .models import CompletedTrade, Deposit, OpenPosition, Order, Tombstone, UserStats
+
+TOMBSTONE_KINDS = {Order: "order", CompletedTrade: "completed_trade", Deposit: "deposit",
+                   OpenPosition: "open_position"}
+
+
+def journal_owner_id(instance):
+    if isinstance(instance, CompletedTrade):
+        return instance.initial_order.user_id
+    if hasattr(instance, 'user_id'):
+        return instance.user_id
+    return instance.pk
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=CompletedTrade)
+@receiver([post_save, post_delete], sender=Deposit)
+@receiver([post_save, post_delete], sender=OpenPosition)
+@receiver([post_save, post_delete], sender=UserStats)
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Bumps the owner's cache version once the write commits.
+
+    Bumping after commit means a reader can never cache pre-commit rows under the new
+    version, and rolled-back writes leave the cache untouched.
+    """
+    user_id = journal_owner_id(instance)
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=CompletedTrade)
+@receiver(post_delete, sender=Deposit)
+@receiver(post_delete, sender=OpenPosition)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """Logs the deletion for /api/sync/, including rows removed by a cascade.
+
+    Deleting the whole account needs no tombstones (and they would point at a user that is
+    about to disappear).
+    """
+    if isinstance(origin, get_user_model()):
+        return
+    Tombstone.objects.create(user_id=journal_owner_id(instance), kind=TOMBSTONE_KINDS[sender], object_id=instance.pk)
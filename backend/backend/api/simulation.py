@@ -0,0 +1,60 @@
+"""Monte Carlo bootstrap of a trade P/L distribution.
+
+Pure NumPy with no Django imports, so batches can run in spawned worker processes.
+"""
+import numpy as np
+
+# Upper bound on paths x trades resampled per batch (each float64 array is 8 bytes per cell).
+MAX_BATCH_CELLS = 2_000_000
+FINAL_EQUITY_PERCENTILES = (5, 25, 50, 75, 95)
+DRAWDOWN_PERCENTILES = (50, 75, 90, 95, 99)
+DRAWDOWN_HISTOGRAM_BINS = 10
+
+
+def simulate_batch(net, starting_balance, paths, horizon, ruin_level, seed):
+    """Resamples ``paths`` equity paths of ``horizon`` trades each.
+
+    Returns (final equity, max drawdown, ruined) arrays with one entry per path.
+    """
+    rng = np.random.default_rng(seed)
+    equity = starting_balance + np.cumsum(net[rng.integers(0, net.size, size=(paths, horizon))], axis=1)
+    peaks = np.maximum(np.maximum.accumulate(equity, axis=1), starting_balance)
+    return equity[:, -1], (peaks - equity).max(axis=1), equity.min(axis=1) <= ruin_level
+
+
+def simulate(net, starting_balance, paths, horizon, ruin_fraction, seed=None, executor=None):
+    """Runs the simulation in bounded-memory batches, on ``executor`` when one is given."""
+    ruin_level = starting_balance * (1 - ruin_fraction)
+    batch_paths = max(1, MAX_BATCH_CELLS // horizon)
+    sizes = [min(batch_paths, paths - start) for start in range(0, paths, batch_paths)]
+    # Independent, reproducible random streams per batch, whichever process runs it.
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    batches = ([net] * len(sizes), [starting_balance] * len(sizes), sizes, [horizon] * len(sizes),
+               [ruin_level] * len(sizes), seeds)
+    results = list(executor.map(simulate_batch, *batches) if executor else map(simulate_batch, *batches))
+
+    final_equity = np.concatenate([result[0] for result in results])
+    max_drawdown = np.concatenate([result[1] for result in results])
+    ruined = np.concatenate([result[2] for result in results])
+    return summarize(final_equity, max_drawdown, ruined, starting_balance, ruin_level, horizon)
+
+
+def summarize(final_equity, max_drawdown, ruined, starting_balance, ruin_level, horizon):
+    counts, edges = np.histogram(max_drawdown, bins=DRAWDOWN_HISTOGRAM_BINS)
+    return {
+        'paths': int(final_equity.size),
+        'horizon': horizon,
+        'starting_balance': round(starting_balance, 2),
+        'ruin_level': round(ruin_level, 2),
+        'risk_of_ruin': round(float(ruined.mean()) * 100, 2),
+        'probability_of_profit': round(float((final_equity > starting_balance).mean()) * 100, 2),
+        'mean_final_equity': round(float(final_equity.mean()), 2),
+        'final_equity': _percentiles(final_equity, FINAL_EQUITY_PERCENTILES),
+        'max_drawdown': _percentiles(max_drawdown, DRAWDOWN_PERCENTILES),
+        'max_drawdown_histogram': [{'from': round(float(low), 2), 'to': round(float(high), 2), 'count': int(count)}
+                                   for low, high, count in zip(edges[:-1], edges[1:], counts)],
+    }
+
+
+def _percentiles(values, percentiles):
+    return {f"p{pct}": round(float(value), 2) for pct, value in zip(percentiles, np.percentile(values, percentiles))}
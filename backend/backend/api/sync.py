@@ -0,0 +1,65 @@
+"""Delta sync: the journal rows changed since a cursor, and tombstones for the deleted ones.
+
+The cursor is the server time of the previous sync. Each sync starts a little before it
+(SYNC_OVERLAP) so rows written by transactions that were still open at that moment are not
+missed; clients merge rows by id, so seeing a row twice is harmless.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import CompletedTrade, Deposit, OpenPosition, Order, Tombstone
+
+SYNC_OVERLAP = timedelta(seconds=10)
+# Tombstones older than this are pruned; a client whose cursor is older gets a full snapshot.
+TOMBSTONE_RETENTION = timedelta(days=30)
+# Response key for each tombstone kind.
+SYNC_KINDS = {"order": 'orders', "completed_trade": 'completed_trades', "deposit": 'deposits',
+              "open_position": 'open_positions'}
+
+
+def encode_cursor(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns the cursor's time; raises ValueError for anything that is not one of ours."""
+    # Bad base64, bad UTF-8 and bad ISO dates all raise ValueError subclasses.
+    moment = datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+    if timezone.is_naive(moment):
+        raise ValueError("Invalid cursor")
+    return moment
+
+
+def journal_changes(user, since=None):
+    """Returns ``(querysets, deleted ids, full, cursor)`` for the user's journal since ``since``.
+
+    ``full`` is True when the client has to replace its copy: it had no cursor, or one older
+    than the tombstones we keep. Positions that dropped to zero are reported as deleted, since
+    the open-positions list leaves them out.
+    """
+    now = timezone.now()
+    full = since is None or since < now - TOMBSTONE_RETENTION
+    querysets = {
+        'orders': Order.objects.filter(user=user).select_related('user', 'stock'),
+        'completed_trades': CompletedTrade.objects.filter(initial_order__user=user)
+        .select_related('initial_order__stock'),
+        'deposits': Deposit.objects.filter(user=user).select_related('user'),
+        'open_positions': OpenPosition.objects.filter(user=user).select_related('stock'),
+    }
+    deleted = {key: [] for key in SYNC_KINDS.values()}
+    if full:
+        querysets['open_positions'] = querysets['open_positions'].filter(quantity__gt=0)
+    else:
+        start = since - SYNC_OVERLAP
+        querysets['orders'] = querysets['orders'].filter(updated_at__gt=start)
+        querysets['completed_trades'] = querysets['completed_trades'].filter(updated_at__gt=start)
+        querysets['deposits'] = querysets['deposits'].filter(updated_at__gt=start)
+        positions = list(querysets['open_positions'].filter(last_updated__gt=start))
+        querysets['open_positions'] = [position for position in positions if (position.quantity or 0) > 0]
+        deleted['open_positions'] += [position.id for position in positions if (position.quantity or 0) <= 0]
+        for kind, object_id in Tombstone.objects.filter(user=user, deleted_at__gt=start) \
+                .values_list('kind', 'object_id'):
+            deleted[SYNC_KINDS[kind]].append(object_id)
+    return querysets, deleted, full, encode_cursor(now)
@@ -1,3 +1,1039 @@
-from django.test import TestCase
+import gzip
+import importlib
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.forms.models import model_to_dict
+from django.test import AsyncClient, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import exports, jobs
+from .analytics import order_stats, trade_stats
+from .cache import get_version, journal_cache
+from .importers import import_orders, read_order_records
+from .middleware import QueryRecorder
+from .models import CompletedTrade, DailyPnL, Deposit, OpenPosition, Order, PasswordResetOTP, SimulationJob, Stock, \
+    UserStats
+from .renderers import ORJSONRenderer
+from .views import CompletedTradeViewSet
+
+User = get_user_model()
+
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)'),
+    'postgresql': re.compile(r'\bSeq Scan\b'),
+}
+
+
+class JournalDataMixin:
+    """Two users with the same journal: nine orders over AAPL, MSFT and TSLA on 2024-01-01..09,
+    the odd days closed on 2024-02-<day> for a net of day * 10 - 50, three positions and a deposit.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='trader', email='trader@example.com', password='secret-pass')
+        other = User.objects.create_user(username='other', email='other@example.com', password='secret-pass')
+        stocks = [Stock.objects.create(symbol=symbol) for symbol in ('AAPL', 'MSFT', 'TSLA')]
+        for owner in (cls.user, other):
+            for day, stock in enumerate(stocks * 3, start=1):
+                order = Order.objects.create(user=owner, stock=stock, date=date(2024, 1, day), quantity=10,
+                                             price=Decimal('100.00'), order_type='buy')
+                if day % 2:
+                    CompletedTrade.objects.create(initial_order=order, close_price=Decimal('95.00') + day,
+                                                  close_date=date(2024, 2, day), net_amount=Decimal(day * 10 - 50),
+                                                  duration=31)
+                    order.status = 'closed'
+                    order.save()
+            for stock in stocks:
+                OpenPosition.objects.create(user=owner, stock=stock, quantity=10, total_value=Decimal('1000.00'))
+            Deposit.objects.create(user=owner, amount=Decimal('500.00'))
+            PasswordResetOTP.objects.create(user=owner, otp='123456')
+            UserStats.rebuild(owner)
+            DailyPnL.rebuild(owner)
+        cls.trade = CompletedTrade.objects.filter(initial_order__user=cls.user).first()
+
+    def setUp(self):
+        journal_cache().clear()  # cached responses would skip the queries under test
+        self.client.force_authenticate(self.user)
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+
+class QueryPlanTests(JournalDataMixin, APITestCase):
+    """Runs EXPLAIN on every query the hot read/write paths issue and fails on full table scans.
+
+    Superuser "list everything" endpoints are deliberately not covered: scanning the
+    whole table is what they are asked to do.
+    """
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def assertNoFullScans(self, func):
+        """Runs func, then EXPLAINs every statement it executed."""
+        if connection.vendor not in FULL_SCAN_PATTERNS:
+            self.skipTest(f'No query-plan checks for {connection.vendor}')
+        with CaptureQueriesContext(connection) as captured:
+            result = func()
+        statements = [query['sql'] for query in captured.captured_queries
+                      if query['sql'].lstrip().upper().startswith(EXPLAINED_STATEMENTS)]
+        self.assertTrue(statements, 'expected at least one query to explain')
+        for sql in statements:
+            plan = self.explain(sql)
+            full_scans = [line for line in plan if FULL_SCAN_PATTERNS[connection.vendor].search(line)]
+            self.assertFalse(full_scans, f'Full table scan in:\n{sql}\nplan:\n' + '\n'.join(plan))
+        return result
+
+    def test_list_endpoints(self):
+        for path in ('/api/orders/', '/api/orders/?status=open', '/api/orders/?symbol=aapl&from=2024-01-02',
+                     '/api/completed-trades/', '/api/completed-trades/?outcome=profitable',
+                     '/api/open-positions/', '/api/deposits/', '/api/users/'):
+            with self.subTest(path=path):
+                self.assertNoFullScans(lambda: self.get(path))
+
+    def test_list_rows_match_serializers(self):
+        # The list endpoints render values() rows; sync still goes through the serializers.
+        snapshot = self.get('/api/sync/').json()
+        for path, key in (('/api/orders/', 'orders'), ('/api/completed-trades/', 'completed_trades'),
+                          ('/api/open-positions/', 'open_positions')):
+            with self.subTest(path=path):
+                rows = self.get(path).json()
+                rows = rows['results'] if isinstance(rows, dict) else rows
+                self.assertEqual(sorted(rows, key=lambda row: row['id']),
+                                 sorted(snapshot[key], key=lambda row: row['id']))
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(1):
+            rows = self.get('/api/orders/?fields=id,symbol').json()['results']
+        self.assertEqual(set(rows[0]), {'id', 'symbol'})
+        with self.assertNumQueries(1):  # no stats row
+            self.assertEqual(set(self.get(f'/api/users/{self.user.id}/?fields=id,username').data), {'id', 'username'})
+
+        trades = self.assertNoFullScans(lambda: self.get('/api/completed-trades/?expand=order&fields=id,order'))
+        order = trades.data['results'][0]['order']
+        self.assertEqual(order['symbol'], order['stock']['symbol'])
+        with self.assertNumQueries(1):
+            deposits = self.get('/api/deposits/?expand=user').data['results']
+        self.assertIn('win_rate', deposits[0]['user'])
+
+    def test_next_page(self):
+        first = self.get('/api/orders/?page_size=2').json()
+        self.assertNoFullScans(lambda: self.get(first['next']))
+
+    def test_user_stats(self):
+        self.assertNoFullScans(lambda: self.get(f'/api/users/{self.user.id}/'))
+        self.assertNoFullScans(lambda: self.get(f'/api/users/{self.user.id}/stats/?symbol=AAPL&from=2024-02-01'))
+
+    def test_dashboard(self):
+        with self.assertNumQueries(4):
+            response = self.get('/api/dashboard/')
+        self.assertEqual(response.data['open_positions']['count'], 3)
+        self.assertEqual(len(response.data['recent_completed_trades']), 5)
+        journal_cache().clear()
+        self.assertNoFullScans(lambda: self.get('/api/dashboard/'))
+
+    def test_async_views_match_drf(self):
+        auth = {'Authorization': f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+        async_get = async_to_sync(AsyncClient().get)
+        other = User.objects.get(username='other')
+        for path in ('/api/dashboard/', f'/api/users/{self.user.id}/stats/?symbol=AAPL',
+                     f'/api/users/{self.user.id}/stats/?order_type=short', f'/api/users/{other.id}/stats/',
+                     '/api/completed-trades/?page_size=2', '/api/completed-trades/?outcome=bad',
+                     '/api/open-positions/?fields=id,symbol'):
+            with self.subTest(path=path):
+                journal_cache().clear()
+                expected = self.client.get(path)
+                journal_cache().clear()
+                response = async_get(path, headers=auth)
+                self.assertEqual(response.resolver_match.func.view_class.__module__, 'api.async_views')
+                self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+
+        journal_cache().clear()
+        with self.assertNumQueries(5):  # the JWT user lookup, then the dashboard's four queries
+            async_get('/api/dashboard/', headers=auth)
+        self.client.force_authenticate(None)
+        self.assertEqual(async_get('/api/open-positions/').content,
+                         self.client.get('/api/open-positions/').content)
+
+    def test_sync(self):
+        # Age the fixtures past the sync overlap window so only the changes below come back.
+        earlier = timezone.now() - timedelta(hours=1)
+        for model in (Order, CompletedTrade, Deposit):
+            model.objects.update(updated_at=earlier)
+        OpenPosition.objects.update(last_updated=earlier)
+        snapshot = self.assertNoFullScans(lambda: self.get('/api/sync/'))
+        self.assertTrue(snapshot.data['full'])
+        self.assertEqual(len(snapshot.data['orders']), 9)
+
+        order = self.trade.initial_order
+        self.client.delete(f'/api/completed-trades/{self.trade.id}/')
+        OpenPosition.objects.filter(user=self.user, stock__symbol='MSFT').update(quantity=0, last_updated=timezone.now())
+        delta = self.assertNoFullScans(lambda: self.get(f"/api/sync/?since={snapshot.data['cursor']}"))
+        self.assertFalse(delta.data['full'])
+        self.assertEqual([row['id'] for row in delta.data['orders']], [order.id])
+        self.assertEqual(delta.data['deleted']['completed_trades'], [self.trade.id])
+        self.assertEqual(len(delta.data['deleted']['open_positions']), 1)
+        self.assertEqual(self.client.get('/api/sync/?since=nonsense').status_code, 400)
+
+        # Without a snapshot the first call only starts the cursor, and costs no journal query.
+        with CaptureQueriesContext(connection) as queries:
+            start = self.get('/api/sync/?snapshot=false').data
+        self.assertTrue(start['full'])
+        self.assertEqual([start[key] for key in ('orders', 'completed_trades', 'deposits', 'open_positions')],
+                         [[], [], [], []])
+        self.assertFalse([query for query in queries if '"api_order"' in query['sql']])
+
+    def test_risk_analytics(self):
+        response = self.assertNoFullScans(lambda: self.get('/api/analytics/risk/?symbol=AAPL'))
+        self.assertEqual(response.data['trades'], 2)
+
+    def test_symbol_breakdown(self):
+        response = self.assertNoFullScans(lambda: self.get('/api/analytics/by-symbol/?sort=-win_rate&limit=2'))
+        self.assertEqual([row['symbol'] for row in response.data], ['AAPL', 'TSLA'])
+        self.assertEqual(response.data[0]['open_quantity'], 10)
+
+    def test_backtest(self):
+        grid = {'fixed_fractional': {'fraction': [0.1, 0.5]}, 'kelly': {'multiplier': 1},
+                'max_concurrent': {'positions': 2}}
+        response = self.assertNoFullScans(
+            lambda: self.client.post('/api/analytics/backtest/', {'grid': grid}, format='json'))
+        self.assertEqual(response.status_code, 200, response.content)
+        # Every trade is still open when the next opens, so two slots take only two of them.
+        self.assertEqual([row['completed_trades'] for row in response.data['results']], [5, 5, 5, 2])
+        self.assertEqual(len(response.data['curve_dates']), 5)
+
+    def test_backtest_rejects_fractional_positions(self):
+        response = self.client.post('/api/analytics/backtest/',
+                                    {'grid': {'max_concurrent': {'positions': [2, 2.5]}}}, format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn('whole-number', response.data['error'])
+
+    def test_simulation_jobs(self):
+        response = self.client.post('/api/simulations/', {'paths': 500}, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertNoFullScans(lambda: self.get(f"/api/simulations/{response.data['id']}/"))
+        self.assertNoFullScans(lambda: self.get('/api/simulations/'))
+
+    def test_model_properties(self):
+        for name in ('total_deposits', 'no_of_open_orders', 'no_of_closed_orders', 'total_no_of_orders',
+                     'win_rate', 'profit_factor', 'average_profit_loss', 'average_holding_duration'):
+            with self.subTest(property=name):
+                self.assertNoFullScans(lambda: getattr(self.user, name))
+        self.assertNoFullScans(lambda: trade_stats(self.user, order_type='buy'))
+        self.assertNoFullScans(lambda: order_stats(self.user))
+        self.assertNoFullScans(lambda: UserStats.rebuild(self.user))
+
+    def test_create_and_close_order(self):
+        def create_and_close():
+            response = self.client.post('/api/orders/', {'symbol': 'aapl', 'quantity': 5, 'price': '90.00',
+                                                         'date': '2024-03-01', 'order_type': 'buy'}, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            response = self.client.post(f"/api/orders/{response.data['id']}/close/",
+                                        {'close_price': '99.00', 'close_date': '2024-03-05'}, format='json')
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assertNoFullScans(create_and_close)
+
+    def test_close_batch(self):
+        orders = Order.objects.filter(user=self.user, status='open')[:3]
+        entries = [{'order_id': order.id, 'close_price': '101.00', 'close_date': '2024-03-01'} for order in orders]
+        response = self.assertNoFullScans(lambda: self.client.post('/api/orders/close-batch/', entries,
+                                                                   format='json'))
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_delete_completed_trade(self):
+        self.assertNoFullScans(lambda: self.client.delete(f'/api/completed-trades/{self.trade.id}/'))
+
+    def test_deposit(self):
+        self.assertNoFullScans(lambda: self.client.post('/api/deposits/', {'amount': '25.00'}, format='json'))
+
+    def test_pnl_series(self):
+        for period in ('daily', 'weekly', 'monthly'):
+            with self.subTest(period=period):
+                response = self.assertNoFullScans(lambda: self.get(f'/api/pnl/{period}/?from=2024-02-02'))
+                self.assertEqual(sum(bucket['trade_count'] for bucket in response.data['buckets']), 4)
+        self.assertEqual(self.get('/api/pnl/monthly/').data['buckets'][-1]['balance'], Decimal('500.00'))
+
+    def test_pnl_rollup_matches_rebuild(self):
+        orders = Order.objects.filter(user=self.user, status='open')
+        self.client.post(f'/api/orders/{orders[0].id}/close/', {'close_price': '99.00', 'close_date': '2024-02-01'},
+                         format='json')
+        self.client.post('/api/orders/close-batch/', [{'order_id': order.id, 'close_price': '120.00',
+                                                       'close_date': '2024-03-01'} for order in orders[1:3]],
+                         format='json')
+        self.client.delete(f'/api/completed-trades/{self.trade.id}/')
+        self.client.post('/api/deposits/', {'amount': '25.00'}, format='json')
+        closed_order = CompletedTrade.objects.filter(initial_order__user=self.user).last().initial_order_id
+        self.client.delete(f'/api/orders/{closed_order}/')
+
+        def rows():
+            return list(DailyPnL.objects.filter(user=self.user).order_by('date').values('date', *DailyPnL.COUNTERS))
+        incremental = rows()
+        DailyPnL.rebuild(self.user)
+        self.assertEqual(incremental, rows())
+
+    def test_superuser_leaderboard(self):
+        # The leaderboard ranks every user, so it scans by design; a page must still be one query.
+        self.client.force_authenticate(User.objects.create_superuser(username='admin', email='admin@example.com',
+                                                                     password='secret-pass'))
+        with self.assertNumQueries(1):
+            response = self.get('/api/users/?sort=-win_rate&min_trades=1&page_size=1')
+        self.assertEqual([(row['username'], row['rank'], row['win_rate']) for row in response.data['results']],
+                         [('trader', 1, 40.0)])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_auth_lookups(self):
+        self.client.force_authenticate(None)
+        self.assertNoFullScans(lambda: self.client.post('/auth/login/', {'email': 'trader@example.com',
+                                                                         'password': 'secret-pass'}, format='json'))
+        self.assertNoFullScans(lambda: self.client.post('/auth/verify-otp/', {'email': 'trader@example.com',
+                                                                              'otp': '123456'}, format='json'))
+        self.assertNoFullScans(lambda: self.client.post('/auth/register/', {'username': 'new', 'password': 'x',
+                                                                            'email': 'trader@example.com'},
+                                                        format='json'))
+
+
+class ResponseEncodingTests(JournalDataMixin, APITestCase):
+    """How response bodies are rendered and compressed."""
+
+    def test_json_rendering_and_compression(self):
+        payload = dict(self.get('/api/sync/').data, at=timezone.now(), price=Decimal('1.50'), day=date(2024, 1, 2))
+        self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+        response = self.client.get('/api/sync/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['orders'], response.data['orders'])
+        self.client.force_authenticate(None)
+        login = self.client.post('/auth/login/', {'email': 'trader@example.com', 'password': 'secret-pass'},
+                                 format='json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(login.has_header('Content-Encoding'))  # below RESPONSE_COMPRESSION_MIN_BYTES
+
+    def test_brotli_falls_back_when_not_installed(self):
+        with mock.patch('api.middleware.brotli', None):
+            response = self.client.get('/api/sync/', HTTP_ACCEPT_ENCODING='br, gzip;q=0.5')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(gzip.decompress(response.content))['orders'], response.data['orders'])
+
+            response = self.client.get('/api/sync/', HTTP_ACCEPT_ENCODING='br')
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(json.loads(response.content)['orders'], response.data['orders'])
+
+
+class JournalReadTests(JournalDataMixin, APITestCase):
+    """What the read endpoints return for the shared journal, beyond how they query it."""
+
+    def test_user_detail_reads_the_stats_row(self):
+        expected = {'id': self.user.id, 'username': 'trader', 'email': 'trader@example.com', 'no_of_open_orders': 4,
+                    'no_of_closed_orders': 5, 'total_no_of_orders': 9, 'win_rate': 40.0, 'profit_factor': 1.0,
+                    'average_profit_loss': 0.0, 'average_holding_duration': 31.0, 'total_deposits': Decimal('500.00')}
+        with self.assertNumQueries(1):  # the user joined to its stats row
+            self.assertEqual(self.get(f'/api/users/{self.user.id}/').data, expected)
+
+        stats = model_to_dict(UserStats.objects.get(user=self.user), exclude=['id'])
+        UserStats.objects.filter(user=self.user).delete()
+        call_command('rebuild_user_stats', '--user', str(self.user.id), stdout=io.StringIO())
+        self.assertEqual(model_to_dict(UserStats.objects.get(user=self.user), exclude=['id']), stats)
+        journal_cache().clear()
+        self.assertEqual(self.get(f'/api/users/{self.user.id}/').data, expected)
+
+    def test_trade_stats_filters(self):
+        def stats(query=""):
+            data = self.get(f'/api/users/{self.user.id}/stats/{query}').data
+            return {key: float(value) if value is not None else None for key, value in data.items()}
+
+        self.assertEqual(stats(), {
+            'completed_trades': 5, 'wins': 2, 'losses': 2, 'win_rate': 40.0, 'profit_factor': 1.0,
+            'average_profit_loss': 0.0, 'average_holding_duration': 31.0, 'best_trade': 40.0, 'worst_trade': -40.0,
+            'net_profit_loss': 0.0, 'expectancy': 0.0})
+        self.assertEqual(stats('?symbol=aapl'), {
+            'completed_trades': 2, 'wins': 1, 'losses': 1, 'win_rate': 50.0, 'profit_factor': 0.5,
+            'average_profit_loss': -10.0, 'average_holding_duration': 31.0, 'best_trade': 20.0, 'worst_trade': -40.0,
+            'net_profit_loss': -20.0, 'expectancy': -10.0})
+        self.assertEqual(stats('?from=2024-02-04&to=2024-02-08'), {
+            'completed_trades': 2, 'wins': 1, 'losses': 0, 'win_rate': 50.0, 'profit_factor': 0.0,
+            'average_profit_loss': 10.0, 'average_holding_duration': 31.0, 'best_trade': 20.0, 'worst_trade': 0.0,
+            'net_profit_loss': 20.0, 'expectancy': 10.0})
+        self.assertEqual(stats('?order_type=sell')['completed_trades'], 0)
+
+        self.assertEqual(self.client.get(f'/api/users/{self.user.id}/stats/?from=02/04/2024').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/users/{self.user.id}/stats/?order_type=short').status_code, 400)
+        other = User.objects.get(username='other')
+        self.assertEqual(self.client.get(f'/api/users/{other.id}/stats/').status_code, 404)
+        self.assertEqual((self.user.win_rate, self.user.profit_factor), (40.0, 1.0))
+
+    def test_list_queries_do_not_grow_with_the_page(self):
+        for amount in ('10.00', '20.00', '30.00'):
+            Deposit.objects.create(user=self.user, amount=Decimal(amount))
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='secret-pass')
+
+        def queries(path, user):
+            self.client.force_authenticate(user)
+            journal_cache().clear()
+            with CaptureQueriesContext(connection) as captured:
+                rows = self.get(path).data['results']
+            return len(captured), rows
+
+        for path in ('/api/orders/', '/api/completed-trades/', '/api/deposits/'):
+            for user in (self.user, admin):
+                with self.subTest(path=path, user=user.username):
+                    small, rows = queries(f'{path}?page_size=1', user)
+                    large, all_rows = queries(f'{path}?page_size=50', user)
+                    self.assertEqual((len(rows), small), (1, large))
+                    self.assertGreater(len(all_rows), 3)
+                    for row in all_rows:
+                        if 'user' in row:  # a reference to the owner, without their stats
+                            self.assertEqual(set(row['user']), {'id', 'username', 'email'})
+
+    def walk(self, path):
+        """Follows ``next`` from ``path``; returns the pages' ids."""
+        pages = []
+        while path:
+            page = self.get(path).data
+            pages.append([row['id'] for row in page['results']])
+            path = page['next']
+        return pages
+
+    def test_keyset_pages(self):
+        stock = Stock.objects.get(symbol='AAPL')
+        ties = [Order.objects.create(user=self.user, stock=stock, date=date(2024, 1, 5), quantity=1,
+                                     price=Decimal('1.00'), order_type='buy').id for _ in range(2)]
+        by_day = {order.date.day: order.id for order in Order.objects.filter(user=self.user).exclude(id__in=ties)}
+        newest_first = [by_day[9], by_day[8], by_day[7], by_day[6], ties[1], ties[0], by_day[5], by_day[4],
+                        by_day[3], by_day[2], by_day[1]]
+        # The first page boundary splits the three 2024-01-05 orders; ties are broken by id.
+        pages = self.walk('/api/orders/?page_size=5')
+        self.assertEqual([len(page) for page in pages], [5, 5, 1])
+        self.assertEqual(sum(pages, []), newest_first)
+
+        # A cursor is a position, not an offset: rows added above it do not shift the next page.
+        first = self.get('/api/orders/?page_size=5').data
+        Order.objects.create(user=self.user, stock=stock, date=date(2024, 3, 1), quantity=1, price=Decimal('1.00'),
+                             order_type='buy')
+        journal_cache().clear()
+        self.assertEqual([row['id'] for row in self.get(first['next']).data['results']], newest_first[5:10])
+        self.assertEqual(self.client.get('/api/orders/?cursor=garbage').status_code, 404)
+
+    def test_list_filters(self):
+        def ids(path):
+            return sum(self.walk(path), [])
+
+        orders = {order.date.day: order.id for order in Order.objects.filter(user=self.user)}
+        trades = {trade.close_date.day: trade.id
+                  for trade in CompletedTrade.objects.filter(initial_order__user=self.user)}
+        self.assertEqual(ids('/api/orders/?status=open&page_size=3'), [orders[8], orders[6], orders[4], orders[2]])
+        self.assertEqual(ids('/api/orders/?symbol=msft&status=closed'), [orders[5]])
+        self.assertEqual(ids('/api/orders/?symbol=MS'), [])
+        self.assertEqual(ids('/api/orders/?from=2024-01-03&to=2024-01-05'), [orders[5], orders[4], orders[3]])
+        self.assertEqual(ids('/api/orders/?order_type=sell'), [])
+        self.assertEqual(ids('/api/completed-trades/?outcome=profitable'), [trades[9], trades[7]])
+        self.assertEqual(ids('/api/completed-trades/?outcome=losing&symbol=TSLA'), [trades[3]])
+        self.assertEqual(ids('/api/completed-trades/?from=2024-02-08'), [trades[9]])
+        self.assertEqual(ids('/api/deposits/?to=2000-01-01'), [])
+        for path in ('/api/orders/?status=pending', '/api/orders/?order_type=short', '/api/orders/?from=2024-13-01',
+                     '/api/completed-trades/?outcome=even'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 400)
+
+
+class JournalExportTests(JournalDataMixin, APITestCase):
+    """GET <list>/export/<format>/ streams the user's rows, oldest first, through the list filters."""
+
+    def stream(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def export(self, path):
+        return b"".join(self.stream(path).streaming_content)
+
+    def test_csv(self):
+        response = self.stream('/api/orders/export/csv/')
+        self.assertEqual(response['Content-Type'], "text/csv")
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="orders-\d{8}\.csv"$')
+        header, *rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(header, "id,symbol,date,order_type,quantity,price,status,comment")
+        orders = Order.objects.filter(user=self.user).order_by('date')
+        self.assertEqual(rows, [f"{order.id},{order.stock.symbol},{order.date},buy,10,100.00,{order.status},"
+                                for order in orders])
+
+        rows = self.export('/api/orders/export/csv/?symbol=aapl&to=2024-01-05').decode().splitlines()[1:]
+        self.assertEqual([row.split(',')[1:3] for row in rows], [['AAPL', '2024-01-01'], ['AAPL', '2024-01-04']])
+        rows = self.export('/api/deposits/export/csv/').decode().splitlines()
+        self.assertEqual((rows[0], rows[1].split(',')[1]), ("id,amount,deposited_at", "500.00"))
+
+    def test_jsonl(self):
+        lines = self.export('/api/completed-trades/export/jsonl/?from=2024-02-03&to=2024-02-07').splitlines()
+        trades = [json.loads(line) for line in lines]
+        self.assertEqual(list(trades[0]), list(CompletedTradeViewSet.export_fields))
+        self.assertEqual([(trade['symbol'], trade['close_date'], trade['net_amount']) for trade in trades],
+                         [('TSLA', '2024-02-03', '-20.00'), ('MSFT', '2024-02-05', '0.00'),
+                          ('AAPL', '2024-02-07', '20.00')])
+
+        trades = [json.loads(line) for line in self.export('/api/completed-trades/export/jsonl/?outcome=losing'
+                                                           '&order_type=buy').splitlines()]
+        self.assertEqual([trade['close_date'] for trade in trades], ['2024-02-01', '2024-02-03'])
+        self.assertEqual(self.client.get('/api/completed-trades/export/jsonl/?outcome=even').status_code, 400)
+
+    def test_streams_in_chunks(self):
+        whole = self.export('/api/orders/export/jsonl/')
+        with mock.patch.object(exports, 'STREAM_BUFFER_SIZE', 1):
+            chunks = list(self.stream('/api/orders/export/jsonl/').streaming_content)
+        self.assertEqual(len(chunks), 9)
+        self.assertEqual(b"".join(chunks), whole)
+
+    @unittest.skipIf(exports.pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(
+            self.export('/api/completed-trades/export/parquet/?symbol=AAPL')))
+        self.assertEqual(table.column_names, list(CompletedTradeViewSet.export_fields))
+        rows = table.to_pylist()
+        self.assertEqual([(row['close_date'], row['net_amount']) for row in rows],
+                         [(date(2024, 2, 1), Decimal('-40.00')), (date(2024, 2, 7), Decimal('20.00'))])
+
+    @unittest.skipUnless(exports.pyarrow is None, "pyarrow is installed")
+    def test_parquet_without_pyarrow(self):
+        self.assertEqual(self.client.get('/api/orders/export/parquet/').status_code, 400)
+
+
+class JournalCacheTests(JournalDataMixin, APITestCase):
+    """Cached responses are keyed by the user's change version, which every journal write bumps."""
+
+    def write(self, method, path, data=None):
+        # The version is bumped once the write's transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(path, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return response
+
+    def test_write_bumps_version_and_next_get_is_fresh(self):
+        first = self.get('/api/deposits/')
+        self.assertEqual(first['X-Cache'], "MISS")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/deposits/')['X-Cache'], "HIT")
+
+        version = get_version(self.user.id)
+        deposit = self.write('post', '/api/deposits/', {'amount': '125.00'}).data
+        self.assertGreater(get_version(self.user.id), version)
+        fresh = self.get('/api/deposits/')
+        self.assertEqual(fresh['X-Cache'], "MISS")
+        self.assertEqual([row['id'] for row in fresh.data['results']][0], deposit['id'])
+        self.assertEqual(len(fresh.data['results']), len(first.data['results']) + 1)
+
+        total_deposits = lambda: Decimal(str(self.get('/api/dashboard/').data['user']['total_deposits']))
+        self.assertEqual(total_deposits(), Decimal('625.00'))
+        self.write('delete', f"/api/deposits/{deposit['id']}/")
+        self.assertEqual(total_deposits(), Decimal('500.00'))
+
+    def test_other_users_writes_keep_the_cache(self):
+        self.get('/api/open-positions/')
+        other = User.objects.get(username='other')
+        with self.captureOnCommitCallbacks(execute=True):
+            OpenPosition.objects.filter(user=other).update(quantity=0)
+            Deposit.objects.create(user=other, amount=Decimal('1.00'))
+        self.assertEqual(self.get('/api/open-positions/')['X-Cache'], "HIT")
+
+    def test_if_none_match(self):
+        etag = self.get('/api/orders/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # The ETag covers the query string too.
+        self.assertEqual(self.client.get('/api/orders/?symbol=AAPL', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        order = Order.objects.filter(user=self.user).first()
+        self.write('patch', f'/api/orders/{order.id}/', {'comment': "moved my stop"})
+        response = self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn("moved my stop", [row['comment'] for row in response.data['results']])
+        self.assertEqual(self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.get('/api/dashboard/')['Last-Modified']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/dashboard/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        with mock.patch('api.cache.time.time', return_value=time.time() + 5):
+            self.write('post', '/api/deposits/', {'amount': '10.00'})
+        self.assertEqual(self.client.get('/api/dashboard/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+
+class PerformanceMetricsTests(JournalDataMixin, APITestCase):
+    """The middleware's per-view numbers, as scraped from /metrics, and the slow-request log."""
+
+    def scrape(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], "text/plain; version=0.0.4; charset=utf-8")
+        return response.content.decode()
+
+    @staticmethod
+    def sample(text, name, **labels):
+        selector = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+        match = re.search(rf'^{name}\{{{re.escape(selector)}\}} (\S+)$', text, re.MULTILINE)
+        return float(match.group(1)) if match else 0
+
+    def test_requests_are_recorded_per_view(self):
+        labels = {'view': "OrderViewSet", 'action': "list"}
+        before = self.scrape()
+        response = self.get('/api/orders/?page_size=3')
+        after = self.scrape()
+
+        def change(name, **extra):
+            return self.sample(after, name, **labels, **extra) - self.sample(before, name, **labels, **extra)
+
+        self.assertEqual(change('journal_requests_total', status=200), 1)
+        self.assertEqual(change('journal_request_duration_seconds_count'), 1)
+        self.assertEqual(change('journal_request_queries_sum'), 1)  # one keyset query for the page
+        self.assertEqual(change('journal_response_size_bytes_sum'), len(response.content))
+        self.assertGreater(change('journal_request_db_duration_seconds_sum'), 0)
+
+        detail = {'view': "OrderViewSet", 'action': "retrieve"}
+        self.client.get('/api/orders/0/')
+        self.assertEqual(self.sample(self.scrape(), 'journal_requests_total', status=404, **detail)
+                         - self.sample(after, 'journal_requests_total', status=404, **detail), 1)
+
+    def test_duplicate_queries(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for _ in range(3):
+                list(Order.objects.filter(user=self.user))
+            Stock.objects.count()
+        self.assertEqual((recorder.count, recorder.duplicates), (4, 2))
+
+    def test_metrics_are_local_only(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+
+    def test_slow_request_log(self):
+        # Every perf_counter() call moves the middleware's clock on by half a second.
+        clock = mock.Mock(perf_counter=mock.Mock(side_effect=itertools.count(step=0.5)))
+        with override_settings(SLOW_REQUEST_THRESHOLD_MS=1000), mock.patch('api.middleware.time', clock):
+            client = APIClient()  # a new client builds the middleware with the threshold above
+            client.force_authenticate(self.user)
+            with self.assertLogs('api.performance', 'WARNING') as logs:
+                client.get('/api/orders/?symbol=AAPL')
+        self.assertIn("Slow request GET /api/orders/?symbol=AAPL -> 200", logs.output[0])
+        self.assertIn('FROM "api_order"', logs.output[0])
+
+        with override_settings(SLOW_REQUEST_THRESHOLD_MS=60000):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            with self.assertNoLogs('api.performance', 'WARNING'):
+                client.get('/api/orders/')
+
+
+class JournalBookkeepingTests(APITestCase):
+    """Checks that the incrementally kept UserStats and OpenPosition rows match the journal."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', email='trader@example.com', password='secret-pass')
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, symbol='aapl', quantity=5, price='90.00'):
+        response = self.client.post('/api/orders/', {'symbol': symbol, 'quantity': quantity, 'price': price,
+                                                     'date': '2024-03-01', 'order_type': 'buy'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data['id']
+
+    def close_order(self, order_id, close_price='99.00', close_date='2024-03-05'):
+        return self.client.post(f'/api/orders/{order_id}/close/', {'close_price': close_price,
+                                                                    'close_date': close_date}, format='json')
+
+    def assertStatsMatchRebuild(self):
+        stored = model_to_dict(UserStats.objects.get(user=self.user), exclude=['id'])
+        UserStats.rebuild(self.user)
+        self.assertEqual(stored, model_to_dict(UserStats.objects.get(user=self.user), exclude=['id']))
+        open_quantities = {}
+        for order in Order.objects.filter(user=self.user, status='open'):
+            open_quantities[order.stock_id] = open_quantities.get(order.stock_id, 0) + order.quantity
+        positions = {position.stock_id: position.quantity
+                     for position in OpenPosition.objects.filter(user=self.user, quantity__gt=0)}
+        self.assertEqual(positions, open_quantities)
+
+    def test_close_twice(self):
+        order_id = self.create_order()
+        self.assertEqual(self.close_order(order_id).status_code, 200)
+        response = self.close_order(order_id)
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(CompletedTrade.objects.filter(initial_order_id=order_id).count(), 1)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.open_orders, stats.closed_orders, stats.completed_trades), (0, 1, 1))
+        self.assertStatsMatchRebuild()
+
+    def test_counters_follow_every_write(self):
+        first, second, third = self.create_order(), self.create_order('msft', 3, '50.00'), self.create_order()
+        self.assertStatsMatchRebuild()
+        self.close_order(first)
+        self.close_order(second, close_price='40.00')
+        self.assertStatsMatchRebuild()
+
+        trade = CompletedTrade.objects.get(initial_order_id=first)
+        response = self.client.patch(f'/api/completed-trades/{trade.id}/', {'net_amount': '-500.00', 'duration': 9},
+                                     format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.wins, stats.losses, stats.gross_loss), (0, 2, Decimal('-530.00')))
+        self.assertStatsMatchRebuild()
+
+        for changes in ({'quantity': 8, 'price': '95.00'}, {'status': 'closed'}, {'status': 'open'}):
+            with self.subTest(changes=changes):
+                response = self.client.patch(f'/api/orders/{third}/', changes, format='json')
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertStatsMatchRebuild()
+
+        self.assertEqual(self.client.delete(f'/api/completed-trades/{trade.id}/').status_code, 204)
+        self.assertStatsMatchRebuild()
+        self.assertEqual(self.client.delete(f'/api/orders/{first}/').status_code, 204)
+        self.assertStatsMatchRebuild()
+
+    def daily_pnl(self):
+        return list(DailyPnL.objects.filter(user=self.user).order_by('date').values(*DailyPnL.COUNTERS, 'date'))
+
+    def test_daily_pnl_follows_trade_edits(self):
+        self.close_order(self.create_order())
+        self.client.post('/api/deposits/', {'amount': '250.00'}, format='json')
+        trade = CompletedTrade.objects.get(initial_order__user=self.user)
+        response = self.client.patch(f'/api/completed-trades/{trade.id}/',
+                                     {'net_amount': '-20.00', 'close_date': '2024-03-09'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        rows = self.daily_pnl()
+        self.assertEqual([(row['date'], row['realized_pnl']) for row in rows if row['trade_count']],
+                         [(date(2024, 3, 9), Decimal('-20.00'))])
+        DailyPnL.rebuild(self.user)
+        self.assertEqual(rows, self.daily_pnl())
+
+    def test_daily_pnl_backfill(self):
+        self.close_order(self.create_order())
+        self.client.post('/api/deposits/', {'amount': '250.00'}, format='json')
+        rows = self.daily_pnl()
+        DailyPnL.objects.all().delete()  # as before migration 0019
+        importlib.import_module('api.migrations.0021_backfill_daily_pnl').backfill_daily_pnl(django_apps, None)
+        self.assertEqual(self.daily_pnl(), rows)
+
+
+class OrderImportTests(APITestCase):
+    """Broker statement uploads through POST /api/orders/import/ and importers.import_orders()."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', email='trader@example.com', password='secret-pass')
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, content_type='application/octet-stream'):
+        return self.client.post('/api/orders/import/', {'file': SimpleUploadedFile(name, content.encode(), content_type)},
+                                format='multipart')
+
+    def positions(self):
+        return {position.stock.symbol: (position.quantity, position.total_value)
+                for position in OpenPosition.objects.filter(user=self.user).select_related('stock')}
+
+    def assertStatsMatchRebuild(self):
+        stored = model_to_dict(UserStats.objects.get(user=self.user), exclude=['id'])
+        UserStats.rebuild(self.user)
+        self.assertEqual(stored, model_to_dict(UserStats.objects.get(user=self.user), exclude=['id']))
+
+    def test_csv(self):
+        response = self.upload('statement.csv', "Symbol,Date,Quantity,Price,Order_Type,Comment\n"
+                                                "aapl,2024-03-01,5,90.00,buy,first\n"
+                                                "MSFT,2024-03-02,2,310.50,sell,\n"
+                                                "aapl,2024-03-03,1,95.00,buy,\n")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data, {'imported': 3, 'failed': 0, 'errors': [], 'errors_truncated': False})
+        self.assertEqual(list(Order.objects.filter(user=self.user).order_by('date').values_list(
+            'stock__symbol', 'quantity', 'price', 'order_type', 'status', 'comment')),
+            [('AAPL', 5, Decimal('90.00'), 'buy', 'open', 'first'), ('MSFT', 2, Decimal('310.50'), 'sell', 'open', None),
+             ('AAPL', 1, Decimal('95.00'), 'buy', 'open', None)])
+        self.assertEqual(self.positions(), {'AAPL': (6, Decimal('545.00')), 'MSFT': (2, Decimal('621.00'))})
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_orders, stats.open_orders), (3, 3))
+        self.assertStatsMatchRebuild()
+
+    def test_jsonl_reports_errors_by_line(self):
+        lines = [
+            '{"symbol": "tsla", "date": "2024-03-01", "quantity": 4, "price": "200.00", "order_type": "buy"}',
+            '',
+            'not json',
+            '[1, 2]',
+            '{"symbol": "TSLA", "date": "01/03/2024", "quantity": 0, "price": "1.005", "order_type": "hold"}',
+            '{"symbol": "TSLA", "date": "2024-03-02", "quantity": 1, "price": 210, "order_type": "buy"}',
+        ]
+        response = self.upload('statement.jsonl', "\n".join(lines))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.data['imported'], response.data['failed']), (2, 3))
+        errors = {error['line']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertEqual(errors[3], {'row': "Invalid JSON."})
+        self.assertEqual(errors[4], {'row': "Each line must be a JSON object."})
+        self.assertEqual(sorted(errors[5]), ['date', 'order_type', 'price', 'quantity'])
+        self.assertEqual(self.positions(), {'TSLA': (5, Decimal('1010.00'))})
+        self.assertStatsMatchRebuild()
+
+    def test_rejected_uploads(self):
+        self.assertEqual(self.upload('statement.txt', "anything").status_code, 400)
+        response = self.upload('statement.csv', "symbol,date,quantity\nAAPL,2024-03-01,1\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("price, order_type", response.data['error'])
+        response = self.upload('statement.csv', "symbol,date,quantity,price,order_type\nAAPL,2024-03-01,-1,1,buy\n")
+        self.assertEqual((response.status_code, response.data['imported'], response.data['failed']), (400, 0, 1))
+        self.assertFalse(Order.objects.exists())
+
+    def test_batches_larger_than_a_chunk(self):
+        Stock.objects.create(symbol='AAPL')
+        OpenPosition.adjust(self.user, Stock.objects.get(symbol='AAPL'), 2, Decimal('20.00'))
+        UserStats.rebuild(self.user)
+        rows = [f"{'AAPL' if i % 2 else 'NVDA'},2024-03-{i % 28 + 1:02d},{i},1.50,buy" for i in range(1, 12)]
+        upload = SimpleUploadedFile('statement.csv', ("symbol,date,quantity,price,order_type\n"
+                                                      + "\n".join(rows) + "\nAAPL,bad,1,1.00,buy\n").encode())
+        with CaptureQueriesContext(connection) as queries:
+            report = import_orders(self.user, read_order_records(upload), chunk_size=4)
+        self.assertEqual((report['imported'], report['failed']), (11, 1))
+        self.assertEqual(report['errors'][0]['line'], 13)
+        # Three chunks, one multi-row INSERT of orders each; each new symbol is created once.
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT INTO "api_order"')]), 3)
+        self.assertEqual(Stock.objects.filter(symbol='NVDA').count(), 1)
+        self.assertEqual(self.positions(), {'AAPL': (2 + 36, Decimal('74.00')), 'NVDA': (30, Decimal('45.00'))})
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_orders, stats.open_orders), (11, 11))
+
+
+class SimulationJobTests(TransactionTestCase):
+    """Runs Monte Carlo jobs end to end: queued on commit, run on the job pool, then polled."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', email='trader@example.com', password='secret-pass')
+        stock = Stock.objects.create(symbol='AAPL')
+        for day, net in enumerate((-40, 25, 60, -15, 30, -5, 45), start=1):
+            order = Order.objects.create(user=self.user, stock=stock, date=date(2024, 1, day), quantity=1,
+                                         price=Decimal('100.00'), order_type='buy', status='closed')
+            CompletedTrade.objects.create(initial_order=order, close_price=Decimal('100.00') + net,
+                                          close_date=date(2024, 2, day), net_amount=Decimal(net), duration=31)
+        Deposit.objects.create(user=self.user, amount=Decimal('1000.00'))
+        UserStats.rebuild(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def wait_for(self, job_id, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.client.get(f'/api/simulations/{job_id}/').data
+            if job['status'] in ("done", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail(f"Simulation job {job_id} still {job['status']} after {timeout}s")
+
+    def assertOrdered(self, percentiles):
+        values = list(percentiles.values())
+        self.assertEqual(values, sorted(values), percentiles)
+
+    def test_job_runs_in_the_background(self):
+        response = self.client.post('/api/simulations/', {'paths': 500, 'horizon': 50, 'ruin_fraction': 0.1,
+                                                           'seed': 7}, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        job = self.wait_for(response.data['id'])
+        self.assertEqual(job['status'], "done", job['error'])
+        self.assertIsNotNone(job['started_at'])
+        self.assertIsNotNone(job['finished_at'])
+
+        result = job['result']
+        self.assertEqual(set(result), {'paths', 'horizon', 'starting_balance', 'ruin_level', 'risk_of_ruin',
+                                       'probability_of_profit', 'mean_final_equity', 'final_equity', 'max_drawdown',
+                                       'max_drawdown_histogram'})
+        self.assertEqual((result['paths'], result['horizon']), (500, 50))
+        self.assertEqual((result['starting_balance'], result['ruin_level']), (1000.0, 900.0))
+        self.assertEqual(list(result['final_equity']), ['p5', 'p25', 'p50', 'p75', 'p95'])
+        self.assertEqual(list(result['max_drawdown']), ['p50', 'p75', 'p90', 'p95', 'p99'])
+        self.assertOrdered(result['final_equity'])
+        self.assertOrdered(result['max_drawdown'])
+        self.assertEqual(sum(bucket['count'] for bucket in result['max_drawdown_histogram']), 500)
+        self.assertTrue(0 <= result['risk_of_ruin'] <= 100 and 0 <= result['probability_of_profit'] <= 100)
+
+    def test_seed_makes_results_reproducible(self):
+        parameters = {'paths': 300, 'horizon': 20, 'ruin_fraction': 0.5, 'seed': 42}
+        first, second, unseeded = (SimulationJob.objects.create(user=self.user, parameters=dict(parameters))
+                                   for _ in range(3))
+        unseeded.parameters.pop('seed')
+        unseeded.save()
+        for job in (first, second, unseeded):
+            jobs.run_job(job.id)
+        first, second, unseeded = (SimulationJob.objects.get(id=job.id) for job in (first, second, unseeded))
+        self.assertEqual([first.status, second.status, unseeded.status], ["done"] * 3)
+        self.assertEqual(first.result, second.result)
+        self.assertNotEqual(first.result['final_equity'], unseeded.result['final_equity'])
+
+    def test_job_without_trades_fails(self):
+        CompletedTrade.objects.all().delete()
+        job = SimulationJob.objects.create(user=self.user, parameters={'paths': 100, 'ruin_fraction': 0.5})
+        with self.assertLogs('api.jobs', 'ERROR'):
+            jobs.run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("no completed trades", job.error)
+
+    def test_orphaned_jobs_are_failed(self):
+        pending, running, done, recent = (SimulationJob.objects.create(user=self.user, status=status)
+                                          for status in ("pending", "running", "done", "pending"))
+        SimulationJob.objects.exclude(id=recent.id).update(created_at=timezone.now() - timedelta(hours=1))
+        out = io.StringIO()
+        call_command('fail_orphaned_jobs', '--older-than', '10', stdout=out)
+        self.assertIn("Failed 2 orphaned job(s).", out.getvalue())
+
+        statuses = dict(SimulationJob.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[job.id] for job in (pending, running, done, recent)],
+                         ["failed", "failed", "done", "pending"])
+        job = self.client.get(f'/api/simulations/{pending.id}/').data
+        self.assertEqual(job['error'], jobs.ORPHANED_ERROR)
+        self.assertIsNotNone(job['finished_at'])
+
+
+class ManagementCommandTests(APITestCase):
+    """seed_journal builds consistent, reproducible journals that benchmark_api can time."""
+
+    def seed(self, prefix='seed', **options):
+        options = {'users': 2, 'orders': 40, 'deposits': 3, 'seed': 7, **options}
+        call_command('seed_journal', prefix=prefix, stdout=io.StringIO(), **options)
+        return User.objects.filter(username__startswith=prefix).order_by('id')
+
+    def test_seed_journal(self):
+        users = self.seed()
+        self.assertEqual([user.username for user in users], ['seed0', 'seed1'])
+        for user in users:
+            with self.subTest(user=user.username):
+                self.assertTrue(user.check_password('seed-password'))
+                orders = Order.objects.filter(user=user)
+                self.assertEqual(orders.count(), 40)
+                self.assertEqual(Deposit.objects.filter(user=user).count(), 3)
+                self.assertEqual(CompletedTrade.objects.filter(initial_order__user=user).count(),
+                                 orders.filter(status='closed').count())
+                self.assertFalse([order.date for order in orders if order.date.weekday() >= 5])
+                open_quantities = {}
+                for order in orders.filter(status='open'):
+                    open_quantities[order.stock_id] = open_quantities.get(order.stock_id, 0) + order.quantity
+                self.assertEqual({position.stock_id: position.quantity
+                                  for position in OpenPosition.objects.filter(user=user)}, open_quantities)
+                stored = model_to_dict(UserStats.objects.get(user=user), exclude=['id'])
+                UserStats.rebuild(user)
+                self.assertEqual(model_to_dict(UserStats.objects.get(user=user), exclude=['id']), stored)
+
+        def journal(user):
+            return list(Order.objects.filter(user=user).order_by('id').values_list(
+                'stock__symbol', 'date', 'quantity', 'price', 'order_type', 'status'))
+
+        again = self.seed(prefix='again')
+        self.assertEqual([journal(user) for user in again], [journal(user) for user in users])
+        self.assertEqual(self.seed(prefix='seed', users=1).last().username, 'seed2')
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])  # allowed by DEBUG outside the test runner
+    def test_benchmark_api(self):
+        user = self.seed(users=1).get()
+        deposits = Deposit.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            full = io.StringIO()
+            call_command('benchmark_api', iterations=1, warmup=0, output=output, stdout=full)
+            with open(output) as fh:
+                report = json.load(fh)
+            out = io.StringIO()
+            call_command('benchmark_api', iterations=2, warmup=0, only=['order-list', 'deposit-create'],
+                         compare=output, stdout=out)
+
+        self.assertEqual(report['dataset']['user'], user.username)
+        self.assertEqual(report['dataset']['orders'], 40)
+        self.assertNotIn("is not benchmarked", full.getvalue())
+        for name, result in report['routes'].items():
+            with self.subTest(route=name):
+                self.assertTrue(all(code < 500 for code in result['status']), result)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreaterEqual(result['bytes'], 0)
+        self.assertEqual(report['routes']['order-list']['status'], [200])
+        self.assertEqual(Deposit.objects.count(), deposits)  # the writes were rolled back
+        self.assertRegex(out.getvalue(), r"deposit-create .* / \+0 / ")
+
+
+class OpenPositionConcurrencyTests(TransactionTestCase):
+    """Hammers one position from many threads and checks that no update is lost."""
+    writers = 8
+    writes_per_writer = 25
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', email='trader@example.com', password='secret-pass')
+        self.stock = Stock.objects.create(symbol='AAPL')
+
+    def run_writers(self, write):
+        """Starts every writer at once; returns their errors once they have all finished."""
+        barrier = threading.Barrier(self.writers)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for iteration in range(self.writes_per_writer):
+                    write(index, iteration)
+            except Exception as exc:  # surfaced through the assertion below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_adjust_loses_no_updates(self):
+        errors = self.run_writers(
+            lambda index, iteration: OpenPosition.adjust(self.user, self.stock, 2, Decimal('10.50')))
+        self.assertEqual(errors, [])
+
+        position = OpenPosition.objects.get(user=self.user, stock=self.stock)
+        writes = self.writers * self.writes_per_writer
+        self.assertEqual(position.quantity, 2 * writes)
+        self.assertEqual(position.total_value, Decimal('10.50') * writes)
+
+    def test_concurrent_order_creates(self):
+        def create_order(index, iteration):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post('/api/orders/', {'symbol': 'aapl', 'quantity': 3, 'price': '20.00',
+                                                    'date': '2024-03-01', 'order_type': 'buy'}, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+
+        errors = self.run_writers(create_order)
+        self.assertEqual(errors, [])
+
+        writes = self.writers * self.writes_per_writer
+        position = OpenPosition.objects.get(user=self.user, stock=self.stock)
+        self.assertEqual(position.quantity, 3 * writes)
+        self.assertEqual(position.total_value, Decimal('60.00') * writes)
+        self.assertEqual(UserStats.objects.get(user=self.user).total_orders, writes)
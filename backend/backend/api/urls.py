@@ -7,7 +7,9 @@ from rest_framework_simplejwt.views import (
 )
 
 from .views import RegisterView, LoginView, LogoutView, ForgotPasswordView, VerifyOTPView, ResetPasswordView, \
-    OrderViewSet, CompletedTradeViewSet, OpenPositionViewSet, DepositViewSet, UserViewSet
+    OrderViewSet, CompletedTradeViewSet, OpenPositionViewSet, DepositViewSet, UserViewSet, MetricsView, \
+    RiskAnalyticsView, SimulationJobViewSet, BacktestView, PnLView, \
+    SymbolAnalyticsView, DashboardView, SyncView
 
 router= DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='order')
@@ -15,6 +17,7 @@ router.register(r'completed-trades', CompletedTradeViewSet, basename='completed
 router.register(r'open-positions', OpenPositionViewSet, basename="open-positions")
 router.register(r'deposits', DepositViewSet, basename='deposit')
 router.register(r'users', UserViewSet, basename='user')
+router.register(r'simulations', SimulationJobViewSet, basename='simulation')
 
 
 urlpatterns = [
@@ -27,6 +30,15 @@ urlpatterns = [
     path('auth/forgot-password/', ForgotPasswordView.as_view(), name='forgot_password'),
     path('auth/verify-otp/', VerifyOTPView.as_view(), name='verify_otp'),
     path('auth/reset-password/', ResetPasswordView.as_view(), name='reset_password'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('api/dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
+    path('api/analytics/risk/', RiskAnalyticsView.as_view(), name='analytics_risk'),
+    path('api/analytics/backtest/', BacktestView.as_view(), name='analytics_backtest'),
+    path('api/analytics/by-symbol/', SymbolAnalyticsView.as_view(), name='analytics_by_symbol'),
+    path('api/pnl/daily/', PnLView.as_view(period='daily'), name='pnl_daily'),
+    path('api/pnl/weekly/', PnLView.as_view(period='weekly'), name='pnl_weekly'),
+    path('api/pnl/monthly/', PnLView.as_view(period='monthly'), name='pnl_monthly'),
     path('api/', include(router.urls))
 
 ]
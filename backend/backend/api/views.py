@@ -1,3 +1,4 @@
+import os
 import random
 from datetime import timedelta, datetime
 from decimal import Decimal
@@ -5,37 +6,197 @@ from decimal import Decimal
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.hashers import make_password
+from django.core.exceptions import FieldDoesNotExist
 from django.core.mail import send_mail
 from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseForbidden
 from django.utils import timezone
+from django.views import View
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework import viewsets
+from rest_framework import mixins, viewsets
 
 from .serializers import OrderSerializer, CompletedTradeSerializer, OpenPositionSerializer, DepositSerializer, \
-    UserSerializer
-
-from .models import Order, Stock, OpenPosition, CompletedTrade, Deposit, PasswordResetOTP
+    UserSerializer, SimulationJobSerializer, LeaderboardSerializer
+
+from . import backtest, jobs, metrics
+from .analytics import LEADERBOARD_SORT_FIELDS, ORDER_TYPES, SYMBOL_SORT_FIELDS, filter_trades, leaderboard, \
+    parse_date, pnl_series, symbol_stats
+from .cache import CachedResponseMixin, ConditionalGetMixin, bump_version, memoize_for_user
+from .exports import ExportMixin
+from .filters import JournalFilterBackend
+from .importers import ImportFormatError, import_orders, read_order_records
+from .models import Order, Stock, OpenPosition, CompletedTrade, Deposit, PasswordResetOTP, UserStats, \
+    SimulationJob, DailyPnL
+from .pagination import KeysetPagination, RankedPagination
+from .risk import load_sizing_trades, load_trades, risk_report
+from .sync import decode_cursor, journal_changes
+from .workers import process_pool
 
 User = get_user_model()
 
-
-class UserViewSet(viewsets.ModelViewSet):
+MAX_BATCH_CLOSE = 1000
+MAX_BACKTEST_COMBINATIONS = 1000
+DASHBOARD_RECENT_ROWS = 10
+# Backtests over more combinations x trades than this are split across the process pool.
+PARALLEL_BACKTEST_CELLS = 2_000_000
+
+
+class QueryPlanMixin:
+    """Applies the viewset's declared select_related/prefetch_related plan.
+
+    Serializers only follow relations listed here, so a list costs the same
+    number of queries whatever its length. A read with ?fields= or ?expand=
+    instead loads just the columns and relations its serializer will render.
+    """
+    select_related = ()
+    prefetch_related = ()
+
+    def apply_query_plan(self, queryset):
+        columns = self.sparse_columns()
+        relations = related_paths(queryset.model, columns) if columns is not None else None
+        if relations is not None:
+            queryset = queryset.only(*columns)
+            if relations:
+                queryset = queryset.select_related(*relations)
+        elif self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def sparse_columns(self):
+        serializer = self.get_serializer()
+        if not serializer.is_sparse:
+            return None
+        columns = serializer.model_columns()
+        cursor_field = getattr(self, 'cursor_field', None)
+        if columns is not None and cursor_field:
+            columns.append(cursor_field)  # read by the paginator
+        return columns
+
+
+def related_paths(model, lookups):
+    """The select_related() paths the lookups go through, or None if one is not a model column."""
+    paths = set()
+    for lookup in lookups:
+        current = model
+        parts = lookup.split('__')
+        for index, part in enumerate(parts):
+            if current is None:
+                return None
+            try:
+                field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            if field.many_to_many or field.one_to_many:
+                return None
+            current = field.related_model
+            if field.is_relation:
+                paths.add('__'.join(parts[:index + 1]))
+    return sorted(paths)
+
+
+class ValuesListMixin:
+    """Serves list requests from values() rows rendered by the serializer's ``row_mapper``.
+
+    No model instances or per-row serializer fields are built; the response has the same
+    shape as the serializer's, narrowed by ?fields=. Retrieve, writes and ?expand= (which
+    embeds other serializers) still go through the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if serializer.expanded_fields:
+            return super().list(request, *args, **kwargs)
+        mapper, queryset = self.values_queryset(serializer)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(mapper.render(page))
+        return Response(mapper.render(queryset))
+
+    async def alist(self):
+        """The list response's data, fetched through the async ORM (see api.async_views)."""
+        mapper, queryset = self.values_queryset(self.get_serializer())
+        if self.paginator is None:
+            return mapper.render([row async for row in queryset])
+        page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return self.get_paginated_response(mapper.render(page)).data
+
+    def values_queryset(self, serializer):
+        mapper = serializer.row_mapper.subset(serializer.requested_fields)
+        columns = mapper.columns + ('id', self.cursor_field) if getattr(self, 'cursor_field', None) else mapper.columns
+        return mapper, self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(columns))
+
+
+class UserViewSet(ConditionalGetMixin, CachedResponseMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """Handles user-related operations."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    cache_resource = 'users'
+    select_related = ('stats',)
 
     def get_queryset(self):
         """Returns all users if superuser, else only the authenticated user."""
         user = self.request.user
         if user.is_superuser:
-            return User.objects.all()
-        return User.objects.filter(id=user.id)
+            return self.apply_query_plan(User.objects.all())
+        return self.apply_query_plan(User.objects.filter(id=user.id))
+
+    def list(self, request, *args, **kwargs):
+        """Superusers get every user's stats as a ranked, paginated leaderboard.
+
+        ?sort= takes one of LEADERBOARD_SORT_FIELDS, prefixed with '-' for descending (default
+        -net_profit_loss); ?min_trades=N leaves out users with fewer completed trades. Each page
+        is one query however many users there are.
+        """
+        if not request.user.is_superuser:
+            return super().list(request, *args, **kwargs)
+
+        sort = request.query_params.get('sort', '-net_profit_loss')
+        if sort.lstrip('-') not in LEADERBOARD_SORT_FIELDS:
+            return Response({"error": f"sort must be one of {', '.join(LEADERBOARD_SORT_FIELDS)}, "
+                                      f"optionally prefixed with '-'."}, status=400)
+        min_trades = request.query_params.get('min_trades', '0')
+        if not min_trades.isdigit():
+            return Response({"error": "min_trades must be a non-negative integer."}, status=400)
+
+        paginator = RankedPagination()
+        rows = paginator.paginate_queryset(leaderboard(User.objects.all(), sort, int(min_trades)), request, self)
+        return paginator.get_paginated_response(
+            LeaderboardSerializer(rows, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Trade statistics for the user, optionally narrowed by ?from=&to=&symbol=&order_type=."""
+        return self.conditional_response(request, lambda: self.build_stats(request))
+
+    def build_stats(self, request):
+        user = self.get_object()
+        filters, error = trade_filters(request.query_params)
+        if error:
+            return Response({"error": error}, status=400)
+        return Response(user.trade_stats(**filters))
+
+
+def trade_filters(params):
+    """Reads ?from=&to=&symbol=&order_type= into trade_stats() filters; returns (filters, error)."""
+    try:
+        filters = {'date_from': parse_date(params.get('from')), 'date_to': parse_date(params.get('to'))}
+    except ValueError:
+        return None, "from and to must be dates in YYYY-MM-DD format."
+    filters['symbol'] = params.get('symbol')
+    filters['order_type'] = params.get('order_type')
+    if filters['order_type'] and filters['order_type'] not in ORDER_TYPES:
+        return None, "order_type must be 'buy' or 'sell'."
+    return filters, None
 
 
 class RegisterView(APIView):
@@ -183,39 +344,74 @@ class ResetPasswordView(APIView):
             return Response({"error": "Invalid OTP or OTP already used."}, status=400)
 
 
-class DepositViewSet(viewsets.ModelViewSet):
+class DepositViewSet(ConditionalGetMixin, CachedResponseMixin, ExportMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """Handles user deposits."""
     queryset = Deposit.objects.all()
     serializer_class = DepositSerializer
     permission_classes = [IsAuthenticated]
+    cache_resource = 'deposits'
+    select_related = ('user',)
+    pagination_class = KeysetPagination
+    filter_backends = [JournalFilterBackend]
+    cursor_field = 'deposited_at'
+    export_name = 'deposits'
+    export_fields = {'id': 'id', 'amount': 'amount', 'deposited_at': 'deposited_at'}
+    date_filter_field = 'deposited_at__date'
 
     def get_queryset(self):
         """Returns deposits for the authenticated user (or all if superuser)."""
         user = self.request.user
         if user.is_superuser:
-            return Deposit.objects.all()
-        return Deposit.objects.filter(user=user)
+            return self.apply_query_plan(Deposit.objects.all())
+        return self.apply_query_plan(Deposit.objects.filter(user=user))
 
     @transaction.atomic
     def perform_create(self, serializer):
         """Creates a deposit and updates the user's balance."""
         data = self.request.data
         data['user'] = self.request.user.id
-        serializer.save(user=self.request.user)
+        deposit = serializer.save(user=self.request.user)
+        UserStats.record_deposit(self.request.user, deposit.amount)
+        DailyPnL.record_deposit(self.request.user, deposit)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Updates a deposit and recomputes the owner's stats."""
+        deposit = serializer.save()
+        UserStats.rebuild(deposit.user)
+        DailyPnL.rebuild(deposit.user)
 
-class OrderViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Deletes a deposit and recomputes the owner's stats."""
+        user = instance.user
+        instance.delete()
+        UserStats.rebuild(user)
+        DailyPnL.record_deposit(user, instance, sign=-1)
+
+
+class OrderViewSet(ConditionalGetMixin, ExportMixin, QueryPlanMixin, ValuesListMixin, viewsets.ModelViewSet):
     """Handles creation and management of stock orders."""
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    cache_resource = 'orders'
+    select_related = ('user', 'stock')
+    pagination_class = KeysetPagination
+    filter_backends = [JournalFilterBackend]
+    cursor_field = 'date'
+    export_name = 'orders'
+    export_fields = {'id': 'id', 'symbol': 'stock__symbol', 'date': 'date', 'order_type': 'order_type',
+                     'quantity': 'quantity', 'price': 'price', 'status': 'status', 'comment': 'comment'}
+    filter_fields = {'symbol': 'stock__symbol', 'status': 'status', 'order_type': 'order_type'}
+    date_filter_field = 'date'
 
     def get_queryset(self):
         """Returns orders for the authenticated user (or all if superuser)."""
         user = self.request.user
         if user.is_superuser:
-            return Order.objects.all()
-        return Order.objects.filter(user=user)
+            return self.apply_query_plan(Order.objects.all())
+        return self.apply_query_plan(Order.objects.filter(user=user))
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -224,15 +420,53 @@ class OrderViewSet(viewsets.ModelViewSet):
         data['symbol'] = data['symbol'].upper()
         stock, created = Stock.objects.get_or_create(symbol=data['symbol'])
 
-        serializer.save(user=self.request.user, stock=stock)
+        order = serializer.save(user=self.request.user, stock=stock)
+        UserStats.record_orders_created(self.request.user)
+        OpenPosition.adjust(self.request.user, stock, order.quantity, Decimal(str(order.price)) * order.quantity)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Updates an order, moves the change into its open position and recomputes the owner's stats."""
+        before = self.open_holding(serializer.instance)
+        order = serializer.save()
+        after = self.open_holding(order)
+        if after != before:
+            OpenPosition.adjust(order.user, order.stock, after[0] - before[0], after[1] - before[1])
+        UserStats.rebuild(order.user)
+
+    @staticmethod
+    def open_holding(order):
+        """The (quantity, value) the order adds to its position while it is open."""
+        if order.status != 'open':
+            return 0, Decimal("0.00")
+        return order.quantity, Decimal(str(order.price)) * order.quantity
 
-        open_position, created = OpenPosition.objects.get_or_create(stock=stock, user=self.request.user)
-        if created:
-            open_position.quantity = 0
-            open_position.total_value = Decimal("0.00")
-        open_position.quantity += int(data['quantity'])
-        open_position.total_value += Decimal(data['price']) * int(data['quantity'])
-        open_position.save()
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Deletes an order (and its completed trades) and recomputes the owner's stats."""
+        user, stock = instance.user, instance.stock
+        quantity, value = self.open_holding(instance)
+        trades = list(instance.initial_order.all())
+        instance.delete()
+        if quantity:
+            OpenPosition.adjust(user, stock, -quantity, -value)
+        UserStats.rebuild(user)
+        DailyPnL.record_trades(user, trades, sign=-1)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_orders(self, request):
+        """Imports orders from a CSV or JSON Lines broker statement uploaded as ``file``.
+
+        Valid rows are stored even if others fail; the response lists the failures by line.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload the statement as a 'file' field."}, status=400)
+        try:
+            report = import_orders(request.user, read_order_records(upload))
+        except ImportFormatError as exc:
+            return Response({"error": str(exc)}, status=400)
+        return Response(report, status=status.HTTP_201_CREATED if report['imported'] else status.HTTP_400_BAD_REQUEST)
 
     def calculate_net_result(self, order, close_price):
         """Calculates profit or loss for the trade based on order type."""
@@ -253,6 +487,8 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         if not close_price or not close_date:
             return Response({"error": "close_price and close_date are required."}, status=400)
+        if order.status != 'open':
+            return Response({"error": "Order is already closed."}, status=400)
 
         net_amount = self.calculate_net_result(order, close_price)
         close_date = datetime.strptime(data.get('close_date'), '%Y-%m-%d')
@@ -261,57 +497,438 @@ class OrderViewSet(viewsets.ModelViewSet):
         if duration < 0:
             return Response({"error": "Close date cannot be before order date."}, status=400)
 
-        CompletedTrade.objects.create(
+        # Flipping the status only where it is still open guards against a concurrent close.
+        if not Order.objects.filter(id=order.id, status='open').update(status='closed', updated_at=timezone.now()):
+            return Response({"error": "This order was closed by another request."}, status=409)
+        order.status = 'closed'
+        completed_trade = CompletedTrade.objects.create(
             initial_order=order,
             close_price=close_price,
-            close_date=close_date,
+            close_date=close_date.date(),
             net_amount=net_amount,
             duration=duration,
             note=note
         )
-        order.status = 'closed'
-        order.save()
+        UserStats.record_trades_closed(order.user, [completed_trade])
+        DailyPnL.record_trades(order.user, [completed_trade])
 
-        open_position = OpenPosition.objects.get(stock=order.stock, user=order.user)
-        open_position.quantity -= int(order.quantity)
-        open_position.total_value -= Decimal(str(order.price)) * int(order.quantity)
-        open_position.save()
+        OpenPosition.adjust(order.user, order.stock, -order.quantity, -Decimal(str(order.price)) * order.quantity)
 
         return Response({
             "message": "Trade closed successfully."
         })
 
+    @action(detail=False, methods=['post'], url_path='close-batch')
+    def close_batch(self, request):
+        """Closes many orders in one transaction.
+
+        Takes a list of ``{order_id, close_price, close_date, note}``. Every entry is validated
+        first; if any fails nothing is written and the errors are returned by index. The query
+        count does not depend on the number of orders.
+        """
+        entries = request.data
+        if not isinstance(entries, list) or not entries:
+            return Response({"error": "Send a non-empty list of orders to close."}, status=400)
+        if len(entries) > MAX_BATCH_CLOSE:
+            return Response({"error": f"At most {MAX_BATCH_CLOSE} orders can be closed at once."}, status=400)
+
+        order_ids = [entry.get('order_id') if isinstance(entry, dict) else None for entry in entries]
+        orders = self.get_queryset().in_bulk([order_id for order_id in order_ids if isinstance(order_id, int)])
+        trades, errors, seen = [], [], set()
+        for index, (entry, order_id) in enumerate(zip(entries, order_ids)):
+            trade, entry_errors = self.build_completed_trade(entry, orders.get(order_id), order_id in seen)
+            seen.add(order_id)
+            if entry_errors:
+                errors.append({'index': index, 'order_id': order_id, 'errors': entry_errors})
+            else:
+                trades.append(trade)
+        if errors:
+            return Response({"errors": errors}, status=400)
+
+        with transaction.atomic():
+            # Flipping the status only where it is still open guards against a concurrent close.
+            closed = Order.objects.filter(id__in=orders.keys(), status='open') \
+                .update(status='closed', updated_at=timezone.now())
+            if closed != len(trades):
+                transaction.set_rollback(True)
+                return Response({"error": "Some of these orders were closed by another request."}, status=409)
+            CompletedTrade.objects.bulk_create(trades)
+
+            by_user = {}
+            for trade in trades:
+                by_user.setdefault(trade.initial_order.user, []).append(trade)
+            for user, user_trades in by_user.items():
+                deltas = {}
+                for trade in user_trades:
+                    order = trade.initial_order
+                    quantity, value = deltas.get(order.stock_id, (0, Decimal("0.00")))
+                    deltas[order.stock_id] = (quantity - order.quantity,
+                                              value - Decimal(str(order.price)) * order.quantity)
+                OpenPosition.adjust_many(user, deltas)
+                UserStats.record_trades_closed(user, user_trades)
+                DailyPnL.record_trades(user, user_trades)
+                # The bulk writes above send no post_save signals.
+                transaction.on_commit(lambda user_id=user.id: bump_version(user_id))
 
-class CompletedTradeViewSet(viewsets.ModelViewSet):
+        return Response({
+            "message": f"{len(trades)} trades closed successfully.",
+            "closed": len(trades),
+        })
+
+    def build_completed_trade(self, entry, order, duplicate):
+        """Returns (unsaved CompletedTrade, None) for a valid batch entry, else (None, errors)."""
+        if not isinstance(entry, dict):
+            return None, {'entry': "Each entry must be an object."}
+        if order is None:
+            return None, {'order_id': "Order not found."}
+        if duplicate:
+            return None, {'order_id': "Order is listed more than once."}
+        if order.status != 'open':
+            return None, {'order_id': "Order is already closed."}
+
+        errors = {}
+        try:
+            close_price = Decimal(str(entry.get('close_price') or "").strip())
+            if not close_price.is_finite() or close_price <= 0:
+                raise ArithmeticError
+        except ArithmeticError:
+            errors['close_price'] = "close_price must be a positive amount."
+        try:
+            close_date = parse_date(entry.get('close_date'))
+            if close_date is None:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors['close_date'] = "close_date must be a date in YYYY-MM-DD format."
+        else:
+            if close_date < order.date:
+                errors['close_date'] = "Close date cannot be before order date."
+        if errors:
+            return None, errors
+
+        return CompletedTrade(
+            initial_order=order,
+            close_price=close_price,
+            close_date=close_date,
+            net_amount=self.calculate_net_result(order, close_price),
+            duration=(close_date - order.date).days,
+            note=entry.get('note'),
+        ), None
+
+
+class CompletedTradeViewSet(ConditionalGetMixin, CachedResponseMixin, ExportMixin, QueryPlanMixin, ValuesListMixin,
+                            viewsets.ModelViewSet):
     """Handles completed trades (closed trades with P/L and duration)."""
     queryset = CompletedTrade.objects.all()
     serializer_class = CompletedTradeSerializer
     permission_classes = [IsAuthenticated]
+    cache_resource = 'completed-trades'
+    select_related = ('initial_order__stock',)
+    pagination_class = KeysetPagination
+    filter_backends = [JournalFilterBackend]
+    cursor_field = 'close_date'
+    export_name = 'completed-trades'
+    export_fields = {'id': 'id', 'order_id': 'initial_order_id', 'symbol': 'initial_order__stock__symbol',
+                     'order_type': 'initial_order__order_type', 'quantity': 'initial_order__quantity',
+                     'open_date': 'initial_order__date', 'open_price': 'initial_order__price',
+                     'close_date': 'close_date', 'close_price': 'close_price', 'net_amount': 'net_amount',
+                     'duration': 'duration', 'note': 'note'}
+    filter_fields = {'symbol': 'initial_order__stock__symbol', 'order_type': 'initial_order__order_type'}
+    date_filter_field = 'close_date'
+    outcome_filter_field = 'net_amount'
 
     def get_queryset(self):
         """Returns completed trades for the authenticated user (or all if superuser)."""
         user = self.request.user
         if user.is_superuser:
-            return CompletedTrade.objects.all()
-        return CompletedTrade.objects.filter(initial_order__user=user)
+            return self.apply_query_plan(CompletedTrade.objects.all())
+        return self.apply_query_plan(CompletedTrade.objects.filter(initial_order__user=user))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Updates a completed trade and recomputes the owner's stats and daily P/L."""
+        trade = serializer.save()
+        UserStats.rebuild(trade.initial_order.user)
+        DailyPnL.rebuild(trade.initial_order.user)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         """Deletes a completed trade and reopens the initial order."""
         order = instance.initial_order
         instance.delete()
         order.status = 'open'
         order.save()
+        OpenPosition.adjust(order.user, order.stock, *OrderViewSet.open_holding(order))
+        UserStats.record_trades_removed(order.user, [instance])
+        DailyPnL.record_trades(order.user, [instance], sign=-1)
 
 
-class OpenPositionViewSet(viewsets.ModelViewSet):
+class OpenPositionViewSet(ConditionalGetMixin, CachedResponseMixin, QueryPlanMixin, ValuesListMixin,
+                          viewsets.ModelViewSet):
     """Handles open stock positions for users."""
     queryset = OpenPosition.objects.all()
     serializer_class = OpenPositionSerializer
     permission_classes = [IsAuthenticated]
+    cache_resource = 'open-positions'
+    select_related = ('stock',)
 
     def get_queryset(self):
         """Returns open positions for the authenticated user (or all if superuser)."""
         user = self.request.user
         if user.is_superuser:
-            return OpenPosition.objects.all()
-        return OpenPosition.objects.filter(user=user, quantity__gt=0)
+            return self.apply_query_plan(OpenPosition.objects.all())
+        return self.apply_query_plan(OpenPosition.objects.filter(user=user, quantity__gt=0))
+
+
+class MetricsView(View):
+    """Serves the in-process request metrics in Prometheus text format to local scrapers."""
+
+    def get(self, request):
+        if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+            return HttpResponseForbidden()
+        return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RiskAnalyticsView(ConditionalGetMixin, APIView):
+    """Drawdown, Sharpe/Sortino, streaks, expectancy and R-multiples for the user's closed trades.
+
+    Takes the same ?from=&to=&symbol=&order_type= filters as the stats endpoint. Results are
+    memoized until the user's journal changes.
+    """
+    permission_classes = [IsAuthenticated]
+    cache_resource = 'risk'
+
+    def get(self, request):
+        filters, error = trade_filters(request.query_params)
+        if error:
+            return Response({"error": error}, status=400)
+
+        user = request.user
+        return self.conditional_response(request, lambda: Response(
+            memoize_for_user(user.id, 'risk', filters, lambda: self.build_report(user, filters))))
+
+    @staticmethod
+    def build_report(user, filters):
+        trades = filter_trades(CompletedTrade.objects.filter(initial_order__user=user), **filters)
+        net, days, durations = load_trades(trades)
+        return risk_report(net, days, durations, starting_balance=float(UserStats.for_user(user).total_deposits))
+
+
+class DashboardView(ConditionalGetMixin, APIView):
+    """Everything the dashboard's first paint needs in one response.
+
+    Returns the user with their stats, the most recent deposits and completed trades, and a
+    summary of the open positions: four indexed queries, memoized until the journal changes.
+    api.async_views awaits the same queries one after another without blocking the event loop.
+    """
+    permission_classes = [IsAuthenticated]
+    cache_resource = 'dashboard'
+
+    def get(self, request):
+        user = request.user
+        return self.conditional_response(request, lambda: Response(
+            memoize_for_user(user.id, 'dashboard', {}, lambda: self.build(user))))
+
+    @classmethod
+    def build(cls, user):
+        user, deposits, trades, positions = cls.querysets(user)
+        return cls.render(user.get(), deposits, trades, list(positions))
+
+    @staticmethod
+    def querysets(user):
+        """The user (with stats), recent deposits, recent completed trades and open positions."""
+        return (
+            User.objects.select_related('stats').filter(pk=user.pk),
+            Deposit.objects.filter(user=user).select_related('user')
+            .order_by('-deposited_at', '-id')[:DASHBOARD_RECENT_ROWS],
+            CompletedTrade.objects.filter(initial_order__user=user).select_related('initial_order__stock')
+            .order_by(F('close_date').desc(nulls_last=True), '-id')[:DASHBOARD_RECENT_ROWS],
+            OpenPosition.objects.filter(user=user, quantity__gt=0).select_related('stock')
+            .order_by('-total_value', 'id'),
+        )
+
+    @staticmethod
+    def render(user, deposits, trades, positions):
+        return {
+            'user': UserSerializer(user).data,
+            'recent_deposits': DepositSerializer(deposits, many=True).data,
+            'open_positions': {
+                'count': len(positions),
+                'total_quantity': sum(position.quantity for position in positions),
+                'total_value': sum((position.total_value or 0 for position in positions), Decimal("0.00")),
+                'positions': OpenPositionSerializer(positions, many=True).data,
+            },
+            'recent_completed_trades': CompletedTradeSerializer(trades, many=True).data,
+        }
+
+
+class SyncView(ConditionalGetMixin, APIView):
+    """Delta sync of the user's journal.
+
+    GET /api/sync/ returns every order, completed trade, deposit and open position plus a
+    cursor; GET /api/sync/?since=<cursor> returns only the rows changed since then and, under
+    "deleted", the ids of rows that went away. When "full" is true the client should replace
+    its copy instead of merging. With ?snapshot=false a full response carries only the cursor,
+    for clients that load their first pages from the paginated list endpoints and sync the
+    changes after that.
+    """
+    permission_classes = [IsAuthenticated]
+    cache_resource = 'sync'
+    sync_serializers = {'orders': OrderSerializer, 'completed_trades': CompletedTradeSerializer,
+                   'deposits': DepositSerializer, 'open_positions': OpenPositionSerializer}
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = decode_cursor(since)
+            except ValueError:
+                return Response({"error": "Invalid since cursor; sync again without one."}, status=400)
+        snapshot = request.query_params.get('snapshot', 'true') != 'false'
+        return self.conditional_response(request, lambda: self.build(request.user, since or None, snapshot))
+
+    def build(self, user, since, snapshot=True):
+        querysets, deleted, full, cursor = journal_changes(user, since)
+        data = {'cursor': cursor, 'full': full}
+        for key, serializer in self.sync_serializers.items():
+            data[key] = serializer(querysets[key], many=True).data if snapshot or not full else []
+        data['deleted'] = deleted
+        return Response(data)
+
+
+class SymbolAnalyticsView(ConditionalGetMixin, APIView):
+    """Trade count, win rate, net P/L, profit factor, average duration and open quantity per symbol.
+
+    ?sort= takes one of SYMBOL_SORT_FIELDS, prefixed with '-' for descending (default
+    -net_profit_loss); ?limit=N returns only the top N. Computed by one GROUP BY query and
+    memoized until the user's journal changes.
+    """
+    permission_classes = [IsAuthenticated]
+    cache_resource = 'by-symbol'
+
+    def get(self, request):
+        sort = request.query_params.get('sort', '-net_profit_loss')
+        if sort.lstrip('-') not in SYMBOL_SORT_FIELDS:
+            return Response({"error": f"sort must be one of {', '.join(SYMBOL_SORT_FIELDS)}, "
+                                      f"optionally prefixed with '-'."}, status=400)
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return Response({"error": "limit must be a positive integer."}, status=400)
+            limit = int(limit)
+
+        user = request.user
+        params = {'sort': sort, 'limit': limit}
+        return self.conditional_response(request, lambda: Response(
+            memoize_for_user(user.id, 'by-symbol', params, lambda: symbol_stats(user, sort, limit))))
+
+
+class PnLView(ConditionalGetMixin, APIView):
+    """Realized P/L, trade counts and deposits per day, week or month, with the running balance.
+
+    Reads only the DailyPnL rollup, so years of history cost one row per active day rather
+    than one per trade. Takes optional ?from=&to= dates.
+    """
+    permission_classes = [IsAuthenticated]
+    cache_resource = 'pnl'
+    period = 'daily'
+
+    def get(self, request):
+        try:
+            date_from = parse_date(request.query_params.get('from'))
+            date_to = parse_date(request.query_params.get('to'))
+        except ValueError:
+            return Response({"error": "from and to must be dates in YYYY-MM-DD format."}, status=400)
+        return self.conditional_response(request, lambda: Response(
+            pnl_series(request.user, self.period, date_from=date_from, date_to=date_to)))
+
+
+class BacktestView(APIView):
+    """Replays the user's closed trades under alternative position-sizing rules.
+
+    POST {"grid": {"fixed_fractional": {"fraction": [0.05, 0.1]}, "kelly": {"multiplier": 0.5}, ...},
+    "starting_balance": 10000} returns one result per combination: an equity curve and the same
+    statistics the user profile reports. Large grids are split over the process pool.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        grid = request.data.get('grid')
+        if not isinstance(grid, dict) or not grid:
+            return Response({"error": "grid must map sizing rules to their parameter values."}, status=400)
+        for rule, params in grid.items():
+            if rule not in backtest.RULES:
+                return Response({"error": f"Unknown sizing rule '{rule}'. Choose from: "
+                                          f"{', '.join(backtest.RULES)}."}, status=400)
+            name, low, high, types = backtest.RULES[rule]
+            values = params.get(name) if isinstance(params, dict) else None
+            values = values if isinstance(values, list) else [values]
+            if not values or not all(isinstance(value, types) and not isinstance(value, bool)
+                                     and low <= value <= high for value in values):
+                kind = "whole-number " if float not in types else ""
+                return Response({"error": f"{rule} takes {kind}'{name}' values between {low} and {high}."},
+                                status=400)
+            grid[rule] = {name: values}
+        combinations = backtest.expand_grid(grid)
+        if len(combinations) > MAX_BACKTEST_COMBINATIONS:
+            return Response({"error": f"At most {MAX_BACKTEST_COMBINATIONS} combinations per request."},
+                            status=400)
+
+        user = request.user
+        starting_balance = request.data.get('starting_balance', float(UserStats.for_user(user).total_deposits))
+        if not isinstance(starting_balance, (int, float)) or starting_balance <= 0:
+            return Response({"error": "starting_balance must be positive; deposit funds or pass one."}, status=400)
+
+        params = {'grid': grid, 'starting_balance': starting_balance}
+        return Response(memoize_for_user(user.id, 'backtest', params,
+                                         lambda: self.run(user, combinations, float(starting_balance))))
+
+    @staticmethod
+    def run(user, combinations, starting_balance):
+        returns, durations, open_days, close_days = load_sizing_trades(
+            CompletedTrade.objects.filter(initial_order__user=user))
+        if returns.size == 0:
+            return {'starting_balance': starting_balance, 'curve_dates': [], 'results': []}
+        trades = backtest.trade_matrix(returns, durations, open_days, close_days)
+        if len(combinations) * returns.size >= PARALLEL_BACKTEST_CELLS:
+            results = backtest.evaluate(trades, starting_balance, combinations, executor=process_pool(),
+                                        workers=settings.ANALYSIS_PROCESSES or os.cpu_count())
+        else:
+            results = backtest.evaluate(trades, starting_balance, combinations)
+        curve_days = close_days[backtest.curve_points(returns.size)].astype('datetime64[D]')
+        return {
+            'starting_balance': starting_balance,
+            'curve_dates': [str(day) for day in curve_days],
+            'results': results,
+        }
+
+
+class SimulationJobViewSet(QueryPlanMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Submits Monte Carlo simulations of the user's equity and serves their results.
+
+    POST queues the job and answers 202 straight away; poll the job until its status is
+    "done" (or "failed"). The resampling runs in a background thread and, for large jobs,
+    across a process pool, never in the request worker.
+    """
+    serializer_class = SimulationJobSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_field = 'created_at'
+
+    def get_queryset(self):
+        return self.apply_query_plan(SimulationJob.objects.filter(user=self.request.user))
+
+    def create(self, request, *args, **kwargs):
+        stats = UserStats.for_user(request.user)
+        if not stats.completed_trades:
+            return Response({"error": "Close some trades before running a simulation."}, status=400)
+        if stats.total_deposits <= 0:
+            return Response({"error": "The simulation starts from your total deposits, which is zero."},
+                            status=400)
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def perform_create(self, serializer):
+        jobs.submit(serializer.save(user=self.request.user, kind="monte_carlo"))
+
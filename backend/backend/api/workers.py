@@ -0,0 +1,36 @@
+"""Shared executors for CPU-heavy analysis.
+
+``job_pool()`` runs submitted jobs in background threads so request workers return at once;
+``process_pool()`` spreads the NumPy work of large jobs over CPU cores. Worker processes are
+spawned, not forked, and only import pure NumPy modules, so they never touch Django.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_job_pool = None
+_process_pool = None
+
+
+def job_pool():
+    global _job_pool
+    with _lock:
+        if _job_pool is None:
+            _job_pool = ThreadPoolExecutor(max_workers=settings.ANALYSIS_JOB_THREADS,
+                                           thread_name_prefix='analysis-job')
+        return _job_pool
+
+
+def process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.ANALYSIS_PROCESSES or os.cpu_count(),
+                                                mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_process_pool.shutdown, cancel_futures=True)
+        return _process_pool
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
 from pathlib import Path
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +54,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'api.CustomUser'
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.AsyncRoutesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -63,6 +68,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'backend.urls'
+# Served instead under ASGI; adds the async read views (see api.middleware.AsyncRoutesMiddleware).
+ASYNC_URLCONF = 'api.async_urls'
 
 TEMPLATES = [
     {
@@ -86,14 +93,54 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# backend.sqlite is Django's SQLite backend with BEGIN IMMEDIATE transactions, so concurrent
+# writers wait for each other instead of failing. Tests use a file database: the in-memory one
+# is shared between threads in a way that rejects concurrent transactions outright.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'backend.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
 
+# Caches
+# The journal cache holds per-user API responses (see api/cache.py). JOURNAL_CACHE picks the
+# backend: locmem, file, redis, or auto (redis when REDIS_URL is set and redis-py is installed).
+
+REDIS_URL = config("REDIS_URL", default="")
+JOURNAL_CACHE = config("JOURNAL_CACHE", default="auto")
+if JOURNAL_CACHE == "auto":
+    JOURNAL_CACHE = "redis" if REDIS_URL and importlib.util.find_spec("redis") else "locmem"
+
+JOURNAL_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'journal',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config("JOURNAL_CACHE_DIR", default=str(BASE_DIR / '.journal_cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL or 'redis://127.0.0.1:6379/1',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'journal': JOURNAL_CACHE_BACKENDS[JOURNAL_CACHE],
+}
+JOURNAL_CACHE_ALIAS = 'journal'
+JOURNAL_CACHE_TIMEOUT = config("JOURNAL_CACHE_TIMEOUT", default=300, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -139,14 +186,51 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match", "if-modified-since")
+CORS_EXPOSE_HEADERS = ["ETag", "Last-Modified"]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# Responses smaller than this are never compressed (see api.middleware.CompressionMiddleware);
+# brotli is used when the brotli package is installed and the client accepts it, gzip otherwise.
+RESPONSE_COMPRESSION_MIN_BYTES = config("RESPONSE_COMPRESSION_MIN_BYTES", default=1024, cast=int)
+
+
+
+# Performance metrics
+# Served at /metrics in Prometheus format, only to these client addresses.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Log requests slower than this (with their SQL) to the api.performance logger; 0 disables.
+SLOW_REQUEST_THRESHOLD_MS = config("SLOW_REQUEST_THRESHOLD_MS", default=0, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.performance': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
 
+# Background analysis (Monte Carlo simulations)
+# Threads that run submitted jobs, and worker processes for their NumPy work (0 = one per CPU).
+ANALYSIS_JOB_THREADS = config("ANALYSIS_JOB_THREADS", default=2, cast=int)
+ANALYSIS_PROCESSES = config("ANALYSIS_PROCESSES", default=0, cast=int)
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -0,0 +1,13 @@
+"""SQLite backend whose transactions take the write lock when they begin.
+
+Django 4.2 opens transactions with a deferred BEGIN. When two of them read and then write,
+neither can upgrade its lock, and SQLite fails one at once with "database is locked" instead
+of waiting out the busy timeout. BEGIN IMMEDIATE makes concurrent writers queue for the lock
+(up to OPTIONS['timeout'] seconds) instead.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
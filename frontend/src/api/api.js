@@ -7,9 +7,16 @@ const API_URL = import.meta.env.VITE_API_URL;
 
 const api = axios.create({
     baseURL: API_URL,
-    headers: { "Content-Type": "application/json" }
+    headers: { "Content-Type": "application/json" },
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 });
 
+// Conditional GET: remember the ETag and body of every GET, send If-None-Match on the next
+// request for the same URL and reuse the stored body when the server answers 304.
+const etagCache = new Map();
+
+const isGet = (config) => (config.method || "get").toLowerCase() === "get";
+
 // Request Interceptor to add Access Token
 api.interceptors.request.use(
     (config) => {
@@ -18,14 +25,32 @@ api.interceptors.request.use(
         if (token) {
             config.headers.Authorization = `Bearer ${token}`;
         }
+        if (isGet(config)) {
+            const cached = etagCache.get(api.getUri(config));
+            if (cached) {
+                config.headers["If-None-Match"] = cached.etag;
+            }
+        }
         return config;
     },
     (error) => Promise.reject(error)
 );
 
-// Response Interceptor to Handle Token Expiry
+// Response Interceptor to serve 304s from the ETag cache and handle token expiry
 api.interceptors.response.use(
-    (response) => response,
+    (response) => {
+        if (isGet(response.config)) {
+            const key = api.getUri(response.config);
+            const cached = etagCache.get(key);
+            if (response.status === 304 && cached) {
+                response.data = cached.data;
+                response.status = 200;
+            } else if (response.headers.etag) {
+                etagCache.set(key, { etag: response.headers.etag, data: response.data });
+            }
+        }
+        return response;
+    },
     async (error) => {
         const originalRequest = error.config;
         if (error.response && error.response.status === 401 && !originalRequest._retry) {
@@ -79,6 +104,7 @@ export const resetPassword = async (email, otp, newPassword) => {
 
 export const logoutUser = async (refreshToken) => {
     await api.post("/auth/logout/", refreshToken);
+    etagCache.clear();
 };
 
 export const createOrder = async (orderData) => {
@@ -86,8 +112,15 @@ export const createOrder = async (orderData) => {
     return response.data;
 };
 
-export const fetchOrders = async () => {
-    const response = await api.get("/api/orders/");
+// List endpoints are cursor-paginated: they resolve to { next, results }.
+// Pass `next` to fetchNextPage to load the following page.
+export const fetchOrders = async (filters = {}) => {
+    const response = await api.get("/api/orders/", { params: filters });
+    return response.data;
+};
+
+export const fetchNextPage = async (nextUrl) => {
+    const response = await api.get(nextUrl);
     return response.data;
 };
 
@@ -96,8 +129,8 @@ export const closeTrade = async (orderId, data) => {
     return response.data;
 };
 
-export const fetchCompletedTrades = async () => {
-    const response = await api.get("/api/completed-trades/");
+export const fetchCompletedTrades = async (filters = {}) => {
+    const response = await api.get("/api/completed-trades/", { params: filters });
     return response.data;
 };
 
@@ -111,13 +144,18 @@ export const addDeposit = async (amount) => {
     return response.data;
 };
 
-export const fetchDepositHistory = async () => {
-    const response = await api.get("/api/deposits/");
+// Everything the dashboard shows in one request: { user, recent_deposits, open_positions,
+// recent_completed_trades }.
+export const fetchDashboard = async () => {
+    const response = await api.get("/api/dashboard/");
     return response.data;
 };
 
-export const fetchUserData = async (userId) => {
-    const response = await api.get(`/api/users/${userId}/`);
+// Journal rows changed since `since`, with the ids of deleted rows under `deleted` and the
+// cursor for the next call. Without a (recent enough) cursor the response is `full` and only
+// carries a fresh cursor: first pages come from the paginated lists. See store/journalSlice.js.
+export const fetchJournalChanges = async (since) => {
+    const response = await api.get("/api/sync/", { params: since ? { since, snapshot: false } : { snapshot: false } });
     return response.data;
 };
 
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
-import { useSelector } from "react-redux";
-import { fetchCompletedTrades, updateCompletedTradeNote } from "../api/api.js";
+import { useDispatch, useSelector } from "react-redux";
+import { updateCompletedTradeNote } from "../api/api.js";
+import { loadMore, openList, selectCompletedTrades } from "../store/journalSlice.js";
 import {
     Table, TableBody, TableCell, TableContainer,
     TableHead, TableRow, Paper, Typography,
@@ -10,11 +11,12 @@ import NoteDialog from "../components/dialogs/NoteDialog.jsx";
 import {toast} from "../utils/toastService.js";
 
 function CompletedTrades() {
+    const dispatch = useDispatch();
     const { isAuthenticated } = useSelector((state) => state.auth);
-    const [completedTrades, setCompletedTrades] = useState([]);
-    const [filteredHistory, setFilteredHistory] = useState([]);
+    const { rows: filteredHistory, next: nextPage } = useSelector(selectCompletedTrades);
     const [symbolFilter, setSymbolFilter] = useState("");
     const [typeFilter, setTypeFilter] = useState("");
+    const [outcomeFilter, setOutcomeFilter] = useState("");
 
     const [noteDialogOpen, setNoteDialogOpen] = useState(false);
     const [noteMode, setNoteMode] = useState("view");
@@ -26,27 +28,34 @@ function CompletedTrades() {
         } else {
             loadCompletedTrades();
         }
-    }, [isAuthenticated]);
+    }, [isAuthenticated, symbolFilter, typeFilter, outcomeFilter]);
 
+    // Filtering happens on the server; the page only holds what has been loaded so far, and
+    // reloading it with the same filters only syncs the trades changed since.
     const loadCompletedTrades = async () => {
         try {
-            const response = await fetchCompletedTrades();
-            toast("Loaded CompletedTrades successfully.", "success");
-            setCompletedTrades(response);
-            setFilteredHistory(response);
+            await dispatch(openList({
+                kind: "completed_trades",
+                filters: {
+                    symbol: symbolFilter || undefined,
+                    order_type: typeFilter || undefined,
+                    outcome: outcomeFilter || undefined,
+                },
+            })).unwrap();
         } catch (error) {
             console.error("Error fetching completed trades:", error);
             toast("Failed to load completed trades.Look console for more Information", "error");
         }
     };
 
-    useEffect(() => {
-        const filtered = completedTrades.filter(entry =>
-          entry.symbol.toLowerCase().includes(symbolFilter.toLowerCase()) &&
-          (typeFilter === "" || entry.order_type === typeFilter)
-        );
-        setFilteredHistory(filtered);
-    }, [symbolFilter, typeFilter, completedTrades]);
+    const loadMoreTrades = async () => {
+        try {
+            await dispatch(loadMore("completed_trades")).unwrap();
+        } catch (error) {
+            console.error("Error fetching completed trades:", error);
+            toast("Failed to load more completed trades. Look console for more Information", "error");
+        }
+    };
 
     const handleAddNote = (trade) => {
         setSelectedTrade(trade);
@@ -98,6 +107,20 @@ function CompletedTrades() {
                       <MenuItem value="sell">Sell</MenuItem>
                   </Select>
               </FormControl>
+              <FormControl size="small">
+                  <InputLabel>Outcome</InputLabel>
+                  <Select
+                    label="Outcome"
+                    value={outcomeFilter}
+                    onChange={(e) => setOutcomeFilter(e.target.value)}
+                    sx={{ minWidth: 150 }}
+                    variant="outlined"
+                  >
+                      <MenuItem value="">All</MenuItem>
+                      <MenuItem value="profitable">Profitable</MenuItem>
+                      <MenuItem value="losing">Losing</MenuItem>
+                  </Select>
+              </FormControl>
           </Box>
 
           <TableContainer component={Paper}>
@@ -118,8 +141,8 @@ function CompletedTrades() {
                   </TableHead>
                   <TableBody>
                       {filteredHistory.length > 0 ? (
-                        filteredHistory.map((entry, index) => (
-                          <TableRow key={index}>
+                        filteredHistory.map((entry) => (
+                          <TableRow key={entry.id}>
                               <TableCell>{entry.symbol}</TableCell>
                               <TableCell>{entry.order_type}</TableCell>
                               <TableCell>{entry.quantity}</TableCell>
@@ -168,6 +191,12 @@ function CompletedTrades() {
               </Table>
           </TableContainer>
 
+          {nextPage && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                <Button variant="outlined" onClick={loadMoreTrades}>Load More</Button>
+            </Box>
+          )}
+
           {/* Note Dialog */}
           <NoteDialog
             open={noteDialogOpen}
@@ -1,55 +1,41 @@
 import React, { useState, useEffect, useCallback } from "react";
 import DepositDialog from "../components/dialogs/Deposit";
-import { fetchDepositHistory, fetchUserData } from "../api/api.js";
-import { useSelector } from "react-redux";
+import { fetchDashboard } from "../api/api.js";
 import { toast } from "../utils/toastService.js";
 
 export default function Dashboard() {
     const [isDialogOpen, setIsDialogOpen] = useState(false);
     const [depositHistory, setDepositHistory] = useState([]);
-    const { user } = useSelector((state) => state.auth);
     const [userInformation, setUserInformation] = useState({});
+    const [openPositions, setOpenPositions] = useState({});
+    const [recentTrades, setRecentTrades] = useState([]);
 
-    const loadDepositHistory = useCallback(async () => {
+    // One request fills the whole page: stats, recent deposits, open positions and recent trades.
+    const loadDashboard = useCallback(async () => {
         try {
-            const history = await fetchDepositHistory();
-            toast("Loaded Deposit History successfully.", "success");
-            setDepositHistory(history);
+            const dashboard = await fetchDashboard();
+            setUserInformation(dashboard.user);
+            setDepositHistory(dashboard.recent_deposits);
+            setOpenPositions(dashboard.open_positions);
+            setRecentTrades(dashboard.recent_completed_trades);
         } catch (error) {
-            console.error("Failed to fetch deposit history:", error);
-            toast("Failed to load deposit history. Look console for more Information", "error");
+            console.error("Failed to fetch dashboard:", error);
+            toast("Failed to load dashboard. Look console for more Information", "error");
         }
     }, []);
 
-    const loadUserInformation = useCallback(async () => {
-        try {
-            const response = await fetchUserData(user?.id);
-            setUserInformation(response);
-        } catch (error) {
-            console.error("Error fetching user data:", error);
-            toast("Failed to load user data. Look console for more Information", "error");
-        }
-    }, [user?.id]);
-
     const handleDepositClick = () => {
         setIsDialogOpen(true);
     };
 
     const handleCloseDialog = async () => {
         setIsDialogOpen(false);
-        await loadDepositHistory();
-        await loadUserInformation();
+        await loadDashboard();
     };
 
     useEffect(() => {
-        loadDepositHistory();
-    }, [loadDepositHistory]);
-
-    useEffect(() => {
-        if (user?.id) {
-            loadUserInformation();
-        }
-    }, [user, loadUserInformation]);
+        loadDashboard();
+    }, [loadDashboard]);
 
     const stats = [
         // Removed "Open Orders" and "Closed Orders"
@@ -59,6 +45,8 @@ export default function Dashboard() {
         { label: "Avg Profit/Loss", value: userInformation.average_profit_loss },
         { label: "Avg Holding Duration (days)", value: userInformation.average_holding_duration },
         { label: "Total Deposits ($)", value: userInformation.total_deposits },
+        { label: "Open Positions", value: openPositions.count },
+        { label: "Open Position Value ($)", value: openPositions.total_value },
     ];
 
     return (
@@ -94,9 +82,56 @@ export default function Dashboard() {
                   </div>
               </div>
 
+              {/* Recent Trades */}
+              <div className="mb-10">
+                  <h2 className="text-xl font-semibold text-gray-700 mb-4">Recent Trades</h2>
+                  <div className="bg-white rounded-xl shadow-md overflow-hidden">
+                      <div className="overflow-x-auto">
+                          <table className="min-w-full divide-y divide-gray-200">
+                              <thead className="bg-gray-50">
+                              <tr>
+                                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                                      Symbol
+                                  </th>
+                                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                                      Close Date
+                                  </th>
+                                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                                      Net P/L
+                                  </th>
+                              </tr>
+                              </thead>
+                              <tbody className="bg-white divide-y divide-gray-200">
+                              {recentTrades.length > 0 ? (
+                                recentTrades.map((trade) => (
+                                  <tr key={trade.id} className="hover:bg-gray-50">
+                                      <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
+                                          {trade.symbol}
+                                      </td>
+                                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                                          {trade.close_date ? new Date(trade.close_date).toLocaleDateString() : "-"}
+                                      </td>
+                                      <td className={`px-6 py-4 whitespace-nowrap text-sm font-medium ${Number(trade.net_amount) >= 0 ? "text-green-600" : "text-red-600"}`}>
+                                          ${trade.net_amount}
+                                      </td>
+                                  </tr>
+                                ))
+                              ) : (
+                                <tr>
+                                    <td colSpan={3} className="px-6 py-4 text-center text-sm text-gray-500">
+                                        No completed trades yet.
+                                    </td>
+                                </tr>
+                              )}
+                              </tbody>
+                          </table>
+                      </div>
+                  </div>
+              </div>
+
               {/* Deposit History */}
               <div className="mb-6">
-                  <h2 className="text-xl font-semibold text-gray-700 mb-4">Deposit History</h2>
+                  <h2 className="text-xl font-semibold text-gray-700 mb-4">Recent Deposits</h2>
                   <div className="bg-white rounded-xl shadow-md overflow-hidden">
                       <div className="overflow-x-auto">
                           <table className="min-w-full divide-y divide-gray-200">
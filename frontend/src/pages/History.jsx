@@ -1,31 +1,35 @@
 import React, { useEffect, useState } from 'react';
-import { fetchOrders } from "../api/api.js";
+import { useDispatch, useSelector } from "react-redux";
+import { loadMore, openList, selectOrders } from "../store/journalSlice.js";
 import {
     Table, TableBody, TableCell, TableContainer,
-    TableHead, TableRow, Paper, Typography, Box, TextField
+    TableHead, TableRow, Paper, Typography, Box, TextField, Button
 } from '@mui/material';
 import { toast } from "../utils/toastService.js";
 
 function History() {
-    const [orderHistory, setOrderHistory] = useState([]);
+    const dispatch = useDispatch();
+    const { rows: orderHistory, next: nextPage } = useSelector(selectOrders);
     const [symbolFilter, setSymbolFilter] = useState("");
 
+    // Orders come back newest first and already filtered by the server; coming back to the
+    // page with the same filter only syncs what changed since.
     useEffect(() => {
-        fetchOrders()
-            .then(orders => {
-                toast("Loaded Order History successfully", "success");
-                const sortedOrders = orders.sort((a, b) => new Date(b.date) - new Date(a.date));
-                setOrderHistory(sortedOrders);
-            })
+        dispatch(openList({ kind: "orders", filters: { symbol: symbolFilter || undefined } })).unwrap()
             .catch((err) => {
                 toast("Failed to load order history. Look console for more Information", "error");
                 console.error(err)
             });
-    }, []);
+    }, [dispatch, symbolFilter]);
 
-    const filteredOrders = orderHistory.filter(order =>
-        order?.stock.symbol.toLowerCase().includes(symbolFilter.toLowerCase())
-    );
+    const loadMoreOrders = async () => {
+        try {
+            await dispatch(loadMore("orders")).unwrap();
+        } catch (err) {
+            toast("Failed to load more orders. Look console for more Information", "error");
+            console.error(err);
+        }
+    };
 
     return (
         <Box className="p-6 w-full min-h-screen bg-white">
@@ -55,9 +59,9 @@ function History() {
                         </TableRow>
                     </TableHead>
                     <TableBody>
-                        {filteredOrders.length > 0 ? (
-                            filteredOrders.map((order, index) => (
-                                <TableRow key={index}>
+                        {orderHistory.length > 0 ? (
+                            orderHistory.map((order) => (
+                                <TableRow key={order.id}>
                                     <TableCell>{order.stock.symbol}</TableCell>
                                     <TableCell>{order.order_type}</TableCell>
                                     <TableCell>{order.quantity}</TableCell>
@@ -78,6 +82,12 @@ function History() {
                     </TableBody>
                 </Table>
             </TableContainer>
+
+            {nextPage && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                    <Button variant="outlined" onClick={loadMoreOrders}>Load More</Button>
+                </Box>
+            )}
         </Box>
     );
 }
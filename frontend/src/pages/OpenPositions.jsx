@@ -1,5 +1,6 @@
-import React, { useEffect, useState } from 'react';
-import { fetchOpenPositions } from "../api/api.js";
+import React, { useEffect } from 'react';
+import { useDispatch, useSelector } from "react-redux";
+import { openList, selectOpenPositions } from "../store/journalSlice.js";
 import {
     Table,
     TableBody,
@@ -14,19 +15,17 @@ import {
 import {toast} from "../utils/toastService.js";
 
 function OpenPositions() {
-    const [openPositions, setOpenPositions] = useState([]);
+    const dispatch = useDispatch();
+    const { rows: openPositions } = useSelector(selectOpenPositions);
 
+    // The first visit loads the positions; later ones only sync what changed since.
     useEffect(() => {
-        fetchOpenPositions()
-            .then((response) => {
-                toast("Loaded Opem Positions successfully", "success");
-                setOpenPositions(response);
-            })
+        dispatch(openList({ kind: "open_positions" })).unwrap()
             .catch((error) => {
                 console.error("Error fetching open positions:", error);
                 toast("Failed to load open positions. Look console for more Information", "error");
             });
-    }, []);
+    }, [dispatch]);
 
     return (
         <Box sx={{ width: '100vw', minHeight: '100vh', p: 4, display: 'flex', justifyContent: 'center', backgroundColor: '#f9fafb' }}>
@@ -51,8 +50,8 @@ function OpenPositions() {
                                     </TableCell>
                                 </TableRow>
                             ) : (
-                                openPositions.map((pos, index) => (
-                                    <TableRow key={index}>
+                                openPositions.map((pos) => (
+                                    <TableRow key={pos.id}>
                                         <TableCell>{pos.symbol}</TableCell>
                                         <TableCell align="right">{pos.quantity}</TableCell>
                                         <TableCell align="right">${Number(pos.total_value).toFixed(2)}</TableCell>
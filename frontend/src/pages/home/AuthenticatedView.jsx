@@ -14,13 +14,14 @@ import {
 import CreateOrder from '../../components/dialogs/CreateOrder.jsx';
 import CloseTrade from '../../components/dialogs/CloseTrade.jsx';
 import CommentDialog from '../../components/dialogs/CommentDialog.jsx';
-import { fetchOrders, updateOrderComment } from '../../api/api.js';
+import { fetchOrders, fetchNextPage, updateOrderComment } from '../../api/api.js';
 import { toast } from '../../utils/toastService.js';
 
 const HomeAuthenticatedView = () => {
     const [open, setOpen] = useState(false);
     const [orders, setOrders] = useState([]);
     const [searchSymbol, setSearchSymbol] = useState("");
+    const [nextPage, setNextPage] = useState(null);
     const [closeDialogOpen, setCloseDialogOpen] = useState(false);
     const [selectedOrder, setSelectedOrder] = useState(null);
 
@@ -30,9 +31,19 @@ const HomeAuthenticatedView = () => {
 
     const fetchData = async () => {
         try {
-            const response = await fetchOrders();
-            const openOrders = response.filter(order => order.status === "open");
-            setOrders(openOrders);
+            const page = await fetchOrders({ status: "open", symbol: searchSymbol || undefined });
+            setOrders(page.results);
+            setNextPage(page.next);
+        } catch (e) {
+            console.error("Failed to fetch orders:", e);
+        }
+    };
+
+    const loadMore = async () => {
+        try {
+            const page = await fetchNextPage(nextPage);
+            setOrders(prev => [...prev, ...page.results]);
+            setNextPage(page.next);
         } catch (e) {
             console.error("Failed to fetch orders:", e);
         }
@@ -40,7 +51,7 @@ const HomeAuthenticatedView = () => {
 
     useEffect(() => {
         fetchData();
-    }, []);
+    }, [searchSymbol]);
 
     const handleClickOpen = () => setOpen(true);
     const handleClose = () => setOpen(false);
@@ -68,10 +79,6 @@ const HomeAuthenticatedView = () => {
         }
     };
 
-    const filteredOrders = orders.filter(order =>
-      order.symbol.toLowerCase().includes(searchSymbol.toLowerCase())
-    );
-
     return (
       <div className="relative w-screen min-h-screen bg-white text-black px-10 py-6">
           {/* Header */}
@@ -111,8 +118,8 @@ const HomeAuthenticatedView = () => {
                       </TableRow>
                   </TableHead>
                   <TableBody>
-                      {filteredOrders.length > 0 ? (
-                        filteredOrders.map((order, index) => (
+                      {orders.length > 0 ? (
+                        orders.map((order, index) => (
                           <TableRow key={index}>
                               <TableCell>{order.symbol}</TableCell>
                               <TableCell>{order.quantity}</TableCell>
@@ -165,6 +172,14 @@ const HomeAuthenticatedView = () => {
               </Table>
           </TableContainer>
 
+          {nextPage && (
+            <div className="flex justify-center mt-4">
+                <Button variant="outlined" onClick={loadMore}>
+                    Load More
+                </Button>
+            </div>
+          )}
+
           {/* Dialogs */}
           <CreateOrder open={open} onClose={handleClose} refreshOrders={fetchData} />
           <CloseTrade
@@ -0,0 +1,131 @@
+import { createAsyncThunk, createSlice } from '@reduxjs/toolkit';
+import {
+    fetchCompletedTrades, fetchJournalChanges, fetchNextPage, fetchOpenPositions, fetchOrders,
+} from '../api/api.js';
+import { logout } from './authSlice.js';
+
+// The journal lists the pages show. A list's first page comes from its paginated endpoint,
+// filtered and ordered by the server, and "Load More" follows its `next` link. After that
+// /api/sync/ only sends the rows changed (or deleted) since the stored cursor, and they are
+// merged into the rows already loaded, so revisiting a page costs one small delta request.
+const newestFirst = (field) => (a, b) => (b[field] || "").localeCompare(a[field] || "") || b.id - a.id;
+
+const symbolMatches = (row, symbol) => !symbol || row.symbol === symbol.toUpperCase();
+
+// Per list: the first-page request, the server's ordering, and its filters (the same
+// ?symbol=&order_type=&outcome= the endpoint applies) for deciding where synced rows belong.
+const LISTS = {
+    orders: {
+        fetchFirst: fetchOrders,
+        order: newestFirst("date"),
+        matches: (order, filters) => symbolMatches(order, filters.symbol),
+    },
+    completed_trades: {
+        fetchFirst: fetchCompletedTrades,
+        order: newestFirst("close_date"),
+        matches: (trade, filters) => {
+            const net = parseFloat(trade.net_amount);
+            return symbolMatches(trade, filters.symbol)
+                && (!filters.order_type || trade.order_type === filters.order_type)
+                && (!filters.outcome || (filters.outcome === "profitable" ? net > 0 : net < 0));
+        },
+    },
+    open_positions: {
+        fetchFirst: async () => ({ results: await fetchOpenPositions(), next: null }),
+        order: (a, b) => a.symbol.localeCompare(b.symbol),
+        matches: () => true,
+    },
+};
+
+const emptyList = () => ({ filters: null, rows: [], next: null, loaded: false, request: null });
+
+const emptyJournal = () => ({
+    cursor: null,
+    ...Object.fromEntries(Object.keys(LISTS).map((kind) => [kind, emptyList()])),
+});
+
+const sameFilters = (a, b) => JSON.stringify(a) === JSON.stringify(b);
+
+// Pages dispatch this on mount and whenever their filters change. It syncs first, so rows
+// written while the first page loads come with the next delta; merging is idempotent.
+export const openList = createAsyncThunk(
+    "journal/openList",
+    async ({ kind, filters = {} }, { getState }) => {
+        const journal = getState().journal;
+        const changes = await fetchJournalChanges(journal.cursor);
+        const list = journal[kind];
+        if (!changes.full && list.loaded && sameFilters(list.filters, filters)) {
+            return { changes };
+        }
+        return { changes, page: await LISTS[kind].fetchFirst(filters) };
+    },
+);
+
+export const loadMore = createAsyncThunk(
+    "journal/loadMore",
+    async (kind, { getState }) => {
+        const from = getState().journal[kind].next;
+        return { from, page: await fetchNextPage(from) };
+    },
+);
+
+// Drops rows that were deleted or changed, then puts the changed ones back where they now
+// belong: only if they still match the list's filters and sort within the loaded range
+// (rows further down arrive with a later page).
+const mergeChanges = (list, spec, changed, deleted) => {
+    const replaced = new Set([...deleted, ...changed.map((row) => row.id)]);
+    const last = list.rows[list.rows.length - 1];
+    const loaded = (row) => !list.next || !last || spec.order(row, last) <= 0;
+    list.rows = list.rows
+        .filter((row) => !replaced.has(row.id))
+        .concat(changed.filter((row) => spec.matches(row, list.filters) && loaded(row)))
+        .sort(spec.order);
+};
+
+const journalSlice = createSlice({
+    name: "journal",
+    initialState: emptyJournal(),
+    reducers: {},
+    extraReducers: (builder) => {
+        builder
+            .addCase(openList.pending, (state, action) => {
+                state[action.meta.arg.kind].request = action.meta.requestId;
+            })
+            .addCase(openList.fulfilled, (state, action) => {
+                const { changes, page } = action.payload;
+                for (const [kind, spec] of Object.entries(LISTS)) {
+                    if (changes.full) {
+                        state[kind] = { ...emptyList(), request: state[kind].request };
+                    } else if (state[kind].loaded) {
+                        mergeChanges(state[kind], spec, changes[kind], changes.deleted[kind]);
+                    }
+                }
+                state.cursor = changes.cursor;
+
+                // A later openList for the same list (new filters) supersedes this one's page.
+                const { kind, filters = {} } = action.meta.arg;
+                if (page && state[kind].request === action.meta.requestId) {
+                    state[kind] = { ...emptyList(), filters, rows: page.results, next: page.next, loaded: true };
+                }
+            })
+            .addCase(loadMore.fulfilled, (state, action) => {
+                const list = state[action.meta.arg];
+                const { from, page } = action.payload;
+                if (list.next !== from) {
+                    return;
+                }
+                const loaded = new Set(list.rows.map((row) => row.id));
+                list.rows.push(...page.results.filter((row) => !loaded.has(row.id)));
+                list.next = page.next;
+            })
+            .addCase(logout, () => emptyJournal());
+    },
+});
+
+export const selectOrders = (state) => state.journal.orders;
+
+export const selectCompletedTrades = (state) => state.journal.completed_trades;
+
+export const selectOpenPositions = (state) => state.journal.open_positions;
+
+export default journalSlice.reducer;
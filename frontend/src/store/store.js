@@ -1,9 +1,11 @@
 import { configureStore } from '@reduxjs/toolkit';
 import authReducer from './authSlice.js';
+import journalReducer from './journalSlice.js';
 
 const store = configureStore({
     reducer: {
         auth: authReducer,
+        journal: journalReducer,
     }
 });
 